@@ -0,0 +1,182 @@
+"""
+Storage micro-benchmarks for the bot's persistence primitives.
+
+For every user-count scale and inventory size, a synthetic users.json is
+generated in a temp directory and a fresh worker process runs each
+primitive for a time budget, reporting ops/sec and the worker's peak RSS.
+
+Usage:
+    python bench.py
+    python bench.py --scales 1000,10000 --inventory 0,50 --budget 2
+    python bench.py --backend mystore --csv bench.csv
+
+A backend is any importable module exposing the functions in BACKEND_API
+with the same signatures as bot.py. If it also defines reset_storage(), it
+is called once the data files are in place, before timing starts.
+"""
+import argparse
+import csv
+import importlib
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_API = [
+    "get_user_data",
+    "update_user_data",
+    "add_money",
+    "spend_money",
+    "add_item_to_inventory",
+    "save_winning_numbers",
+    "leaderboard_entries",
+]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIRST_USER_ID = 10 ** 17  # snowflake-sized ids
+
+
+# --- Data generation (parent process) ---
+def generate_data(path, users, inventory_size, seed):
+    """Write users.json the way save_users formats it, streaming to keep memory flat"""
+    rnd = random.Random(seed)
+    with open(os.path.join(HERE, "items.json"), encoding="utf-8") as f:
+        item_names = list(json.load(f))
+    shutil.copy(os.path.join(HERE, "items.json"), os.path.join(path, "items.json"))
+    with open(os.path.join(path, "win.json"), "w", encoding="utf-8") as f:
+        json.dump({}, f)
+
+    with open(os.path.join(path, "users.json"), "w", encoding="utf-8") as f:
+        f.write("{\n")
+        for i in range(users):
+            record = {
+                "money": rnd.randint(0, 10 ** 9),
+                "xp": rnd.randint(0, 50_000),
+                "level": rnd.randint(1, 25),
+                "inventory": {name: rnd.randint(1, 20) for name in rnd.sample(item_names, min(inventory_size, len(item_names)))},
+                "last_daily": 0,
+                "bank": rnd.randint(0, 10 ** 9),
+                "achievements": [],
+                "luck": 0,
+                "money_boost": 1,
+                "prestige": 0
+            }
+            body = json.dumps(record, indent=2).replace("\n", "\n  ")
+            f.write(f'  "{FIRST_USER_ID + i}": {body}{"," if i < users - 1 else ""}\n')
+        f.write("}")
+    return os.path.getsize(os.path.join(path, "users.json"))
+
+
+# --- Timing (worker process) ---
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def time_op(fn, budget, min_ops):
+    """Run fn until the budget is spent (at least min_ops times); return ops/sec"""
+    ops = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        ops += 1
+        elapsed = time.perf_counter() - started
+        if ops >= min_ops and elapsed >= budget:
+            return ops, ops / elapsed
+
+def run_worker(backend_name, users, budget, min_ops, seed):
+    backend = importlib.import_module(backend_name)
+    missing = [name for name in BACKEND_API if not hasattr(backend, name)]
+    if missing:
+        raise SystemExit(f"backend {backend_name} is missing: {', '.join(missing)}")
+    if hasattr(backend, "reset_storage"):
+        backend.reset_storage()
+
+    rnd = random.Random(seed)
+    with open("items.json", encoding="utf-8") as f:
+        item_names = list(json.load(f))
+    user_id = lambda: FIRST_USER_ID + rnd.randrange(users)
+
+    ops = {
+        "get_user_data": lambda: backend.get_user_data(user_id()),
+        "update_user_data": lambda: backend.update_user_data(user_id(), money=rnd.randint(0, 10 ** 9)),
+        "add_money": lambda: backend.add_money(user_id(), 10),
+        "spend_money": lambda: backend.spend_money(user_id(), 1),
+        "add_item_to_inventory": lambda: backend.add_item_to_inventory(user_id(), rnd.choice(item_names)),
+        "save_winning_numbers": lambda: backend.save_winning_numbers([rnd.randint(1, 100) for _ in range(4)]),
+        "leaderboard_sort": lambda: backend.leaderboard_entries("money")[:10],
+    }
+
+    results = {"baseline_rss_mb": peak_rss_mb()}
+    for name, fn in ops.items():
+        count, rate = time_op(fn, budget, min_ops)
+        results[name] = {"ops": count, "ops_per_sec": rate}
+    results["peak_rss_mb"] = peak_rss_mb()
+    json.dump(results, sys.stdout)
+
+
+# --- Driver ---
+def run_scale(args, users, inventory_size):
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        started = time.perf_counter()
+        size = generate_data(data_dir, users, inventory_size, args.seed)
+        print(f"  generated {users:,} users ({size / 2**20:,.1f} MB) in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--backend", args.backend,
+               "--users", str(users), "--budget", str(args.budget), "--min-ops", str(args.min_ops),
+               "--seed", str(args.seed)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([HERE, os.environ.get("PYTHONPATH", "")]))
+        out = subprocess.run(cmd, cwd=data_dir, env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(out), size
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark storage primitives across user-count scales")
+    parser.add_argument("--backend", default="bot", help="module implementing BACKEND_API")
+    parser.add_argument("--scales", default="1000,10000,100000,1000000")
+    parser.add_argument("--inventory", default="0,25", help="items per user")
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds per primitive")
+    parser.add_argument("--min-ops", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--users", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.backend, args.users, args.budget, args.min_ops, args.seed)
+        return
+
+    rows = []
+    for users in [int(s) for s in args.scales.split(",")]:
+        for inventory_size in [int(s) for s in args.inventory.split(",")]:
+            print(f"{args.backend}: {users:,} users, {inventory_size} items each", file=sys.stderr)
+            results, size = run_scale(args, users, inventory_size)
+            for op in ["get_user_data", "update_user_data", "add_money", "spend_money",
+                       "add_item_to_inventory", "save_winning_numbers", "leaderboard_sort"]:
+                rows.append({
+                    "backend": args.backend, "users": users, "inventory": inventory_size,
+                    "file_mb": round(size / 2**20, 2), "op": op,
+                    "ops": results[op]["ops"], "ops_per_sec": round(results[op]["ops_per_sec"], 2),
+                    "baseline_rss_mb": round(results["baseline_rss_mb"], 1),
+                    "peak_rss_mb": round(results["peak_rss_mb"], 1)
+                })
+
+    print(f"\n{'users':>9} {'inv':>4} {'file MB':>8} {'op':<22} {'ops/sec':>12} {'peak RSS MB':>12}")
+    for row in rows:
+        print(f"{row['users']:>9,} {row['inventory']:>4} {row['file_mb']:>8,.1f} {row['op']:<22} "
+              f"{row['ops_per_sec']:>12,.2f} {row['peak_rss_mb']:>12,.1f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,1418 @@
 9
 from threading import Thread
-from discord.ext import commands
+from discord.ext import commands, tasks
 import discord
-import random
+from aiohttp import web
+import numpy as np
+import itertools
+import bisect
+import zlib
+from array import array
+import mmap
+import atexit
+import struct
 import json
 import os
 import re
 import asyncio
+import time
+import math
+import contextlib
+import contextvars
+import functools
+import collections
+import logging
+import threading
+import sys
 
 # --- keep-alive webserver ---
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("PORT", "8080"))
+
+# name -> callable returning how many writes are buffered and not yet on disk
+FLUSH_SOURCES = {}
+
+async def health_handler(request):
+    """Liveness probe: gateway state only, never touches the user store"""
+    keep_alive = getattr(bot.ws, "_keep_alive", None)
+    last_ack = getattr(keep_alive, "_last_ack", None)
+    body = {
+        "status": "ok" if bot.is_ready() and not bot.is_closed() else "starting",
+        "gateway_latency": bot.latency if math.isfinite(bot.latency) else None,
+        "seconds_since_heartbeat_ack": round(time.perf_counter() - last_ack, 3) if last_ack else None,
+        "loop_lag_p99": loop_monitor.lag.quantile(0.99),
+        "pending_flushes": {name: pending() for name, pending in FLUSH_SOURCES.items()},
+        "uptime": round(time.monotonic() - STARTED_AT, 1)
+    }
+    return web.json_response(body, status=200 if body["status"] == "ok" else 503)
+
+async def metrics_handler(request):
+    return web.Response(text=render_prometheus(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def start_webserver():
+    """Serve /health and /metrics from the bot's own event loop"""
+    app = web.Application()
+    app.router.add_get("/", health_handler)
+    app.router.add_get("/health", health_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, WEB_HOST, WEB_PORT).start()
+    print(f"🌐 Serving /health and /metrics on {WEB_HOST}:{WEB_PORT}")
+    return runner
+
+# --- Metrics ---
+METRICS_FILE = "metrics.prom"      # Prometheus text-format dump
+METRICS_DUMP_INTERVAL = 60         # seconds
+
+STARTED_AT = time.monotonic()
+
+# Name of the command (or event) doing the current work, so storage I/O can be attributed to it
+current_command = contextvars.ContextVar("current_command", default="other")
+
+class LatencyHistogram:
+    """HDR-style histogram: power-of-two ranges split into linear sub-buckets (microseconds)"""
+    SUB_BUCKETS = 8  # ~12% worst-case relative error
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, micros):
+        exp = micros.bit_length() - 1
+        sub = ((micros - (1 << exp)) * self.SUB_BUCKETS) >> exp
+        return exp * self.SUB_BUCKETS + sub
+
+    def _upper_bound(self, index):
+        exp, sub = divmod(index, self.SUB_BUCKETS)
+        return ((1 << exp) + (((sub + 1) << exp) // self.SUB_BUCKETS)) / 1e6
+
+    def record(self, seconds):
+        index = self._index(max(1, int(seconds * 1e6)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound (seconds) of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def cumulative(self):
+        """[(le_seconds, cumulative_count)] at power-of-two bounds, for Prometheus"""
+        if not self.count:
+            return []
+        top = max(self.counts) // self.SUB_BUCKETS
+        return [
+            ((1 << (exp + 1)) / 1e6, sum(c for i, c in self.counts.items() if i < (exp + 1) * self.SUB_BUCKETS))
+            for exp in range(top + 1)
+        ]
+
+class CommandStats:
+    """Invocation count, latency and storage I/O for one command"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.storage_ops = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+COMMAND_STATS = {}
+CACHE_STATS = {}  # cache name -> [hits, misses]
+
+def command_stats(name):
+    stats = COMMAND_STATS.get(name)
+    if stats is None:
+        stats = COMMAND_STATS[name] = CommandStats()
+    return stats
+
+def record_storage_io(op, bytes_read=0, bytes_written=0):
+    """Attribute a storage read/write to whatever command is running"""
+    stats = command_stats(current_command.get())
+    stats.storage_ops[op] = stats.storage_ops.get(op, 0) + 1
+    stats.bytes_read += bytes_read
+    stats.bytes_written += bytes_written
+
+def record_cache(name, hit):
+    stats = CACHE_STATS.setdefault(name, [0, 0])
+    stats[0 if hit else 1] += 1
+
+@contextlib.contextmanager
+def track_command(name):
+    """Time a block of work and attribute storage I/O inside it to `name`"""
+    token = current_command.set(name)
+    draw_token = current_draw.set(None)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        command_stats(name).errors += 1
+        raise
+    finally:
+        command_stats(name).latency.record(time.perf_counter() - started)
+        current_command.reset(token)
+        current_draw.reset(draw_token)
+
+def tracked_button(name):
+    """Time a view button callback and attribute its storage I/O (and ledger entries) to `name`"""
+    def decorator(callback):
+        @functools.wraps(callback)
+        async def wrapper(self, interaction, button):
+            current_channel.set(interaction.channel)
+            with track_command(name):
+                return await callback(self, interaction, button)
+        return wrapper
+    return decorator
+
+def render_prometheus():
+    """All command metrics in Prometheus text exposition format"""
+    lines = [
+        "# HELP moneydc_command_invocations_total Commands handled",
+        "# TYPE moneydc_command_invocations_total counter"
+    ]
+    for name, stats in sorted(COMMAND_STATS.items()):
+        lines.append(f'moneydc_command_invocations_total{{command="{name}"}} {stats.latency.count}')
+    lines += ["# HELP moneydc_command_errors_total Commands that raised", "# TYPE moneydc_command_errors_total counter"]
+    for name, stats in sorted(COMMAND_STATS.items()):
+        lines.append(f'moneydc_command_errors_total{{command="{name}"}} {stats.errors}')
+
+    lines += ["# HELP moneydc_command_latency_seconds Command latency", "# TYPE moneydc_command_latency_seconds histogram"]
+    for name, stats in sorted(COMMAND_STATS.items()):
+        for le, count in stats.latency.cumulative():
+            lines.append(f'moneydc_command_latency_seconds_bucket{{command="{name}",le="{le:g}"}} {count}')
+        lines.append(f'moneydc_command_latency_seconds_bucket{{command="{name}",le="+Inf"}} {stats.latency.count}')
+        lines.append(f'moneydc_command_latency_seconds_sum{{command="{name}"}} {stats.latency.total:.6f}')
+        lines.append(f'moneydc_command_latency_seconds_count{{command="{name}"}} {stats.latency.count}')
+
+    lines += ["# HELP moneydc_storage_ops_total Storage helper calls", "# TYPE moneydc_storage_ops_total counter"]
+    for name, stats in sorted(COMMAND_STATS.items()):
+        for op, count in sorted(stats.storage_ops.items()):
+            lines.append(f'moneydc_storage_ops_total{{command="{name}",op="{op}"}} {count}')
+    lines += ["# HELP moneydc_storage_bytes_total Bytes read/written by storage helpers", "# TYPE moneydc_storage_bytes_total counter"]
+    for name, stats in sorted(COMMAND_STATS.items()):
+        lines.append(f'moneydc_storage_bytes_total{{command="{name}",direction="read"}} {stats.bytes_read}')
+        lines.append(f'moneydc_storage_bytes_total{{command="{name}",direction="written"}} {stats.bytes_written}')
+
+    lines += ["# HELP moneydc_cache_requests_total Cache lookups", "# TYPE moneydc_cache_requests_total counter"]
+    for name, (hits, misses) in sorted(CACHE_STATS.items()):
+        lines.append(f'moneydc_cache_requests_total{{cache="{name}",result="hit"}} {hits}')
+        lines.append(f'moneydc_cache_requests_total{{cache="{name}",result="miss"}} {misses}')
+    lines += ["# HELP moneydc_pending_flushes Buffered writes not yet on disk", "# TYPE moneydc_pending_flushes gauge"]
+    for name, pending in sorted(FLUSH_SOURCES.items()):
+        lines.append(f'moneydc_pending_flushes{{source="{name}"}} {pending()}')
+    lines += ["# HELP moneydc_gateway_latency_seconds Discord heartbeat round trip", "# TYPE moneydc_gateway_latency_seconds gauge"]
+    if math.isfinite(bot.latency):
+        lines.append(f"moneydc_gateway_latency_seconds {bot.latency:.6f}")
+
+    lines += ["# HELP moneydc_duplicate_actions_total Interactions and game settlements dropped as duplicates", "# TYPE moneydc_duplicate_actions_total counter"]
+    lines.append(f"moneydc_duplicate_actions_total {processed_actions.duplicates}")
+    lines += ["# HELP moneydc_refused_actions_total Actions refused because the de-duplication set was full", "# TYPE moneydc_refused_actions_total counter"]
+    lines.append(f"moneydc_refused_actions_total {processed_actions.rejected}")
+
+    lines += ["# HELP moneydc_loop_lag_seconds Event loop wake-up lag", "# TYPE moneydc_loop_lag_seconds histogram"]
+    for le, count in loop_monitor.lag.cumulative():
+        lines.append(f'moneydc_loop_lag_seconds_bucket{{le="{le:g}"}} {count}')
+    lines.append(f'moneydc_loop_lag_seconds_bucket{{le="+Inf"}} {loop_monitor.lag.count}')
+    lines.append(f'moneydc_loop_lag_seconds_sum {loop_monitor.lag.total:.6f}')
+    lines.append(f'moneydc_loop_lag_seconds_count {loop_monitor.lag.count}')
+    lines += ["# HELP moneydc_loop_stall_seconds_total Time the loop was blocked, by handler", "# TYPE moneydc_loop_stall_seconds_total counter"]
+    for handler, stalls in sorted(loop_monitor.offenders.items()):
+        lines.append(f'moneydc_loop_stall_seconds_total{{handler="{handler}"}} {stalls.total:.6f}')
+    return "\n".join(lines) + "\n"
+
+def dump_metrics(path=METRICS_FILE):
+    """Write the Prometheus dump atomically"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+# --- Event Loop Monitor ---
+LOOP_LAG_INTERVAL = 0.25        # seconds between lag samples
+LOOP_STALL_THRESHOLD = 0.1      # lag (and asyncio slow_callback_duration) that counts as a stall
+LOOP_DEBUG = os.getenv("LOOP_DEBUG") == "1"  # asyncio debug mode: logs every slow callback, costs CPU
+HEARTBEAT_INTERVAL = 41.25      # gateway default, used until the websocket reports its own
+LAG_WARN_FRACTION = 0.25        # warn once a stall eats this much of the heartbeat interval
+
+log = logging.getLogger("moneydc")
+
+class LoopMonitor:
+    """Samples event-loop lag and blames stalls on the bot.py handler that was running.
+
+    The sampler coroutine measures how late its own wake-ups are. A watchdog
+    thread notices when the sampler is overdue by half the stall threshold
+    and grabs the loop thread's stack, the same way discord.py's heartbeat
+    thread reports a blocked loop.
+    """
+
+    def __init__(self):
+        self.lag = LatencyHistogram()
+        self.offenders = {}                             # handler -> LatencyHistogram of its stalls
+        self.recent = collections.deque(maxlen=20)      # (wall time, seconds, handler, where)
+        self.slow_callbacks = collections.deque(maxlen=20)  # (wall time, seconds, handler, asyncio handle)
+        self.culprit = None                             # (handler, where) from the current stall
+        self.expected = time.monotonic()                # when the sampler should next wake up
+        self.loop_thread_id = None
+        self.task = None
+
+    def start(self, loop):
+        if self.task and not self.task.done():
+            return
+        self.loop_thread_id = threading.get_ident()
+        if LOOP_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = LOOP_STALL_THRESHOLD
+            logging.getLogger("asyncio").addHandler(SlowCallbackHandler())
+        self.task = loop.create_task(self.run())
+        Thread(target=self.watch, name="loop-monitor", daemon=True).start()
+
+    async def run(self):
+        while True:
+            self.expected = time.monotonic() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, time.monotonic() - self.expected)
+            self.lag.record(lag)
+            if lag >= LOOP_STALL_THRESHOLD:
+                self.record_stall(lag)
+            self.culprit = None
+
+    def watch(self):
+        """Watchdog thread: capture the loop thread's stack once per stall"""
+        while True:
+            time.sleep(LOOP_STALL_THRESHOLD / 4)
+            if self.culprit is None and time.monotonic() - self.expected > LOOP_STALL_THRESHOLD / 2:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    self.culprit = self.blame(frame)
+
+    @staticmethod
+    def blame(frame):
+        """(outermost bot.py function, innermost bot.py line) on a stack"""
+        ours = []
+        while frame is not None:
+            if frame.f_code.co_filename == __file__:
+                ours.append(frame)
+            frame = frame.f_back
+        if not ours:
+            return ("library", "")
+        return (ours[-1].f_code.co_qualname, f"{ours[0].f_code.co_qualname}:{ours[0].f_lineno}")
+
+    def record_stall(self, seconds):
+        handler, where = self.culprit or ("unknown", "")
+        if handler not in self.offenders:
+            self.offenders[handler] = LatencyHistogram()
+        self.offenders[handler].record(seconds)
+        self.recent.append((time.time(), seconds, handler, where))
+
+        heartbeat = getattr(getattr(getattr(bot, "ws", None), "_keep_alive", None), "interval", None) or HEARTBEAT_INTERVAL
+        if seconds >= heartbeat * LAG_WARN_FRACTION:
+            log.warning("Event loop blocked for %.1fs (heartbeat every %.1fs) in %s %s", seconds, heartbeat, handler, where)
+
+class SlowCallbackHandler(logging.Handler):
+    """Keeps asyncio debug mode's 'Executing <handle> took N seconds' reports"""
+
+    def emit(self, record):
+        if record.msg.startswith("Executing") and len(record.args) == 2:
+            handle, seconds = record.args
+            handler = loop_monitor.culprit[0] if loop_monitor.culprit else "unknown"
+            loop_monitor.slow_callbacks.append((time.time(), seconds, handler, handle))
+
+loop_monitor = LoopMonitor()
+
+# --- Columnar User Stats ---
+# Scalar fields mirrored into NumPy columns; ints are int64, saturated, with exact values kept aside
+USER_COLUMNS = {
+    "money": "<i8", "bank": "<i8", "xp": "<i8", "level": "<i8", "prestige": "<i8",
+    "luck": "<f8", "money_boost": "<f8"
+}
+COLUMN_DEFAULTS = {"level": 1}
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+FLOAT_EXACT_LIMIT = 2 ** 53  # floats hold every integer below this exactly
+
+def column_values(data):
+    """A record's column values (ints saturated to int64) and {field: exact int} for the saturated ones"""
+    values, overflow = [], {}
+    for field, dtype in USER_COLUMNS.items():
+        value = data.get(field, COLUMN_DEFAULTS.get(field, 0))
+        if dtype == "<i8":
+            value = int(value)
+            if not INT64_MIN <= value <= INT64_MAX:
+                overflow[field] = value
+                value = min(max(value, INT64_MIN), INT64_MAX)
+        values.append(value)
+    return values, overflow
+
+def held_items(inventory):
+    """(item ids, counts) of what a packed inventory (or its flat [id, count, ...] list form) holds"""
+    pairs = np.array(inventory if inventory is not None else (), dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[pairs[:, 1] > 0]
+    return pairs[:, 0], pairs[:, 1]
+
+def item_bits(ids):
+    """(word index, bit) of each item id in an owned-item bitset"""
+    return ids >> 6, np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64))
+
+def bitset_words(ids):
+    return int(ids.max()) // 64 + 1 if len(ids) else 1
+
+def owned_matrix(id_lists):
+    """One owned-item bitset row per list of item ids"""
+    words = max([1] + [bitset_words(ids) for ids in id_lists])
+    owned = np.zeros((len(id_lists), words), dtype=np.uint64)
+    if id_lists:
+        rows = np.repeat(np.arange(len(id_lists)), [len(ids) for ids in id_lists])
+        word, bit = item_bits(np.concatenate(id_lists))
+        np.bitwise_or.at(owned.reshape(-1), rows * words + word, bit)
+    return owned
+
+def inventory_bitset(inventory):
+    """Owned-item bitset words of one packed inventory, as Python ints (cheaper than NumPy for one row)"""
+    words = []
+    for i in range(0, len(inventory or ()), 2):
+        if inventory[i + 1] > 0:
+            word = inventory[i] >> 6
+            if word >= len(words):
+                words.extend([0] * (word + 1 - len(words)))
+            words[word] |= 1 << (inventory[i] & 63)
+    return words
+
+def widen_bitsets(owned, words):
+    return np.pad(owned, ((0, 0), (0, words - owned.shape[1]))) if words > owned.shape[1] else owned
+
+def fit_bitset(bits, words):
+    """One bitset cut or zero-padded to `words` words"""
+    return np.pad(bits[:words], (0, max(0, words - len(bits))))
+
+def bitset_ids(bits):
+    """Ids of the set bits, ascending"""
+    return np.flatnonzero(np.unpackbits(bits.astype("<u8").view(np.uint8), bitorder="little"))
+
+def holdings_table(id_lists, count_lists):
+    """Per-row item ids and counts laid back to back: (ids, counts, offsets into them, count + 1)"""
+    offsets = np.zeros(len(id_lists) + 1, dtype="<u8")
+    np.cumsum([len(ids) for ids in id_lists], out=offsets[1:])
+    if not id_lists:
+        return np.zeros(0, dtype="<u4"), np.zeros(0, dtype="<i8"), offsets
+    return np.concatenate(id_lists).astype("<u4"), np.concatenate(count_lists).astype("<i8"), offsets
+
+def gather_runs(offsets, rows):
+    """Indices that lay the runs of `rows` out back to back, and the offsets of the result"""
+    starts = offsets[rows].astype(np.int64)
+    lengths = offsets[rows + 1].astype(np.int64) - starts
+    gathered = np.zeros(len(rows) + 1, dtype="<u8")
+    np.cumsum(lengths, out=gathered[1:])
+    index = np.repeat(starts - gathered[:-1].astype(np.int64), lengths) + np.arange(int(gathered[-1]))
+    return index, gathered
+
+def map_section(path, dtype, offset, length):
+    """A read-only array over part of a file, on its own mapping so it can outlive the store's"""
+    if not length:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length // np.dtype(dtype).itemsize,))
+
+def columns_from_records(records):
+    """Column arrays, {row: {field: exact}} overflow, owned-item bitsets and holdings for stored records, in order"""
+    rows, overflow, id_lists, count_lists = [], {}, [], []
+    for row, data in enumerate(records):
+        values, big = column_values(data)
+        rows.append(values)
+        ids, counts = held_items(data.get("inventory"))
+        id_lists.append(ids)
+        count_lists.append(counts)
+        if big:
+            overflow[row] = big
+    columns = {
+        field: np.fromiter((values[i] for values in rows), dtype=dtype, count=len(rows))
+        for i, (field, dtype) in enumerate(USER_COLUMNS.items())
+    }
+    return columns, overflow, owned_matrix(id_lists), holdings_table(id_lists, count_lists)
+
+class UserColumns:
+    """Scalar user fields as NumPy columns, one dense row ("slot") per user.
+
+    Slots 0..base_count-1 follow the snapshot's sorted ids and later users are
+    appended. Integer columns saturate at the int64 bounds; `overflow` keeps the
+    exact value of those cells and every query folds it back in. `owned` holds
+    one bitset per slot with bit i set when the user holds item id i.
+
+    Holdings are the inverted side of inventories: the snapshot's (item id,
+    count) runs per base slot, `holdings` for slots changed since, and the
+    per-item `supply` (total count) and `holders` (users holding any) kept
+    current on every update. The holder index lists each item's holders: the
+    snapshot's as slot/count runs grouped by item, and changed slots in
+    `changed_holders`, so holders_of() only touches the item's own holders.
+    """
+
+    def __init__(self, base_uids, columns, overflow, owned, holdings):
+        self.base_uids = np.array(base_uids, dtype=np.uint64)
+        self.base_count = self.size = len(self.base_uids)
+        self.extra = {}  # user id -> slot for users added since the snapshot
+        self.slot_uids = self.base_uids.copy()
+        self.columns = {field: np.array(columns[field], dtype=dtype) for field, dtype in USER_COLUMNS.items()}
+        self.owned = np.array(owned, dtype=np.uint64)
+        self.held_ids, self.held_counts, self.held_offsets = holdings
+        self.holdings = {}  # slot -> (item ids, counts) for users whose inventory changed since the snapshot
+        self.supply = np.zeros(int(self.held_ids.max()) + 1 if len(self.held_ids) else 0, dtype=np.int64)
+        np.add.at(self.supply, self.held_ids, self.held_counts)
+        self.holders = np.bincount(self.held_ids, minlength=len(self.supply)).astype(np.int64)
+        order = np.argsort(self.held_ids, kind="stable")
+        runs = np.diff(np.asarray(self.held_offsets, dtype=np.int64)) if self.base_count else np.zeros(0, dtype=np.int64)
+        self.holder_slots = np.repeat(np.arange(self.base_count, dtype=np.int64), runs)[order]
+        self.holder_counts = np.asarray(self.held_counts, dtype=np.int64)[order]
+        self.holder_offsets = np.searchsorted(np.asarray(self.held_ids)[order], np.arange(len(self.supply) + 1))
+        self.stale = np.zeros(self.base_count, dtype=bool)  # base slots whose snapshot runs were replaced
+        self.changed_holders = {}  # item id -> {slot: count} for slots in `holdings`
+        self.overflow = {field: {} for field, dtype in USER_COLUMNS.items() if dtype == "<i8"}
+        for row, fields in overflow.items():
+            for field, value in fields.items():
+                self.overflow[field][row] = value
+
+    def slot(self, uid):
+        i = int(np.searchsorted(self.base_uids, np.uint64(uid)))
+        if i < self.base_count and self.base_uids[i] == uid:
+            return i
+        slot = self.extra.get(uid)
+        if slot is None:
+            if self.size == len(self.slot_uids):
+                self.grow(max(1024, self.size * 2))
+            slot = self.extra[uid] = self.size
+            self.slot_uids[slot] = uid
+            self.size += 1
+        return slot
+
+    def grow(self, capacity):
+        extra = capacity - len(self.slot_uids)
+        self.slot_uids = np.concatenate([self.slot_uids, np.zeros(extra, dtype=np.uint64)])
+        for field, column in self.columns.items():
+            self.columns[field] = np.concatenate([column, np.zeros(extra, dtype=column.dtype)])
+        self.owned = np.pad(self.owned, ((0, extra), (0, 0)))
+
+    def update(self, uid, data):
+        slot = self.slot(int(uid))
+        values, overflow = column_values(data)
+        for (field, column), value in zip(self.columns.items(), values):
+            column[slot] = value
+            if field in self.overflow:
+                if field in overflow:
+                    self.overflow[field][slot] = overflow[field]
+                else:
+                    self.overflow[field].pop(slot, None)
+        ids, counts = held_items(data.get("inventory"))
+        old_ids, old_counts = self.inventory(slot)
+        if np.array_equal(ids, old_ids) and np.array_equal(counts, old_counts):
+            return
+        self.count_supply(old_ids, old_counts, -1)
+        self.count_supply(ids, counts, 1)
+        self.holdings[slot] = (ids, counts)
+        if slot < self.base_count:
+            self.stale[slot] = True
+        for item_id in old_ids.tolist():
+            holders = self.changed_holders.get(item_id)
+            if holders is not None:
+                holders.pop(slot, None)
+        for item_id, count in zip(ids.tolist(), counts.tolist()):
+            self.changed_holders.setdefault(item_id, {})[slot] = count
+        bits = inventory_bitset(data.get("inventory"))
+        self.owned = widen_bitsets(self.owned, len(bits))
+        self.owned[slot] = 0
+        self.owned[slot, :len(bits)] = bits
+
+    def inventory(self, slot):
+        """(item ids, counts) a slot holds"""
+        held = self.holdings.get(slot)
+        if held is not None:
+            return held
+        if slot < self.base_count:
+            start, stop = int(self.held_offsets[slot]), int(self.held_offsets[slot + 1])
+            return self.held_ids[start:stop], self.held_counts[start:stop]
+        return self.held_ids[:0], self.held_counts[:0]
+
+    def count_supply(self, ids, counts, sign):
+        if len(ids) and int(ids.max()) >= len(self.supply):
+            extra = int(ids.max()) + 1 - len(self.supply)
+            self.supply = np.pad(self.supply, (0, extra))
+            self.holders = np.pad(self.holders, (0, extra))
+        np.add.at(self.supply, ids, sign * counts)
+        np.add.at(self.holders, ids, sign)
+
+    def item_supply(self, item_id):
+        """(total count, users holding it) for an item id"""
+        if item_id >= len(self.supply):
+            return 0, 0
+        return int(self.supply[item_id]), int(self.holders[item_id])
+
+    def holders_of(self, item_id):
+        """(slots, counts) of every user holding an item"""
+        if item_id + 1 < len(self.holder_offsets):
+            start, stop = self.holder_offsets[item_id], self.holder_offsets[item_id + 1]
+            slots, counts = self.holder_slots[start:stop], self.holder_counts[start:stop]
+            keep = ~self.stale[slots]
+            slots, counts = slots[keep], counts[keep]
+        else:
+            slots, counts = self.holder_slots[:0], self.holder_counts[:0]
+        changed = self.changed_holders.get(item_id)
+        if changed:
+            slots = np.concatenate([slots, np.fromiter(changed, dtype=np.int64, count=len(changed))])
+            counts = np.concatenate([counts, np.fromiter(changed.values(), dtype=np.int64, count=len(changed))])
+        return slots, counts
+
+    def top_holders(self, item_id, k):
+        """[(user id, count)] of the k biggest holders of an item, biggest first"""
+        slots, counts = self.holders_of(item_id)
+        order = np.argsort(-counts, kind="stable")[:k]
+        return [(str(int(self.slot_uids[slot])), int(count)) for slot, count in zip(slots[order], counts[order])]
+
+    def column(self, field):
+        return self.columns[field][:self.size]
+
+    def exact(self, field, slot):
+        value = self.columns[field][slot]
+        return self.overflow[field].get(slot, int(value)) if field in self.overflow else float(value)
+
+    def sum(self, field):
+        """Exact total of a column as a Python number, whatever the magnitudes"""
+        column = self.column(field)
+        if field not in self.overflow:
+            return float(column.sum())
+        # Summing the 32-bit halves separately can't overflow int64 below 2**31 users
+        total = (int((column >> 32).sum()) << 32) + int((column & 0xFFFFFFFF).sum())
+        for slot, value in self.overflow[field].items():
+            total += value - int(column[slot])
+        return total
+
+    def key(self, fields):
+        """float64 ranking key: one field, or the sum of several"""
+        key = self.column(fields[0]).astype(np.float64)
+        for field in fields[1:]:
+            key += self.column(field)
+        for slot in {slot for field in fields for slot in self.overflow.get(field, ())}:
+            key[slot] = float(sum(self.exact(field, slot) for field in fields))
+        return key
+
+    def top(self, fields, k):
+        """[(user id, exact value)] for the k largest values of a field (or sum of fields), best first"""
+        key = self.key(fields)
+        if k < len(key):
+            candidates = np.argpartition(-key, k - 1)[:k]
+            threshold = key[candidates].min()
+            if abs(threshold) >= FLOAT_EXACT_LIMIT:
+                # Rounded keys can tie distinct values; re-rank everything that reaches the cut exactly
+                candidates = np.flatnonzero(key >= threshold)
+        else:
+            candidates = np.arange(len(key))
+        value = lambda slot: sum(self.exact(field, slot) for field in fields)
+        ranked = sorted(candidates.tolist(), key=value, reverse=True)[:k]
+        return [(str(int(self.slot_uids[slot])), value(slot)) for slot in ranked]
+
+    def owned_counts(self, mask):
+        """How many of the items in a bitset mask each slot holds"""
+        words = min(len(mask), self.owned.shape[1])
+        return np.bitwise_count(self.owned[:self.size, :words] & mask[:words]).sum(axis=1, dtype=np.int64)
+
+    def completed(self, mask, total):
+        """User ids holding every item in a mask of `total` items"""
+        if not total:
+            return []
+        return [str(uid) for uid in self.slot_uids[:self.size][self.owned_counts(mask) == total].tolist()]
+
+    def percentiles(self, fields, qs):
+        return np.percentile(self.key(fields), qs) if self.size else np.zeros(len(qs))
+
+    def gini(self, fields):
+        """Gini coefficient of a field (negative balances count as zero)"""
+        values = np.sort(np.clip(self.key(fields), 0, None))
+        total = values.sum()
+        if not total:
+            return 0.0
+        n = len(values)
+        return float(2 * np.dot(np.arange(1, n + 1), values) / (n * total) - (n + 1) / n)
+
+# --- Paged User Store ---
+USERS_FILE = "users.json"          # legacy format; imported when there is no snapshot yet
+WIN_FILE = "win.json"              # legacy lottery counts, imported alongside users.json
+USER_BASE_FILE = "users.db"        # snapshot: immutable, sorted by user id, rewritten by compaction
+USER_LOG_FILE = "users.log"        # records written since the last compaction
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))  # resident records
+USER_FLUSH_INTERVAL = 2            # seconds between write-backs of dirty records
+USER_COMPACT_MIN_BYTES = 8 * 2 ** 20
+USER_COMPACT_RATIO = 0.5           # compact once the log is this big relative to the base data
+SNAPSHOT_MAGIC = b"MDCU"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHH")   # magic, format version, section count
+SNAPSHOT_SECTION = struct.Struct("<8sQQ")  # section name, offset, length
+USER_LOG_FRAME = struct.Struct("<QI")      # user id, record length
+LOTTERY_LOG_ID = 0                 # log frames for these ids hold store metadata;
+ITEM_NAMES_LOG_ID = 1              # Discord ids are never this small
+META_LOG_IDS = (LOTTERY_LOG_ID, ITEM_NAMES_LOG_ID)
+LOTTERY_NUMBERS = 100
+
+class ItemRegistry:
+    """Stable integer ids for item names: assigned on first sight, never renumbered or reused"""
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.ids = {name: item_id for item_id, name in enumerate(self.names)}
+        self.dirty = False
+
+    def id(self, name):
+        item_id = self.ids.get(name)
+        if item_id is None:
+            item_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.dirty = True
+        return item_id
+
+    def name(self, item_id):
+        return self.names[item_id] if item_id < len(self.names) else f"Unknown Item #{item_id}"
+
+def pack_inventory(inventory, registry):
+    """{name: count} -> array of id, count pairs"""
+    packed = array("q")
+    for name, count in inventory.items():
+        packed.append(registry.id(name))
+        packed.append(count)
+    return packed
+
+def unpack_inventory(packed, registry):
+    """Array of id, count pairs -> {name: count}"""
+    return {registry.name(packed[i]): packed[i + 1] for i in range(0, len(packed), 2)}
+
+def encode_user(data):
+    """Compact JSON for a stored record (inventories as flat [id, count, ...] lists) or store metadata"""
+    if isinstance(data, dict) and isinstance(data.get("inventory"), array):
+        data = dict(data, inventory=data["inventory"].tolist())
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def decode_user(raw, registry):
+    """Stored record -> resident record; name-keyed inventories from older files are packed on the way in"""
+    data = json.loads(raw)
+    inventory = data.get("inventory")
+    if isinstance(inventory, dict):
+        data["inventory"] = pack_inventory(inventory, registry)
+    elif inventory is not None:
+        data["inventory"] = array("q", inventory)
+    return data
+
+def pack_user(data, registry):
+    """A private copy of a user record for the store, with the inventory packed"""
+    packed = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in data.items()}
+    if isinstance(packed.get("inventory"), dict):
+        packed["inventory"] = pack_inventory(packed["inventory"], registry)
+    return packed
+
+def unpack_user(data, registry):
+    """A private copy of a stored record, with item names back in the inventory"""
+    unpacked = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in data.items()}
+    if isinstance(unpacked.get("inventory"), array):
+        unpacked["inventory"] = unpack_inventory(unpacked["inventory"], registry)
+    return unpacked
+
+def file_stamp(path):
+    """(size, mtime) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def write_snapshot(path, uids, lengths, payloads, lottery, item_names, columns, overflow, owned, holdings, sources):
+    """Write a snapshot: header, section table, then 8-byte aligned sections with the records last.
+
+    Sections: uids (sorted uint64), offsets (uint64, count + 1, into records),
+    lottery (uint64 count per number), items (JSON list of item names by id),
+    columns (each of USER_COLUMNS in turn, one row per uid), colnames and
+    overflow (JSON: names, and exact values of saturated cells by uid), owned
+    (uint64 owned-item bitsets, one equal-width row per uid), holdids,
+    holdqty and holdoffs (uint32 item ids and int64 counts of every uid's
+    holdings back to back, and uint64 offsets into them, count + 1), sources
+    (JSON stamps of the files it was imported from) and records (compact
+    JSON, streamed from `payloads`).
+    """
+    offsets = np.zeros(len(uids) + 1, dtype="<u8")
+    np.cumsum(lengths, out=offsets[1:])
+    sections = [
+        (b"uids", np.asarray(uids, dtype="<u8").tobytes()),
+        (b"offsets", offsets.tobytes()),
+        (b"lottery", np.asarray(lottery, dtype="<u8").tobytes()),
+        (b"items", json.dumps(item_names).encode("utf-8")),
+        (b"columns", b"".join(np.asarray(columns[field], dtype=dtype).tobytes() for field, dtype in USER_COLUMNS.items())),
+        (b"colnames", json.dumps(list(USER_COLUMNS)).encode("utf-8")),
+        (b"overflow", json.dumps(overflow).encode("utf-8")),
+        (b"owned", np.ascontiguousarray(owned, dtype="<u8").tobytes()),
+        (b"holdids", np.asarray(holdings[0], dtype="<u4").tobytes()),
+        (b"holdqty", np.asarray(holdings[1], dtype="<i8").tobytes()),
+        (b"holdoffs", np.asarray(holdings[2], dtype="<u8").tobytes()),
+        (b"sources", json.dumps(sources).encode("utf-8")),
+    ]
+    table = []
+    position = SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * (len(sections) + 1)
+    for name, blob in sections + [(b"records", None)]:
+        position = -(-position // 8) * 8
+        table.append((name, position, len(blob) if blob is not None else int(offsets[-1])))
+        position += table[-1][2]
+
+    with open(path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(table)))
+        for entry in table:
+            f.write(SNAPSHOT_SECTION.pack(*entry))
+        for (name, blob), (_, offset, _) in zip(sections, table):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+        f.write(b"\0" * (table[-1][1] - f.tell()))
+        for payload in payloads:
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    return position
+
+def snapshot_sections(buf):
+    """{name: (offset, length)} for a mapped snapshot, or None if it isn't one this version can read"""
+    if len(buf) < SNAPSHOT_HEADER.size:
+        return None
+    magic, version, count = SNAPSHOT_HEADER.unpack_from(buf, 0)
+    if magic != SNAPSHOT_MAGIC:
+        return None
+    if version != SNAPSHOT_VERSION:
+        return None
+    sections = {}
+    for i in range(count):
+        name, offset, length = SNAPSHOT_SECTION.unpack_from(buf, SNAPSHOT_HEADER.size + i * SNAPSHOT_SECTION.size)
+        sections[name.rstrip(b"\0")] = (offset, length)
+    return sections
+
+class UserRecord:
+    __slots__ = ("data", "dirty", "view")
+
+    def __init__(self, data, dirty=False):
+        self.data = data
+        self.dirty = dirty
+        self.view = None  # InventoryView, built on first use
+
+class UserStore:
+    """User records paged in from disk on demand, with an LRU of resident records.
+
+    The snapshot is memory-mapped and searched by id, so opening it costs the
+    same for 1k or 1M users. Changed records stay dirty in the LRU and are
+    appended to the log on eviction or flush(); the newest log copy of a user
+    (`overlay`) wins over the snapshot. compact() folds the log into a new snapshot.
+
+    Resident and stored inventories are packed id/count arrays; `item_ids` maps
+    them to names. Lottery counts and the item names are logged under META_LOG_IDS.
+    """
+
+    def __init__(self, base_path=USER_BASE_FILE, log_path=USER_LOG_FILE, cache_size=USER_CACHE_SIZE):
+        self.base_path = base_path
+        self.log_path = log_path
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()  # user id -> UserRecord, least recently used first
+        self.dirty = 0
+        self.lottery_dirty = False
+        self.opened = False
+        self.background = asyncio.Lock()  # held by worker-thread jobs reading the snapshot and log
+        self.masks, self.masks_version = {}, None
+
+    # Files
+    def open(self):
+        if not self.map_base():
+            # First start: the JSON files seed the snapshot, which is the source of truth from then on
+            self.import_json(USERS_FILE, WIN_FILE)
+            self.map_base()
+        self.scan_log()
+        for name in load_items():  # items added to the catalog since the last start get the next ids
+            self.item_ids.id(name)
+        self.opened = True
+
+    def migrate(self, users_path, win_path):
+        """Replace every user with the contents of users.json-format files (an explicit admin action).
+
+        The current snapshot and log are kept next to the new ones as .old files.
+        """
+        self.close()
+        for path in (self.base_path, self.log_path):
+            if os.path.exists(path):
+                os.replace(path, path + ".old")
+        self.import_json(users_path, win_path)
+        self.open()
+
+    def close(self):
+        if not self.opened:
+            return
+        self.flush()
+        self.unmap()
+        self.log.close()
+        self.log_reader.close()
+        self.cache.clear()
+        self.opened = False
+
+    def map_base(self):
+        """Map the snapshot; False if there is none yet. An unreadable one is an error, never replaced silently"""
+        if not os.path.exists(self.base_path):
+            return False
+        self.base_file = open(self.base_path, "rb")
+        self.base = mmap.mmap(self.base_file.fileno(), 0, access=mmap.ACCESS_READ)
+        sections = snapshot_sections(self.base)
+        if sections is None or self.section_json(sections, b"colnames", []) != list(USER_COLUMNS):
+            self.base.close()
+            self.base_file.close()
+            raise RuntimeError(f"{self.base_path} is not a snapshot this version can read; move it aside to re-import JSON")
+        self.sources = self.section_json(sections, b"sources", {})  # provenance only
+
+        offset, length = sections[b"uids"]
+        self.uids = np.frombuffer(self.base, dtype="<u8", count=length // 8, offset=offset)
+        offset, length = sections[b"offsets"]
+        self.offsets = np.frombuffer(self.base, dtype="<u8", count=length // 8, offset=offset)
+        self.data_start = sections[b"records"][0]
+        offset, length = sections[b"lottery"]
+        self.lottery = np.frombuffer(self.base, dtype="<u8", count=length // 8, offset=offset).tolist()
+        self.item_ids = ItemRegistry(self.section_json(sections, b"items", []))
+
+        offset, length = sections[b"columns"]
+        count = len(self.uids)
+        self.snapshot_columns = {
+            field: np.frombuffer(self.base, dtype=dtype, count=count, offset=offset + 8 * count * i)
+            for i, (field, dtype) in enumerate(USER_COLUMNS.items())
+        }
+        self.snapshot_overflow = self.section_json(sections, b"overflow", {})
+        offset, length = sections[b"owned"]
+        words = length // (8 * count) if count else 1
+        self.snapshot_owned = np.frombuffer(self.base, dtype="<u8", count=count * words, offset=offset).reshape(count, words)
+        # Holdings can be large, so they stay on disk, mapped separately from the store's mapping
+        self.snapshot_holdings = tuple(map_section(self.base_path, dtype, *sections[name])
+                                       for name, dtype in ((b"holdids", "<u4"), (b"holdqty", "<i8"), (b"holdoffs", "<u8")))
+        rows = {int(np.searchsorted(self.uids, np.uint64(uid))): fields for uid, fields in self.snapshot_overflow.items()}
+        self.columns = UserColumns(self.uids, self.snapshot_columns, rows, self.snapshot_owned, self.snapshot_holdings)
+        return True
+
+    def section_json(self, sections, name, default):
+        if name not in sections:
+            return default
+        offset, length = sections[name]
+        return json.loads(self.base[offset:offset + length])
+
+    def scan_log(self):
+        """Index the newest log copy of every user, dropping a torn final frame"""
+        self.overlay = {}  # user id -> (offset, length) in the log
+        data = b""
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+        offset = 0
+        while offset + USER_LOG_FRAME.size <= len(data):
+            uid, length = USER_LOG_FRAME.unpack_from(data, offset)
+            if offset + USER_LOG_FRAME.size + length > len(data):
+                break
+            self.overlay[uid] = (offset + USER_LOG_FRAME.size, length)
+            offset += USER_LOG_FRAME.size + length
+        with open(self.log_path, "ab") as f:
+            f.truncate(offset)
+        self.log = open(self.log_path, "ab")
+        self.log_reader = open(self.log_path, "rb")
+        self.log_size = offset
+        if LOTTERY_LOG_ID in self.overlay:
+            start, length = self.overlay.pop(LOTTERY_LOG_ID)
+            self.lottery = json.loads(data[start:start + length])
+        if ITEM_NAMES_LOG_ID in self.overlay:
+            start, length = self.overlay.pop(ITEM_NAMES_LOG_ID)
+            self.item_ids = ItemRegistry(json.loads(data[start:start + length]))
+        for uid, (start, length) in self.overlay.items():
+            self.columns.update(uid, json.loads(data[start:start + length]))
+
+    def unmap(self):
+        # Release the buffer exports before closing the map
+        del self.uids, self.offsets
+        self.snapshot_columns = self.snapshot_owned = self.snapshot_holdings = None
+        self.base.close()
+        self.base_file.close()
+
+    def import_lottery(self, path):
+        counts = [0] * (LOTTERY_NUMBERS + 1)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                raw = f.read()
+            record_storage_io("import_lottery", bytes_read=len(raw))
+            for number, info in (json.loads(raw) if raw.strip() else {}).items():
+                if number.isdigit() and int(number) <= LOTTERY_NUMBERS:
+                    counts[int(number)] = info.get("count", 0)
+        return counts
+
+    def import_json(self, users_path, win_path):
+        """Build a snapshot from users.json and win.json (either may be missing)"""
+        users = {}
+        if os.path.exists(users_path):
+            with open(users_path, "rb") as f:
+                raw = f.read()
+            record_storage_io("import_users", bytes_read=len(raw))
+            users = {int(uid): data for uid, data in json.loads(raw).items() if uid.isdigit()}
+        uids = sorted(users)
+        registry = ItemRegistry(load_items())  # catalog order gives the first ids
+        records = [pack_user(users[uid], registry) for uid in uids]
+        payloads = [encode_user(record) for record in records]
+        columns, rows, owned, holdings = columns_from_records(records)
+        overflow = {str(uids[row]): fields for row, fields in rows.items()}
+        sources = {path: file_stamp(path) for path in (users_path, win_path) if file_stamp(path)}
+        write_snapshot(self.base_path + ".tmp", uids, [len(p) for p in payloads], payloads,
+                       self.import_lottery(win_path), registry.names, columns, overflow, owned, holdings, sources)
+        os.replace(self.base_path + ".tmp", self.base_path)
+
+    # Records
+    def read_disk(self, uid):
+        if uid in self.overlay:
+            offset, length = self.overlay[uid]
+            self.log_reader.seek(offset)
+            return self.log_reader.read(length)
+        # A plain int would be compared as float64, which can't tell snowflakes apart
+        i = int(np.searchsorted(self.uids, np.uint64(uid)))
+        if i < len(self.uids) and self.uids[i] == uid:
+            return self.base[self.data_start + int(self.offsets[i]):self.data_start + int(self.offsets[i + 1])]
+        return None
+
+    def get(self, user_id):
+        """The resident record for a user (do not mutate), or None if they were never saved"""
+        if not self.opened:
+            self.open()
+        uid = int(user_id)
+        record = self.cache.get(uid)
+        if record is not None:
+            self.cache.move_to_end(uid)
+            record_cache("users", True)
+            return record.data
+        record_cache("users", False)
+        raw = self.read_disk(uid)
+        if raw is None:
+            return None
+        record_storage_io("load_user", bytes_read=len(raw))
+        data = decode_user(raw, self.item_ids)
+        self.admit(uid, UserRecord(data))
+        return data
+
+    def put(self, user_id, data):
+        """Replace a user's record; it reaches disk on eviction or the next flush()"""
+        if not self.opened:
+            self.open()
+        uid = int(user_id)
+        record = self.cache.get(uid)
+        if record is None:
+            record = UserRecord(data)
+            self.admit(uid, record)
+        else:
+            if record.view is not None:
+                if record.view.value_version == self.value_version():
+                    record.view.update(record.data.get("inventory", ()), data.get("inventory", ()), self.item_info)
+                else:
+                    record.view = None
+            record.data = data
+            self.cache.move_to_end(uid)
+        if not record.dirty:
+            record.dirty = True
+            self.dirty += 1
+        self.columns.update(uid, data)
+        record_storage_io("write_user")
+
+    def inventory_view(self, user_id):
+        """The value-sorted view of a user's inventory (None for unknown users); patched by every put()"""
+        data = self.get(user_id)
+        if data is None:
+            return None
+        record = self.cache[int(user_id)]
+        item_catalog.load()  # picks up catalog edits, which bump the version
+        if record.view is None or record.view.value_version != self.value_version():
+            record.view = InventoryView(data.get("inventory", ()), self.item_info, self.value_version())
+        return record.view
+
+    def value_version(self):
+        """Changes whenever item values may have: a catalog reload or a price table refresh"""
+        return item_catalog.version, item_prices.version
+
+    def item_info(self, item_id):
+        """(sell value, rarity rank, rarity) of an item id"""
+        value, rank, rarity = item_catalog.info.get(self.item_ids.name(item_id), (0, None, None))
+        return item_prices.value(item_id, value), rank, rarity
+
+    def collection_masks(self):
+        """{rarity: (bitset of the catalog's item ids, item count)} in rarity order, rebuilt when the catalog changes"""
+        item_catalog.load()
+        if self.masks_version != item_catalog.version:
+            tiers = collections.defaultdict(list)
+            for name, (value, rank, rarity) in item_catalog.info.items():
+                tiers[rarity.lower()].append(self.item_ids.id(name))
+            self.masks = {}
+            for rarity in sorted(tiers, key=lambda rarity: RARITY_RANK.get(rarity, 0)):
+                ids = np.array(tiers[rarity], dtype=np.int64)
+                self.masks[rarity] = (owned_matrix([ids])[0], len(ids))
+            self.masks_version = item_catalog.version
+        return self.masks
+
+    def count_lottery(self, numbers):
+        """Add one draw of each number to the lottery counts; returns the counts"""
+        if not self.opened:
+            self.open()
+        for number in numbers:
+            self.lottery[number] += 1
+        self.lottery_dirty = True
+        record_storage_io("write_lottery")
+        return self.lottery
+
+    def admit(self, uid, record):
+        self.cache[uid] = record
+        while len(self.cache) > self.cache_size:
+            old_uid, old = self.cache.popitem(last=False)
+            if old.dirty:
+                self.append_log([(old_uid, old.data)])
+                self.dirty -= 1
+
+    def append_log(self, records):
+        if self.item_ids.dirty:
+            # New item ids go to disk ahead of the first record that uses them
+            records = [(ITEM_NAMES_LOG_ID, self.item_ids.names)] + records
+            self.item_ids.dirty = False
+        written = 0
+        for uid, data in records:
+            payload = encode_user(data)
+            self.log.write(USER_LOG_FRAME.pack(uid, len(payload)))
+            self.log.write(payload)
+            if uid not in META_LOG_IDS:
+                self.overlay[uid] = (self.log_size + USER_LOG_FRAME.size, len(payload))
+            self.log_size += USER_LOG_FRAME.size + len(payload)
+            written += USER_LOG_FRAME.size + len(payload)
+        self.log.flush()
+        record_storage_io("flush_users", bytes_written=written)
+
+    def flush(self):
+        """Write every dirty resident record (and changed lottery counts) to the log"""
+        if not self.opened:  # nothing can be dirty before the files are open
+            return
+        if not self.dirty and not self.lottery_dirty and not self.item_ids.dirty:
+            return
+        dirty = [(uid, record.data) for uid, record in self.cache.items() if record.dirty]
+        if self.lottery_dirty:
+            dirty.append((LOTTERY_LOG_ID, self.lottery))
+        self.append_log(dirty)
+        for uid, _ in dirty:
+            if uid not in META_LOG_IDS:
+                self.cache[uid].dirty = False
+        self.dirty = 0
+        self.lottery_dirty = False
+
+    def items(self):
+        """Every (user id, stored record) pair, inventories packed; a full scan for leaderboards and exports"""
+        if not self.opened:
+            self.open()
+        seen = set()
+        for uid, record in list(self.cache.items()):
+            seen.add(uid)
+            yield str(uid), record.data
+        for uid, (offset, length) in list(self.overlay.items()):
+            if uid not in seen:
+                seen.add(uid)
+                self.log_reader.seek(offset)
+                yield str(uid), decode_user(self.log_reader.read(length), self.item_ids)
+        start = self.data_start
+        offsets = self.offsets.tolist()
+        for i, uid in enumerate(self.uids.tolist()):
+            if uid not in seen:
+                yield str(uid), decode_user(self.base[start + offsets[i]:start + offsets[i + 1]], self.item_ids)
+        record_storage_io("load_users", bytes_read=len(self.base) + self.log_size)
+
+    def stored_items(self, overlay, registry):
+        """Every (user id, stored record) in the snapshot and a copy of the overlay, inventories packed.
+
+        The log is read through its own handle, so this is safe in a thread while `background` is held.
+        """
+        with open(self.log_path, "rb") as log:
+            for uid, (offset, length) in overlay.items():
+                log.seek(offset)
+                yield str(uid), decode_user(log.read(length), registry)
+        start = self.data_start
+        offsets = self.offsets.tolist()
+        for i, uid in enumerate(self.uids.tolist()):
+            if uid not in overlay:
+                yield str(uid), decode_user(self.base[start + offsets[i]:start + offsets[i + 1]], registry)
+
+    def __len__(self):
+        if not self.opened:
+            self.open()
+        return self.columns.size
+
+    # Compaction
+    def needs_compaction(self):
+        if not self.opened or self.background.locked():
+            return False
+        base_bytes = len(self.base) - self.data_start
+        return self.log_size > max(USER_COMPACT_MIN_BYTES, base_bytes * USER_COMPACT_RATIO)
+
+    def write_merged_base(self, path, overlay, lottery, item_names):
+        """Merge the snapshot with a copy of the overlay into a new snapshot (safe to run in a thread)"""
+        base_lengths = np.diff(self.offsets)
+        log_uids = np.array(sorted(overlay), dtype="<u8")
+        log_lengths = np.array([overlay[uid][1] for uid in log_uids.tolist()], dtype="<u8")
+        keep = np.flatnonzero(~np.isin(self.uids, log_uids))
+        uids = np.concatenate([self.uids[keep], log_uids])
+        lengths = np.concatenate([base_lengths[keep], log_lengths])
+        order = np.argsort(uids, kind="stable")
+
+        # Columns come from the records being written, not the live mirror, which may already be ahead
+        base_columns, base_overflow = self.snapshot_columns, self.snapshot_overflow
+        base_owned, base_holdings = self.snapshot_owned, self.snapshot_holdings
+        with open(self.log_path, "rb") as log:
+            def log_records():
+                for uid in log_uids.tolist():
+                    offset, length = overlay[uid]
+                    log.seek(offset)
+                    yield json.loads(log.read(length))
+            log_columns, rows, log_owned, log_holdings = columns_from_records(log_records())
+        columns = {field: np.concatenate([base_columns[field][keep], log_columns[field]])[order] for field in USER_COLUMNS}
+        words = max(base_owned.shape[1], log_owned.shape[1])
+        owned = np.concatenate([widen_bitsets(base_owned[keep], words), widen_bitsets(log_owned, words)])[order]
+        held_offsets = np.concatenate([base_holdings[2][:-1], log_holdings[2] + base_holdings[2][-1]])
+        index, offsets = gather_runs(held_offsets, np.concatenate([keep, len(self.uids) + np.arange(len(log_uids))])[order])
+        holdings = tuple(np.concatenate([base, log])[index] for base, log in zip(base_holdings[:2], log_holdings[:2])) + (offsets,)
+        overflow = {uid: fields for uid, fields in base_overflow.items() if int(uid) not in overlay}
+        overflow.update({str(int(log_uids[row])): fields for row, fields in rows.items()})
+
+        def payloads():
+            with open(self.log_path, "rb") as log:
+                for index in order.tolist():
+                    if index < len(keep):
+                        i = int(keep[index])
+                        yield self.base[self.data_start + int(self.offsets[i]):self.data_start + int(self.offsets[i + 1])]
+                    else:
+                        offset, length = overlay[int(log_uids[index - len(keep)])]
+                        log.seek(offset)
+                        yield log.read(length)
+
+        return write_snapshot(path, uids[order], lengths[order], payloads(), lottery, item_names,
+                              columns, overflow, owned, holdings, self.sources)
+
+    def swap_in(self, path, upto):
+        """Install a merged snapshot; log frames written after `upto` carry over to the new log"""
+        with open(self.log_path, "rb") as f:
+            f.seek(upto)
+            tail = f.read()
+        with open(self.log_path + ".tmp", "wb") as f:
+            f.write(tail)
+        lottery, item_ids = self.lottery, self.item_ids
+        self.unmap()
+        self.log.close()
+        self.log_reader.close()
+        # A crash between these two leaves the old log over the new snapshot, which replays harmlessly
+        os.replace(path, self.base_path)
+        os.replace(self.log_path + ".tmp", self.log_path)
+        self.map_base()
+        self.scan_log()
+        self.lottery, self.item_ids = lottery, item_ids  # may have changed while the snapshot was written
+        for uid, record in self.cache.items():
+            if record.dirty:
+                self.columns.update(uid, record.data)
+
+    def compact(self):
+        """Fold the log into a new snapshot, blocking"""
+        self.flush()
+        upto = self.log_size
+        written = self.write_merged_base(self.base_path + ".tmp", dict(self.overlay), list(self.lottery), list(self.item_ids.names))
+        self.swap_in(self.base_path + ".tmp", upto)
+        record_storage_io("compact_users", bytes_written=written)
+
+    async def compact_in_background(self):
+        """Write the merged snapshot in a worker thread; only the final swap runs on the loop"""
+        async with self.background:
+            self.flush()
+            upto = self.log_size
+            written = await asyncio.to_thread(self.write_merged_base, self.base_path + ".tmp",
+                                              dict(self.overlay), list(self.lottery), list(self.item_ids.names))
+            self.swap_in(self.base_path + ".tmp", upto)
+            record_storage_io("compact_users", bytes_written=written)
+
+user_store = UserStore()
+FLUSH_SOURCES["users"] = lambda: user_store.dirty + user_store.lottery_dirty
+
+def user_columns():
+    """The live column mirror of every user's scalar fields, owned items and holdings"""
+    if not user_store.opened:
+        user_store.open()
+    return user_store.columns
+
+def item_supply(item_name):
+    """(copies held across all users, users holding any) for an item"""
+    columns = user_columns()
+    item_id = user_store.item_ids.ids.get(item_name)
+    return columns.item_supply(item_id) if item_id is not None else (0, 0)
+
+def reset_storage():
+    """Reopen the user store from whatever is on disk (used by bench.py between datasets)"""
+    global user_store
+    user_store.close()
+    user_store = UserStore()
+    user_store.open()
+
+EXPORT_USERS_FILE = "users.export.json"
+EXPORT_WIN_FILE = "win.export.json"
+
+async def export_json(users_path=EXPORT_USERS_FILE, win_path=EXPORT_WIN_FILE):
+    """Write every user and the lottery counts in the users.json / win.json format; returns the user count.
+
+    Users are streamed one at a time from a worker thread, off a flushed view of
+    the store that compaction leaves alone meanwhile. !import loads the files back in.
+    """
+    if not user_store.opened:
+        user_store.open()
+    async with user_store.background:
+        user_store.flush()
+        registry = ItemRegistry(list(user_store.item_ids.names))
+        users = user_store.stored_items(dict(user_store.overlay), registry)
+        count = await asyncio.to_thread(write_export, users, registry, lottery_counts(), users_path, win_path)
+    record_storage_io("export_users", bytes_written=os.path.getsize(users_path))
+    return count
+
+def write_export(users, registry, lottery, users_path, win_path):
+    count = 0
+    with open(users_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("{")
+        for user_id, data in users:
+            body = json.dumps(unpack_user(data, registry), indent=2).replace("\n", "\n  ")
+            f.write(f'{"," if count else ""}\n  "{user_id}": {body}')
+            count += 1
+        f.write("\n}")
+    with open(win_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(lottery, f, indent=2)
+    os.replace(users_path + ".tmp", users_path)
+    os.replace(win_path + ".tmp", win_path)
+    return count
+
+# --- Item Catalog & Inventory Valuation ---
+RARITY_ORDER = ["common", "uncommon", "rare", "epic", "legendary", "mythic", "cosmic", "null"]
+RARITY_RANK = {rarity: rank for rank, rarity in enumerate(RARITY_ORDER)}  # unknown rarities rank as common
+
+class ItemCatalog:
+    """items.json, re-read only when the file changes; `version` bumps on every reload"""
+
+    def __init__(self, path="items.json"):
+        self.path = path
+        self.stamp = None
+        self.items = {}
+        self.info = {}  # name -> (value, rarity rank, rarity)
+        self.version = 0
+
+    def load(self):
+        stamp = file_stamp(self.path)
+        record_cache("items", stamp == self.stamp)
+        if stamp != self.stamp:
+            self.items = {}
+            if stamp is not None:
+                with open(self.path, "rb") as f:
+                    raw = f.read()
+                record_storage_io("load_items", bytes_read=len(raw))
+                self.items = json.loads(raw)
+            self.info = {}
+            for name, data in self.items.items():
+                rarity = data.get("rarity", "common")
+                self.info[name] = (data.get("value", 0), RARITY_RANK.get(rarity.lower(), 0), rarity)
+            self.stamp = stamp
+            self.version += 1
+        return self.items
+
+item_catalog = ItemCatalog()
+
+class InventoryView:
+    """An inventory's total value, value-sorted order and best item per rarity, patched item by item.
+
+    `info_of(item_id)` gives (value, rarity rank, rarity); rank is None for
+    items missing from the catalog, which count for value 0 and no rarity.
+    """
+    __slots__ = ("counts", "order", "total", "by_rarity", "rarity_counts", "value_version")
+
+    def __init__(self, packed, info_of, value_version):
+        self.counts = {}                                    # item id -> quantity
+        self.order = []                                     # (-value, item id), best first
+        self.total = 0
+        self.by_rarity = [[] for _ in RARITY_ORDER]         # the same, split by rarity rank
+        self.rarity_counts = [0] * len(RARITY_ORDER)        # quantity held per rarity rank
+        self.value_version = value_version
+        for item_id, count in zip(packed[::2], packed[1::2]):
+            self.set(item_id, count, info_of)
+
+    def set(self, item_id, count, info_of):
+        value, rank, _ = info_of(item_id)
+        old = self.counts.pop(item_id, 0)
+        if old:
+            del self.order[bisect.bisect_left(self.order, (-value, item_id))]
+            if rank is not None:
+                ranked = self.by_rarity[rank]
+                del ranked[bisect.bisect_left(ranked, (-value, item_id))]
+        if count:
+            self.counts[item_id] = count
+            bisect.insort(self.order, (-value, item_id))
+            if rank is not None:
+                bisect.insort(self.by_rarity[rank], (-value, item_id))
+        self.total += value * (count - old)
+        if rank is not None:
+            self.rarity_counts[rank] += count - old
+
+    def update(self, old_packed, new_packed, info_of):
+        """Apply the difference between two packed inventories"""
+        old = dict(zip(old_packed[::2], old_packed[1::2]))
+        new = dict(zip(new_packed[::2], new_packed[1::2]))
+        for item_id in old.keys() | new.keys():
+            if old.get(item_id) != new.get(item_id):
+                self.set(item_id, new.get(item_id, 0), info_of)
+
+    def best(self):
+        """Item id of the most valuable item of the highest rarity held, or None"""
+        for ranked in reversed(self.by_rarity):
+            if ranked:
+                return ranked[0][1]
+        return None
+
+    def page(self, start, stop):
+        """[(item id, quantity, value each)] for positions start..stop in value order"""
+        return [(item_id, self.counts[item_id], -value) for value, item_id in self.order[start:stop]]
+
 # --- User Data Functions ---
-def load_users():
-    """Load user data from JSON file"""
-    if os.path.exists('users.json'):
-        with open('users.json', 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """Save user data to JSON file"""
-    with open('users.json', 'w') as f:
-        json.dump(users, f, indent=2)
+HOUSE_ACCOUNT_ID = os.getenv("HOUSE_ACCOUNT_ID", "946865197757399040")  # fancyduckguy's Discord ID
+HOUSE_SETTLE_INTERVAL = 30  # seconds between writes of accumulated house credits
+
+def read_user(user_id):
+    """A private copy of a stored user record, or None"""
+    data = user_store.get(user_id)
+    return unpack_user(data, user_store.item_ids) if data is not None else None
+
+def commit_user(user_id, record, expected_version=None):
+    """Store a changed record, as a compare-and-swap on its version, unlocking any achievements it crossed"""
+    stored = user_store.get(user_id)
+    version = stored.get("version", 0) if stored is not None else 0
+    if expected_version is not None and version != expected_version:
+        raise VersionConflict(user_id, expected_version, version)
+    unlocked = unlock_achievements(stored or {}, record) if str(user_id) != HOUSE_ACCOUNT_ID else []
+    record["version"] = version + 1
+    user_store.put(user_id, pack_user(record, user_store.item_ids))
+    if unlocked:
+        announce_achievements(user_id, unlocked)
 
 def load_items():
-    """Load items database from JSON file"""
-    if os.path.exists('items.json'):
-        with open('items.json', 'r') as f:
-            return json.load(f)
-    return {}
+    """Load items database from JSON file (cached until items.json changes; don't mutate it)"""
+    return item_catalog.load()
 
 def get_total_luck(user_id):
-    user = get_user_data(user_id)
+    user = peek_user_data(user_id)
     return user.get("luck", 0) + (user.get("prestige", 0) * 10)
 
 def get_total_money_boost(user_id):
-    user = get_user_data(user_id)
+    user = peek_user_data(user_id)
     return user.get("money_boost", 0) + (user.get("prestige", 0) * 10)
 
-def get_user_data(user_id):
-    """Get user data, create if doesn't exist"""
-    users = load_users()
-    user_id = str(user_id)
-
-    # Default template for new users
-    default_data = {
+def default_user_data():
+    """Template for a user who has never been saved"""
+    return {
         "money": 100,       # Starting money
         "xp": 0,
         "level": 1,
@@ -53,25 +1422,42 @@ def get_user_data(user_id):
         "achievements": [], # List of earned achievements
         "luck": 0,          # Luck % boost
         "money_boost": 0,   # Money % boost
-        "prestige": 0       # Prestige level
+        "prestige": 0,      # Prestige level
+        "counters": {},     # Play counters watched by achievements
+        "version": 0        # Bumped on every write, for compare-and-swap
     }
 
+def get_user_data(user_id):
+    """Get user data, create if doesn't exist"""
+    user_id = str(user_id)
+    user = read_user(user_id)
+
+    # Default template for new users
+    default_data = default_user_data()
+
     # Create new user if not found
-    if user_id not in users:
-        users[user_id] = default_data.copy()
-        save_users(users)
+    if user is None:
+        user = default_data
+        user_store.put(user_id, pack_user(user, user_store.item_ids))
+        log_balance_changes(user_id, {}, default_data)
 
     else:
         # Ensure all keys exist for old users
         updated = False
         for key, value in default_data.items():
-            if key not in users[user_id]:
-                users[user_id][key] = value
+            if key not in user:
+                user[key] = value
                 updated = True
         if updated:
-            save_users(users)
+            user_store.put(user_id, pack_user(user, user_store.item_ids))
+
+    return user
 
-    return users[user_id]
+def peek_user_data(user_id):
+    """Read-only view of a user for display commands: defaults for unknown users, never writes"""
+    data = default_user_data()
+    data.update(read_user(user_id) or {})
+    return data
 
 def update_user_data(
     user_id,
@@ -84,26 +1470,17 @@ def update_user_data(
     achievements=None,
     luck=None,
     money_boost=None,
-    prestige=None
+    prestige=None,
+    expected_version=None
 ):
-    """Update user data"""
-    users = load_users()
+    """Update user data; with expected_version, raise VersionConflict if someone wrote since that read"""
     user_id = str(user_id)
+    users = {user_id: read_user(user_id)}
+    before = dict(users[user_id] or {})
 
     # Initialize user if not exists
-    if user_id not in users:
-        users[user_id] = {
-            "money": 100,
-            "xp": 0,
-            "level": 1,
-            "inventory": {},
-            "last_daily": 0,
-            "bank": 0,
-            "achievements": [],
-            "luck": 0,
-            "money_boost": 0,
-            "prestige": 0
-        }
+    if users[user_id] is None:
+        users[user_id] = default_user_data()
 
     # Update only provided values
     if money is not None:
@@ -127,26 +1504,24 @@ def update_user_data(
     if prestige is not None:
         users[user_id]["prestige"] = prestige
 
-    save_users(users)
+    commit_user(user_id, users[user_id], expected_version)
+    log_balance_changes(user_id, before, users[user_id])
 
 
 def add_item_to_inventory(user_id, item_name, amount=1):
     """Add item(s) to user inventory (luck affects rolls separately)"""
-    users = load_users()
     user_id = str(user_id)
+    user_data = read_user(user_id) or get_user_data(user_id)
 
-    if user_id not in users:
-        users[user_id] = get_user_data(user_id)
-
-    inventory = users[user_id].get("inventory", {})
+    inventory = user_data.get("inventory", {})
 
     if item_name in inventory:
         inventory[item_name] += amount
     else:
         inventory[item_name] = amount
 
-    users[user_id]["inventory"] = inventory
-    save_users(users)
+    user_data["inventory"] = inventory
+    commit_user(user_id, user_data)
     return inventory[item_name]
 
 def remove_item_from_inventory(user_id, item_name, quantity=1):
@@ -176,22 +1551,18 @@ def xp_for_next_level(current_level):
 
 def add_money(user_id, amount):
     """Add money to user with prestige & boosts applied"""
-    users = load_users()
     user_id = str(user_id)
-
-    if user_id not in users:
-        users[user_id] = get_user_data(user_id)
-
-    user_data = users[user_id]
+    user_data = read_user(user_id) or get_user_data(user_id)
 
     # Apply prestige & money_boost
     boost_percent = user_data.get("money_boost")
     final_amount = int(amount * boost_percent)
 
     user_data["money"] += final_amount
-    users[user_id] = user_data
 
-    save_users(users)
+    commit_user(user_id, user_data)
+    if final_amount:
+        ledger.append(user_id, "money", final_amount, user_data["money"], current_command.get())
     return user_data["money"]
     
 def add_xp(user_id, amount):
@@ -213,19 +1584,742 @@ def spend_money(user_id, amount):
         new_money = user_data["money"] - amount
         update_user_data(user_id, money=new_money)
         
-        # Transfer lost coins to fancyduckguy's bank (except if user IS fancyduckguy)
-        if str(user_id) != "946865197757399040":  # fancyduckguy's Discord ID
-            transfer_to_fancyduckguy_bank(amount)
+        # Transfer lost coins to the house bank (except if user IS the house)
+        if str(user_id) != HOUSE_ACCOUNT_ID:
+            transfer_to_house_bank(amount)
         
         return True, new_money
     return False, user_data["money"]
 
-def transfer_to_fancyduckguy_bank(amount):
-    """Transfer coins to fancyduckguy's bank account"""
-    fancyduckguy_id = "946865197757399040"
-    fancyduckguy_data = get_user_data(fancyduckguy_id)
-    new_bank_balance = fancyduckguy_data["bank"] + amount
-    update_user_data(fancyduckguy_id, bank=new_bank_balance)
+# Credits owed to the house bank but not yet written to the user store
+house_pending = 0
+house_pending_transfers = 0
+house_bank_estimate = None  # stored house bank plus pending credits, for ledger balances
+
+def transfer_to_house_bank(amount):
+    """Credit the house bank; the ledger records it now, settle_house_bank() writes it later"""
+    global house_pending, house_pending_transfers, house_bank_estimate
+    if house_bank_estimate is None:
+        house_bank_estimate = peek_user_data(HOUSE_ACCOUNT_ID)["bank"]
+    house_pending += amount
+    house_pending_transfers += 1
+    house_bank_estimate += amount
+    ledger.append(HOUSE_ACCOUNT_ID, "bank", amount, house_bank_estimate, current_command.get())
+
+def settle_house_bank():
+    """Write all accumulated house credits to the house account in one save"""
+    global house_pending, house_pending_transfers, house_bank_estimate
+    if not house_pending_transfers:
+        return
+    house = read_user(HOUSE_ACCOUNT_ID)
+    if house is None:
+        house = default_user_data()
+        log_balance_changes(HOUSE_ACCOUNT_ID, {}, house)
+    house["bank"] = house.get("bank", 0) + house_pending
+    commit_user(HOUSE_ACCOUNT_ID, house)
+    house_pending = house_pending_transfers = 0
+    house_bank_estimate = house["bank"]
+
+FLUSH_SOURCES["house_bank"] = lambda: house_pending_transfers
+
+# --- Achievements ---
+# Each achievement is a threshold on one watched field: a stored scalar, a derived value
+# ("worth", "items") or a play counter from the record's "counters" ("bets", "bets:<game>")
+ACHIEVEMENTS = {
+    "first_coins": {"name": "💰 First Coins", "desc": "Earn your first 1,000 coins", "field": "money", "min": 1000},
+    "high_roller": {"name": "🎰 High Roller", "desc": "Accumulate 10,000 coins", "field": "money", "min": 10000},
+    "millionaire": {"name": "💎 Millionaire", "desc": "Reach 1,000,000 coins", "field": "worth", "min": 1000000},
+    "level_5": {"name": "⭐ Rising Star", "desc": "Reach level 5", "field": "level", "min": 5},
+    "level_10": {"name": "🌟 Experienced", "desc": "Reach level 10", "field": "level", "min": 10},
+    "gambler": {"name": "🎲 Gambler", "desc": "Place your first bet", "field": "bets", "min": 1},
+    "regular": {"name": "🎟️ Regular", "desc": "Place 100 bets", "field": "bets", "min": 100},
+    "slot_fiend": {"name": "🍒 Slot Fiend", "desc": "Play the slots 50 times", "field": "bets:slots", "min": 50},
+    "card_shark": {"name": "🃏 Card Shark", "desc": "Play 50 hands of blackjack", "field": "bets:cards", "min": 50},
+    "collector": {"name": "📦 Collector", "desc": "Own 10 different items", "field": "items", "min": 10},
+    "curator": {"name": "🏛️ Curator", "desc": "Own 50 different items", "field": "items", "min": 50}
+}
+ACHIEVEMENT_FIELDS = {
+    "money": lambda record: record.get("money", 0),
+    "worth": lambda record: record.get("money", 0) + record.get("bank", 0),
+    "level": lambda record: record.get("level", 1),
+    "items": lambda record: distinct_items(record.get("inventory"))
+}
+ACHIEVEMENT_QUEUE_LIMIT = 1000  # pending announcements; past this they're dropped (the unlock is still saved)
+
+def build_achievement_triggers(definitions):
+    """field -> (sorted thresholds, achievement ids), so a write only visits the rules it crosses"""
+    triggers = {}
+    for ach_id, ach in sorted(definitions.items(), key=lambda item: item[1]["min"]):
+        thresholds, ids = triggers.setdefault(ach["field"], ([], []))
+        thresholds.append(ach["min"])
+        ids.append(ach_id)
+    return triggers
+
+ACHIEVEMENT_TRIGGERS = build_achievement_triggers(ACHIEVEMENTS)
+
+def distinct_items(inventory):
+    """Different items in a name-keyed or packed inventory"""
+    if isinstance(inventory, array):
+        return len(inventory) // 2
+    return len(inventory or {})
+
+def achievement_value(record, field):
+    accessor = ACHIEVEMENT_FIELDS.get(field)
+    if accessor is not None:
+        return accessor(record)
+    return (record.get("counters") or {}).get(field, 0)
+
+def unlock_achievements(before, after):
+    """Add the achievements a write from `before` to `after` crossed to after["achievements"]; return their ids"""
+    owned = after.get("achievements") or []
+    unlocked = []
+    for field, (thresholds, ids) in ACHIEVEMENT_TRIGGERS.items():
+        old, new = achievement_value(before, field), achievement_value(after, field)
+        if new <= old:
+            continue
+        for ach_id in ids[bisect.bisect_right(thresholds, old):bisect.bisect_right(thresholds, new)]:
+            if ach_id not in owned:
+                unlocked.append(ach_id)
+    if unlocked:
+        after["achievements"] = owned + unlocked
+    return unlocked
+
+def count_play(user_id, game):
+    """Bump a player's bet counters, overall and for one game"""
+    user_id = str(user_id)
+    user_data = read_user(user_id) or get_user_data(user_id)
+    counters = user_data.setdefault("counters", {})
+    for name in ("bets", f"bets:{game}"):
+        counters[name] = counters.get(name, 0) + 1
+    commit_user(user_id, user_data)
+
+# Where the event being handled came from; unlocks are announced there. Every gateway event
+# runs in its own task, so setting this in a handler doesn't leak into other events.
+current_channel = contextvars.ContextVar("current_channel", default=None)
+achievement_unlocks = asyncio.Queue(maxsize=ACHIEVEMENT_QUEUE_LIMIT)
+
+def announce_achievements(user_id, unlocked):
+    """Queue an unlock message for achievement_announce_loop; background writes have no channel"""
+    channel = current_channel.get()
+    if channel is None:
+        return
+    try:
+        achievement_unlocks.put_nowait((channel, user_id, unlocked))
+    except asyncio.QueueFull:
+        pass
+
+def achievement_embed(user_id, unlocked):
+    embed = discord.Embed(
+        title="🏆 Achievement Unlocked!",
+        description=f"<@{user_id}> earned {len(unlocked)} new achievement{'s' if len(unlocked) > 1 else ''}!",
+        color=discord.Color.gold()
+    )
+    for ach_id in unlocked:
+        embed.add_field(name=ACHIEVEMENTS[ach_id]["name"], value=ACHIEVEMENTS[ach_id]["desc"], inline=False)
+    return embed
+
+# --- Per-User Locks ---
+USER_LOCK_STRIPES = 4096   # users share a lock only when their ids collide modulo this
+                           # (cards and crash hold one for the whole game)
+
+USER_LOCKS = [asyncio.Lock() for _ in range(USER_LOCK_STRIPES)]
+
+class VersionConflict(Exception):
+    """A user record changed between the read a write was based on and the write"""
+
+    def __init__(self, user_id, expected, actual):
+        super().__init__(f"user {user_id} is at version {actual}, expected {expected}")
+        self.user_id = user_id
+
+def user_lock(user_id):
+    return USER_LOCKS[int(user_id) % USER_LOCK_STRIPES]
+
+@contextlib.asynccontextmanager
+async def user_locks(*user_ids):
+    """Hold the locks of several users, taken in stripe order so two transfers can't deadlock"""
+    async with contextlib.AsyncExitStack() as stack:
+        for stripe in sorted({int(uid) % USER_LOCK_STRIPES for uid in user_ids}):
+            await stack.enter_async_context(USER_LOCKS[stripe])
+        yield
+
+def user_locked(func):
+    """Run a command under the author's lock, so its reads, awaits and writes form one span.
+
+    Every writer of a user's record holds that user's lock, so a versioned
+    write inside the span can't conflict; if one ever does, VersionConflict
+    surfaces as a command error rather than being retried.
+    """
+    @functools.wraps(func)
+    async def wrapper(ctx, *args, **kwargs):
+        async with user_lock(ctx.author.id):
+            return await func(ctx, *args, **kwargs)
+    return wrapper
+
+# --- Money Ledger ---
+LEDGER_DIR = "ledger"
+LEDGER_SEGMENT_RECORDS = 65536     # records per segment file (~4.7 MB)
+LEDGER_INDEX_INTERVAL = 60         # seconds between index saves
+# user, delta, balance after, unix time, seq of the user's previous entry (-1 = none), account, reason,
+# RNG stream and draw index behind the outcome (-1 = no draw)
+LEDGER_RECORD = struct.Struct("<QqqdqB15s8sq")
+LEDGER_ACCOUNTS = ["money", "bank"]
+
+class Ledger:
+    """Append-only log of every balance change, split into fixed-size segment files.
+
+    Records are fixed size, so entry `seq` sits at a known offset of segment
+    seq // LEDGER_SEGMENT_RECORDS. Each record points back to the same user's
+    previous entry and `last` maps a user to their newest one, so reading a
+    user's history is a chain of seeks rather than a scan.
+    """
+
+    def __init__(self, path=LEDGER_DIR):
+        self.path = path
+        self.last = {}         # user id -> seq of their newest entry
+        self.next_seq = 0
+        self.indexed_seq = 0   # entries covered by the saved index
+        self.file = None       # append handle on the newest segment
+        self.loaded = False
+
+    def segment_path(self, segment):
+        return os.path.join(self.path, f"{segment:08d}.bin")
+
+    def load(self):
+        """Read the saved index, then replay whatever was appended after it"""
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.next_seq = self.indexed_seq = index["next_seq"]
+            self.last = {int(uid): seq for uid, seq in index["last"].items()}
+            economy.restore(index["economy"])
+
+        size = LEDGER_RECORD.size
+        while os.path.exists(self.segment_path(self.next_seq // LEDGER_SEGMENT_RECORDS)):
+            path = self.segment_path(self.next_seq // LEDGER_SEGMENT_RECORDS)
+            start = (self.next_seq % LEDGER_SEGMENT_RECORDS) * size
+            with open(path, "r+b") as f:
+                f.seek(start)
+                data = f.read()
+                f.truncate(start + len(data) // size * size)  # drop a torn final record
+            for offset in range(0, len(data) - size + 1, size):
+                user_id, delta, balance, at, _, account, reason, _, _ = LEDGER_RECORD.unpack_from(data, offset)
+                self.last[user_id] = self.next_seq
+                self.next_seq += 1
+                economy.observe(user_id, LEDGER_ACCOUNTS[account], delta, balance,
+                                reason.rstrip(b"\0").decode("utf-8", "replace"), at)
+            if self.next_seq % LEDGER_SEGMENT_RECORDS:
+                break
+        self.loaded = True
+
+    def save_index(self):
+        if not self.loaded or self.indexed_seq == self.next_seq:
+            return
+        index_path = os.path.join(self.path, "index.json")
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"next_seq": self.next_seq, "last": self.last, "economy": economy.state()}, f)
+        os.replace(index_path + ".tmp", index_path)
+        self.indexed_seq = self.next_seq
+
+    def append(self, user_id, account, delta, balance, reason):
+        if not self.loaded:
+            self.load()
+        if self.file is None or self.next_seq % LEDGER_SEGMENT_RECORDS == 0:
+            if self.file is not None:
+                self.file.close()
+                self.save_index()
+            self.file = open(self.segment_path(self.next_seq // LEDGER_SEGMENT_RECORDS), "ab")
+
+        user_id = int(user_id)
+        now = time.time()
+        stream, draw_index = current_draw.get() or ("", -1)
+        # Saturate rather than fail on balances past int64 (runaway prestige boosts)
+        self.file.write(LEDGER_RECORD.pack(
+            user_id,
+            min(max(delta, INT64_MIN), INT64_MAX),
+            min(max(balance, INT64_MIN), INT64_MAX),
+            now,
+            self.last.get(user_id, -1),
+            LEDGER_ACCOUNTS.index(account),
+            reason.encode("utf-8")[:15],
+            stream.encode("utf-8")[:8],
+            draw_index
+        ))
+        self.file.flush()
+        self.last[user_id] = self.next_seq
+        self.next_seq += 1
+        record_storage_io("ledger_append", bytes_written=LEDGER_RECORD.size)
+        economy.observe(user_id, account, delta, balance, reason, now)
+
+    def read(self, seq, handles):
+        segment, index = divmod(seq, LEDGER_SEGMENT_RECORDS)
+        if segment not in handles:
+            handles[segment] = open(self.segment_path(segment), "rb")
+        f = handles[segment]
+        f.seek(index * LEDGER_RECORD.size)
+        user_id, delta, balance, at, previous, account, reason, stream, draw_index = LEDGER_RECORD.unpack(
+            f.read(LEDGER_RECORD.size))
+        record_storage_io("ledger_read", bytes_read=LEDGER_RECORD.size)
+        return {
+            "seq": seq, "user_id": user_id, "delta": delta, "balance": balance, "time": at,
+            "previous": previous, "account": LEDGER_ACCOUNTS[account],
+            "reason": reason.rstrip(b"\0").decode("utf-8", "replace"),
+            "stream": stream.rstrip(b"\0").decode("utf-8", "replace"), "draw": draw_index
+        }
+
+    def history(self, user_id, skip=0, limit=10):
+        """A user's entries, newest first, following back-pointers from their last one"""
+        if not self.loaded:
+            self.load()
+        entries = []
+        seq = self.last.get(int(user_id), -1)
+        handles = {}
+        try:
+            while seq >= 0 and len(entries) < skip + limit:
+                entry = self.read(seq, handles)
+                entries.append(entry)
+                seq = entry["previous"]
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries[skip:]
+
+ledger = Ledger()
+FLUSH_SOURCES["ledger_index"] = lambda: ledger.next_seq - ledger.indexed_seq
+
+def log_balance_changes(user_id, before, after):
+    """Ledger an entry for every account whose balance differs between two versions of a record"""
+    for account in LEDGER_ACCOUNTS:
+        delta = after.get(account, 0) - before.get(account, 0)
+        if delta:
+            ledger.append(user_id, account, delta, after[account], current_command.get())
+
+# --- Economy Aggregates ---
+ECONOMY_BUCKET_SECONDS = 60
+ECONOMY_BUCKETS = 24 * 60          # one day of one-minute buckets
+ECONOMY_WINDOWS = {"1h": 3600, "24h": 86400, "all": None}
+# Games that settle the net result only (win: +winnings, loss: -bet), so the stake is reported separately
+NET_SETTLED_GAMES = {"gamble", "cards", "slots", "crash", "coinflip"}
+# Games whose cost and payout are separate ledger entries
+STAKED_GAMES = {"spin", "roll", "lottery", "mine", "buy"}
+
+class RingWindow:
+    """Per-bucket totals over a fixed ring of time buckets, plus an all-time total"""
+
+    def __init__(self, buckets=ECONOMY_BUCKETS, bucket_seconds=ECONOMY_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.values = [0] * buckets
+        self.epochs = [-1] * buckets   # which bucket-epoch each slot currently holds
+        self.all_time = 0
+
+    def add(self, value, at=None):
+        epoch = int((at or time.time()) // self.bucket_seconds)
+        slot = epoch % len(self.values)
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.values[slot] = 0
+        self.values[slot] += value
+        self.all_time += value
+
+    def total(self, seconds=None):
+        """Sum over the last `seconds` (None = all time)"""
+        if seconds is None:
+            return self.all_time
+        buckets = math.ceil(seconds / self.bucket_seconds)
+        oldest = int(time.time() // self.bucket_seconds) - buckets + 1
+        return sum(v for v, e in zip(self.values, self.epochs) if e >= oldest)
+
+    def state(self):
+        return {"all_time": self.all_time, "buckets": [[e, v] for e, v in zip(self.epochs, self.values) if e >= 0]}
+
+    def restore(self, state):
+        """Fold saved totals in (on top of anything added since startup)"""
+        self.all_time += state["all_time"]
+        for epoch, value in state["buckets"]:
+            slot = epoch % len(self.values)
+            if self.epochs[slot] == epoch:
+                self.values[slot] += value
+            elif self.epochs[slot] < epoch:
+                self.epochs[slot], self.values[slot] = epoch, value
+
+class EconomyStats:
+    """Streaming economy aggregates fed by every ledger entry and every accepted bet.
+
+    They are saved with the ledger index and the entries appended after it are
+    replayed on load, so they survive restarts; only stakes of net-settled games
+    accepted since the last index save (which are not ledgered) can be lost in a crash.
+    """
+
+    def __init__(self):
+        self.wagered = collections.defaultdict(RingWindow)   # game -> coins staked
+        self.paid = collections.defaultdict(RingWindow)      # game -> coins returned to players
+        self.rounds = collections.defaultdict(RingWindow)    # game -> bets settled
+        self.flows = collections.defaultdict(RingWindow)     # reason -> net coins created (+) or destroyed (-)
+        self.house_income = RingWindow()
+        self.house_balance = 0
+        self.richest = (0, None)                             # (balance, user id) largest balance seen
+        self.largest_credit = (0, None, None)                # (delta, user id, reason)
+
+    def wager(self, game, stake):
+        self.wagered[game].add(stake)
+        self.paid[game].add(stake)  # the net settlement entries then adjust this down or up
+        self.rounds[game].add(1)
+
+    def observe(self, user_id, account, delta, balance, reason, at):
+        game = reason.split(":")[0]
+        self.flows[reason].add(delta, at)
+        if str(user_id) == HOUSE_ACCOUNT_ID:
+            if account == "bank":
+                self.house_income.add(delta, at)
+                self.house_balance = balance
+            return
+
+        if game in NET_SETTLED_GAMES:
+            self.paid[game].add(delta, at)
+        elif game in STAKED_GAMES:
+            if delta < 0:
+                self.wagered[game].add(-delta, at)
+                self.rounds[game].add(1, at)
+            else:
+                self.paid[game].add(delta, at)
+        if balance > self.richest[0]:
+            self.richest = (balance, user_id)
+        if delta > self.largest_credit[0]:
+            self.largest_credit = (delta, user_id, reason)
+
+    WINDOWS = ("wagered", "paid", "rounds", "flows")
+
+    def state(self):
+        state = {name: {key: window.state() for key, window in getattr(self, name).items()} for name in self.WINDOWS}
+        state.update(house_income=self.house_income.state(), house_balance=self.house_balance,
+                     richest=self.richest, largest_credit=self.largest_credit)
+        return state
+
+    def restore(self, state):
+        for name in self.WINDOWS:
+            for key, window in state[name].items():
+                getattr(self, name)[key].restore(window)
+        self.house_income.restore(state["house_income"])
+        self.house_balance = state["house_balance"]
+        self.richest, self.largest_credit = tuple(state["richest"]), tuple(state["largest_credit"])
+
+    def minted_and_burned(self, seconds=None):
+        """Coins created and destroyed per reason; transfers between players cancel out"""
+        minted, burned = {}, {}
+        for reason, window in self.flows.items():
+            net = window.total(seconds)
+            if net > 0:
+                minted[reason] = net
+            elif net < 0:
+                burned[reason] = -net
+        return minted, burned
+
+economy = EconomyStats()
+
+# --- Dynamic Item Pricing ---
+DYNAMIC_PRICING = os.getenv("DYNAMIC_PRICING", "0") == "1"  # off: items always sell at their items.json value
+PRICE_REFRESH_INTERVAL = 60       # seconds between price table rebuilds
+PRICE_SUPPLY_ELASTICITY = 0.5     # value scales with (rarity's average supply / item's supply) ** this
+PRICE_SELL_WINDOW = 3600          # seconds of sell volume that weigh on the price
+PRICE_SELL_PRESSURE = 4.0         # selling a quarter of an item's circulation in the window halves its price
+PRICE_FLOOR, PRICE_CEILING = 0.25, 2.0  # bounds on the multiplier applied to the catalog value
+
+class PriceTable:
+    """Effective sell value per item id: catalog value scaled by circulating supply and recent sell volume.
+
+    refresh() rebuilds the whole table in one vectorized pass from the holdings
+    index; lookups in between are a list index. Every rebuild bumps `version`,
+    which makes cached InventoryViews revalue themselves.
+    """
+
+    def __init__(self):
+        self.values = []                                  # item id -> effective value, empty until refreshed
+        # item id -> copies sold, in buckets covering just the window
+        self.sold = collections.defaultdict(functools.partial(RingWindow, PRICE_SELL_WINDOW // ECONOMY_BUCKET_SECONDS))
+        self.version = 0
+
+    def value(self, item_id, base):
+        if not DYNAMIC_PRICING or item_id >= len(self.values):
+            return base
+        return self.values[item_id]
+
+    def record_sale(self, item_id, quantity):
+        self.sold[item_id].add(quantity)
+
+    def refresh(self, catalog, names, supply):
+        """Rebuild from {name: (value, rank, rarity)}, item names by id and circulating supply by id"""
+        count = len(names)
+        info = [catalog.get(name, (0, None, None)) for name in names]
+        ranks = np.array([rank if rank is not None else -1 for _, rank, _ in info], dtype=np.int64)
+        circulating = np.zeros(count, dtype=np.float64)
+        circulating[:min(count, len(supply))] = supply[:count]
+        sold = np.zeros(count, dtype=np.float64)
+        for item_id, window in self.sold.items():
+            if item_id < count:
+                sold[item_id] = window.total(PRICE_SELL_WINDOW)
+
+        # Compared with the rarity's average, plentiful items are worth less and scarce ones more
+        typical = np.zeros(count, dtype=np.float64)
+        for rank in np.unique(ranks[ranks >= 0]).tolist():
+            tier = ranks == rank
+            typical[tier] = circulating[tier].mean()
+        multiplier = ((typical + 1) / (circulating + 1)) ** PRICE_SUPPLY_ELASTICITY
+        # Heavy recent selling (a sellall dump) pushes the price down until the window moves on
+        multiplier /= 1 + PRICE_SELL_PRESSURE * sold / (circulating + sold + 1)
+        multiplier[ranks < 0] = 1.0
+        # Catalog values can be far past int64 (and float precision), so scale them in fixed point
+        scaled = (np.clip(multiplier, PRICE_FLOOR, PRICE_CEILING) * 2 ** 20).astype(np.int64).tolist()
+        self.values = [
+            max(1, int(value) * scale >> 20) if value > 0 else value
+            for (value, _, _), scale in zip(info, scaled)
+        ]
+        self.version += 1
+
+item_prices = PriceTable()
+
+def refresh_prices():
+    """Rebuild the price table from the catalog and the holdings index"""
+    columns = user_columns()
+    item_catalog.load()
+    item_prices.refresh(item_catalog.info, list(user_store.item_ids.names), columns.supply)
+
+def sell_price(item_name):
+    """What one copy of an item sells for right now (0 for items outside the catalog)"""
+    if not user_store.opened:
+        user_store.open()
+    load_items()
+    return user_store.item_info(user_store.item_ids.id(item_name))[0]
+
+def record_wager(user_id, game, stake):
+    """Count an accepted bet for a net-settled game, in the economy and the player's counters"""
+    economy.wager(game, stake)
+    count_play(user_id, game)
+
+# --- Interaction De-duplication ---
+DEDUPE_TTL = 15 * 60      # seconds; longer than any view's timeout
+DEDUPE_MAX_KEYS = 100_000  # live keys; new actions are refused past this
+
+class ExpiringKeySet:
+    """Keys remembered for a fixed TTL, oldest first, with a hard size bound.
+
+    Only expired keys are ever dropped: forgetting a live one would let its
+    action run twice, so when the set is full of live keys add() refuses.
+    """
+
+    def __init__(self, ttl=DEDUPE_TTL, max_keys=DEDUPE_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.expires = collections.OrderedDict()
+        self.duplicates = 0
+        self.rejected = 0
+
+    def add(self, key):
+        """Remember key; False if it was already there (a duplicate) or there is no room for it"""
+        now = time.monotonic()
+        # Every key lives for the same TTL, so insertion order is expiry order
+        while self.expires and next(iter(self.expires.values())) <= now:
+            self.expires.popitem(last=False)
+        if key in self.expires:
+            self.duplicates += 1
+            return False
+        if len(self.expires) >= self.max_keys:
+            self.rejected += 1
+            log.warning("Refusing %s: %d unexpired action keys already held", key, len(self.expires))
+            return False
+        self.expires[key] = now + self.ttl
+        return True
+
+    def __contains__(self, key):
+        return self.expires.get(key, 0) > time.monotonic()
+
+processed_actions = ExpiringKeySet()
+
+def first_time(*key):
+    """True the first time an interaction or game action is seen; retries and double clicks get False"""
+    return processed_actions.add(key)
+
+async def acknowledge_duplicate(interaction):
+    """Answer a redelivered interaction so the client doesn't report it as failed"""
+    try:
+        await interaction.response.defer()
+    except discord.HTTPException:
+        pass  # the first delivery already answered it
+
+# --- Random Number Service ---
+RNG_SEED = os.getenv("RNG_SEED")   # set for reproducible runs / dispute replays
+RNG_POOL_SIZE = 4096               # uniforms drawn from NumPy per refill
+RNG_STATE_FILE = "rng_state.json"  # root entropy and where each stream resumes after a restart
+
+# (stream, draw index) of the first draw made by the current command; ledger entries cite it
+current_draw = contextvars.ContextVar("current_draw", default=None)
+
+class RandomStream:
+    """One named stream of random draws, served from a refillable NumPy pool.
+
+    Every draw consumes exactly one uniform (one 64-bit generator output), so
+    `draws` identifies the position of an outcome in the stream and
+    RandomService.replay() can jump straight back to it.
+    """
+
+    def __init__(self, name, seed_seq, start=0, pool_size=RNG_POOL_SIZE, on_refill=None):
+        self.name = name
+        self.pool_size = pool_size
+        self.on_refill = on_refill
+        self.reset(seed_seq, start)
+
+    def reset(self, seed_seq, start=0):
+        """Restart the stream from a new seed, positioned at draw `start`"""
+        self.seed_seq = seed_seq
+        self.generator = np.random.default_rng(seed_seq)
+        self.generator.bit_generator.advance(start)
+        self.pool = np.empty(0)
+        self.pos = 0
+        self.draws = start
+
+    def _refill(self):
+        self.pool = self.generator.random(self.pool_size)
+        self.pos = 0
+        if self.on_refill is not None:
+            self.on_refill(self.name, self.draws + self.pool_size)
+
+    def random(self):
+        """Float in [0, 1)"""
+        if self.pos >= len(self.pool):
+            self._refill()
+        if current_draw.get() is None:
+            current_draw.set((self.name, self.draws))
+        value = float(self.pool[self.pos])
+        self.pos += 1
+        self.draws += 1
+        return value
+
+    def random_batch(self, n):
+        """NumPy array of the next n uniforms, the same values n random() calls would give"""
+        out = np.empty(n)
+        filled = 0
+        while filled < n:
+            if self.pos >= len(self.pool):
+                self._refill()
+            if filled == 0 and current_draw.get() is None:
+                current_draw.set((self.name, self.draws))
+            take = min(n - filled, len(self.pool) - self.pos)
+            out[filled:filled + take] = self.pool[self.pos:self.pos + take]
+            self.pos += take
+            self.draws += take
+            filled += take
+        return out
+
+    def _index(self, n):
+        return min(int(self.random() * n), n - 1)
+
+    def _indices(self, n, k):
+        return [min(int(u * n), n - 1) for u in self.random_batch(k)]
+
+    def randint(self, a, b):
+        """Integer in [a, b], like random.randint"""
+        return a + self._index(b - a + 1)
+
+    def randints(self, a, b, k):
+        """k integers in [a, b] drawn in one batch"""
+        return [a + i for i in self._indices(b - a + 1, k)]
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def choice(self, seq):
+        return seq[self._index(len(seq))]
+
+    def choices(self, population, weights=None, k=1):
+        """Weighted picks with replacement, like random.choices"""
+        if weights is None:
+            return [population[i] for i in self._indices(len(population), k)]
+        cum_weights = list(itertools.accumulate(weights))
+        total = cum_weights[-1]
+        if not 0 < total < math.inf:  # an inf weight would otherwise always pick the last entry
+            raise ValueError("Total of weights must be positive and finite")
+        hi = len(cum_weights) - 1
+        return [population[bisect.bisect(cum_weights, u * total, 0, hi)] for u in self.random_batch(k)]
+
+    def shuffle(self, x):
+        """In-place Fisher-Yates shuffle"""
+        for i in range(len(x) - 1, 0, -1):
+            j = self._index(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+class RandomService:
+    """Per-game named RNG streams, e.g. rng["slots"].randint(1, 100).
+
+    Each stream is derived from the root entropy and its own name, so streams
+    are independent of each other and of the order they are first used in.
+    The entropy and a resume position per stream are kept in RNG_STATE_FILE:
+    a stream reserves a pool's worth of draws before serving it, so a restart
+    (even after a crash) continues past every draw already made instead of
+    repeating them, and any ledgered outcome can be replayed from its
+    (stream, draw index).
+    """
+
+    def __init__(self, seed=None, path=RNG_STATE_FILE):
+        self.path = path
+        self.env_seed = seed
+        self.streams = {}
+        self.positions = {}  # stream name -> first draw not yet handed out (reserved on refill)
+        self.root = None
+
+    def load(self):
+        """Resume the saved entropy and positions; a new RNG_SEED (or none saved) starts fresh"""
+        state = None
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        if state is not None and (self.env_seed is None or state["entropy"] == int(self.env_seed)):
+            self.root = np.random.SeedSequence(state["entropy"])
+            self.positions = state["positions"]
+        else:
+            self.seed(self.env_seed)
+            if self.env_seed is None:
+                print(f"🎲 New RNG entropy {self.root.entropy} (saved to {self.path})")
+
+    def save(self):
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"entropy": self.root.entropy, "positions": self.positions}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def seed(self, seed=None):
+        """Reseed every stream from the start (existing stream objects are reset in place)"""
+        self.root = np.random.SeedSequence(int(seed) if seed is not None else None)
+        self.positions = {}
+        for name, stream in self.streams.items():
+            stream.reset(self._seed_for(name))
+        self.save()
+
+    def _seed_for(self, name):
+        return np.random.SeedSequence(self.root.entropy, spawn_key=(zlib.crc32(name.encode()),))
+
+    def _reserve(self, name, position):
+        self.positions[name] = position
+        self.save()
+
+    def __getitem__(self, name):
+        stream = self.streams.get(name)
+        if stream is None:
+            if self.root is None:
+                self.load()
+            stream = self.streams[name] = RandomStream(
+                name, self._seed_for(name), self.positions.get(name, 0), on_refill=self._reserve)
+        return stream
+
+    def replay(self, name, draw_index):
+        """Fresh copy of a stream positioned at draw_index, for re-running a disputed game"""
+        if self.root is None:
+            self.load()
+        return RandomStream(name, self._seed_for(name), draw_index)
+
+    def state(self):
+        """Root entropy and per-stream draw counters"""
+        return {"entropy": self.root.entropy, "draws": {n: s.draws for n, s in self.streams.items()}}
+
+rng = RandomService(RNG_SEED)
 
 # --- Shop Items Configuration ---
 SHOP_ITEMS = {
@@ -373,45 +2467,200 @@ MYSTERY_BOXES = {
     }
 }
 
+# --- Game Rules Configuration ---
+# Kept at module level so offline tools (simulate.py) can import the exact odds.
+
+# Slot symbols and their weights
+SLOT_SYMBOLS = {
+    '🍒': {'weight': 30, 'payout': 2},
+    '🍋': {'weight': 25, 'payout': 3},
+    '🍊': {'weight': 20, 'payout': 4},
+    '🍇': {'weight': 15, 'payout': 5},
+    '🔔': {'weight': 8, 'payout': 10},
+    '💎': {'weight': 2, 'payout': 50}
+}
+
+SPIN_COST = 50
+SPIN_PRIZES = [
+    {"name": "💥 JACKPOT!", "coins": (5000, 10000), "chance": 2},
+    {"name": "💰 Big Win", "coins": (1000, 3000), "chance": 5},
+    {"name": "🎉 Good Win", "coins": (500, 1000), "chance": 10},
+    {"name": "😊 Small Win", "coins": (100, 300), "chance": 25},
+    {"name": "😐 Tiny Win", "coins": (10, 50), "chance": 35},
+    {"name": "😢 Nothing", "coins": (0, 0), "chance": 23}
+]
+
+# Crash point is uniform in this range (rounded to 2 decimals), multiplier climbs by CRASH_STEP per tick
+CRASH_POINT_RANGE = (1.01, 10.0)
+CRASH_STEP = 0.1
+CRASH_START_DELAY = 2    # seconds before the first tick
+CRASH_TICK_SECONDS = 1
+CRASH_VIEW_TIMEOUT = 30  # Cash Out button stops working after this
+
+# Mining ladder: cumulative thresholds on a 1-100 roll, checked in order
+MINE_LADDER = {
+    "coal": 92,
+    "small_coins": 97,
+    "basic_box": 98,
+    "big_coins": 99,
+    "epic_item": 99.9
+}
+MINE_SMALL_COINS = (1, 50)
+MINE_BIG_COINS = (50, 300)
+MINE_LEGENDARY_CHANCE = 0.001  # % chance once the ladder is exhausted
+
+ROLL_COST = 500
+ROLL_RARITY_WEIGHTS = {
+    "common": 60.0,
+    "uncommon": 30.0,
+    "rare": 9.0,
+    "epic": 1.0,
+    "legendary": 0.5  # you can use floats here safely
+}
+ROLL_NULL_CHANCE = 1e-34
+ROLL_COSMIC_CHANCE = 1e-10
+
+LOTTERY_REWARDS = {0: 0, 1: 2500, 2: 10000, 3: 200000, 4: 1000000}
+
 # --- discord bot ---
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+def flush_storage(snapshot=False):
+    """Write out everything buffered in memory: house credits, dirty user records, the ledger index.
+
+    With snapshot, also fold the user log into a fresh snapshot so the next start maps it directly.
+    """
+    settle_house_bank()
+    user_store.flush()
+    if snapshot and user_store.opened and user_store.log_size:
+        user_store.compact()
+    ledger.save_index()
+
+atexit.register(flush_storage)
+
+class MoneyBot(commands.Bot):
+    async def close(self):
+        # Write out everything buffered in memory before the connection goes away
+        flush_storage(snapshot=True)
+        if web_runner is not None:
+            await web_runner.cleanup()
+        await super().close()
+
+bot = MoneyBot(command_prefix="!", intents=intents, help_command=None)
+web_runner = None
+
+@bot.event
+async def setup_hook():
+    global web_runner
+    web_runner = await start_webserver()
 
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
+    if not ledger.loaded:
+        ledger.load()  # also rebuilds the economy stats
+    if not metrics_dump_loop.is_running():
+        metrics_dump_loop.start()
+    if not ledger_index_loop.is_running():
+        ledger_index_loop.start()
+    if not house_settle_loop.is_running():
+        house_settle_loop.start()
+    if not user_flush_loop.is_running():
+        user_flush_loop.start()
+    if not achievement_announce_loop.is_running():
+        achievement_announce_loop.start()
+    if DYNAMIC_PRICING and not price_refresh_loop.is_running():
+        price_refresh_loop.start()
+    loop_monitor.start(asyncio.get_running_loop())
+
+@tasks.loop(seconds=METRICS_DUMP_INTERVAL)
+async def metrics_dump_loop():
+    dump_metrics()
+
+@tasks.loop(seconds=LEDGER_INDEX_INTERVAL)
+async def ledger_index_loop():
+    ledger.save_index()
+
+@tasks.loop(seconds=HOUSE_SETTLE_INTERVAL)
+async def house_settle_loop():
+    with track_command("house_settle"):
+        async with user_lock(HOUSE_ACCOUNT_ID):
+            settle_house_bank()
+
+@tasks.loop(seconds=0)
+async def achievement_announce_loop():
+    channel, user_id, unlocked = await achievement_unlocks.get()
+    with track_command("achievement_announce"):
+        try:
+            await channel.send(embed=achievement_embed(user_id, unlocked))
+        except discord.HTTPException:
+            pass  # missing permissions or a deleted channel; the unlock itself is saved
+
+@tasks.loop(seconds=PRICE_REFRESH_INTERVAL)
+async def price_refresh_loop():
+    with track_command("price_refresh"):
+        refresh_prices()
+
+@tasks.loop(seconds=USER_FLUSH_INTERVAL)
+async def user_flush_loop():
+    with track_command("user_flush"):
+        user_store.flush()
+        if user_store.needs_compaction():
+            await user_store.compact_in_background()
+
+def command_name(message):
+    """Canonical name of the command a prefixed message invokes, or 'unknown'"""
+    parts = message.content[len(bot.command_prefix):].split(maxsplit=1)
+    command = bot.get_command(parts[0]) if parts else None
+    return command.qualified_name if command else "unknown"
 
 @bot.event
 async def on_message(message):
     # Don't give XP to bots
     if message.author.bot:
         return
+    current_channel.set(message.channel)
     
     # Don't give XP for commands (optional)
     if message.content.startswith('!'):
-        await bot.process_commands(message)
+        with track_command(command_name(message)):
+            await bot.process_commands(message)
         return
     
-    # Give random XP (1-5) for each message
-    xp_gained = random.randint(1, 5)
-    leveled_up, new_level = add_xp(message.author.id, xp_gained)
-    
-    # Send level up message
-    if leveled_up:
-        embed = discord.Embed(
-            title="🎉 Level Up!",
-            description=f"{message.author.mention} reached level {new_level}!",
-            color=discord.Color.gold()
-        )
-        await message.channel.send(embed=embed)
+    with track_command("message_xp"):
+        # Give random XP (1-5) for each message
+        xp_gained = rng["xp"].randint(1, 5)
+        async with user_lock(message.author.id):
+            leveled_up, new_level = add_xp(message.author.id, xp_gained)
+        
+        # Send level up message
+        if leveled_up:
+            embed = discord.Embed(
+                title="🎉 Level Up!",
+                description=f"{message.author.mention} reached level {new_level}!",
+                color=discord.Color.gold()
+            )
+            await message.channel.send(embed=embed)
     
     await bot.process_commands(message)
 
+@bot.listen()
+async def on_command_error(ctx, error):
+    # process_commands swallows command errors, so count them here
+    if ctx.command:
+        command_stats(ctx.command.qualified_name).errors += 1
+    # Any on_command_error listener switches off discord.py's default
+    # traceback logging, so do what it would have done
+    if ctx.command and ctx.command.has_error_handler():
+        return
+    if ctx.cog and ctx.cog.has_error_handler():
+        return
+    log.error("Ignoring exception in command %s", ctx.command, exc_info=error)
+
 @bot.command()
 async def profile(ctx):
     """Show user's profile with money, level, and XP info"""
-    user_data = get_user_data(ctx.author.id)
+    user_data = peek_user_data(ctx.author.id)
     
     current_level = user_data["level"]
     current_xp = user_data["xp"]
@@ -459,6 +2708,15 @@ async def profile(ctx):
         inline=False
     )
     
+    view = user_store.inventory_view(ctx.author.id)
+    best_id = view.best() if view else None
+    if best_id is not None:
+        embed.add_field(
+            name="🏆 Best Item",
+            value=f"{user_store.item_ids.name(best_id)} ({user_store.item_info(best_id)[2].title()})",
+            inline=False
+        )
+    
     embed.set_thumbnail(url=ctx.author.avatar.url if ctx.author.avatar else None)
     embed.set_footer(text="Keep chatting to gain more XP!")
     
@@ -466,34 +2724,15 @@ async def profile(ctx):
 
 
 def save_winning_numbers(user_numbers):
-    """Save each winning number individually to win.json and track counts"""
-    file_path = "win.json"
-
-    # If file doesn't exist, create it with empty dict
-    if not os.path.exists(file_path):
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump({}, f)
+    """Count each winning number in the lottery stats (kept in the user store)"""
+    counts = user_store.count_lottery(user_numbers)
+    return {str(num): {"count": counts[num]} for num in user_numbers}
 
-    # Load current data
-    with open(file_path, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-
-    # Update counts for each number
-    for num in user_numbers:
-        num_str = str(num)
-        if num_str in data:
-            data[num_str]["count"] += 1
-        else:
-            data[num_str] = {"count": 1}
-
-    # Save back
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
-    return {str(num): data[str(num)] for num in user_numbers}
+def lottery_counts():
+    """Lottery stats in the old win.json shape: {number: {"count": n}} for numbers drawn at least once"""
+    if not user_store.opened:
+        user_store.open()
+    return {str(num): {"count": count} for num, count in enumerate(user_store.lottery) if count}
 
 @bot.command()
 async def test(ctx, roll_type: str = None, rarity: str = None):
@@ -535,7 +2774,7 @@ async def test(ctx, roll_type: str = None, rarity: str = None):
                 await ctx.send(f"No items with rarity `{rarity}` found.")
                 return
 
-            rolled_item = random.choice(possible_items)
+            rolled_item = rng["test"].choice(possible_items)
             item_data = items_db[rolled_item]
             value = item_data.get("value", 0)
 
@@ -580,6 +2819,7 @@ async def test(ctx, roll_type: str = None, rarity: str = None):
 
 
 @bot.command()
+@user_locked
 async def lottery(ctx, num1: int, num2: int, num3: int, num4: int):
     """Lottery game with coin rewards based on correct numbers"""
     # user numbers
@@ -596,15 +2836,14 @@ async def lottery(ctx, num1: int, num2: int, num3: int, num4: int):
         return
 
     # generate 4 random numbers (1–100)
-    winning_numbers = [random.randint(1, 100) for _ in range(4)]
+    winning_numbers = rng["lottery"].randints(1, 100, 4)
     save_winning_numbers(winning_numbers)
 
     # count how many numbers match
     correct_count = sum(1 for user_num in user_numbers if user_num in winning_numbers)
     
     # determine coin reward
-    coin_rewards = {0: 0, 1: 2500, 2: 10000, 3: 200000, 4: 1000000}
-    coins_won = coin_rewards.get(correct_count, 0)
+    coins_won = LOTTERY_REWARDS.get(correct_count, 0)
     
     # add coins to user
     if coins_won > 0:
@@ -661,7 +2900,7 @@ async def shop(ctx):
             inline=False
         )
     
-    user_data = get_user_data(ctx.author.id)
+    user_data = peek_user_data(ctx.author.id)
     embed.set_footer(text=f"Your balance: {user_data['money']:,} coins")
     
     await ctx.send(embed=embed)
@@ -670,18 +2909,7 @@ async def shop(ctx):
 async def topnumbers(ctx):
     """Show the top 3 most frequently picked winning numbers"""
     try:
-        # Load the win.json data
-        if not os.path.exists('win.json'):
-            embed = discord.Embed(
-                title="📊 Lottery Statistics",
-                description="No lottery data available yet!\nPlay some lottery games first with `!lottery`",
-                color=discord.Color.orange()
-            )
-            await ctx.send(embed=embed)
-            return
-        
-        with open('win.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = lottery_counts()
         
         if not data:
             embed = discord.Embed(
@@ -753,14 +2981,14 @@ async def help(ctx):
     # Items & Inventory
     embed.add_field(
         name="📦 Items & Inventory",
-        value="`!roll` - Roll for random items (500 coins)\n`!inventory [page]` - View your items\n`!sell <item>` - Sell an item for coins",
+        value="`!roll` - Roll for random items (500 coins)\n`!inventory [page]` - View your items\n`!collection [rarity]` - Collection progress per rarity\n`!whohas <item>` - Who holds an item and its supply\n`!sell <item>` - Sell an item for coins",
         inline=False
     )
     
     # Bank & Social
     embed.add_field(
         name="🏦 Bank & Social",
-        value="`!bank [action] [amount]` - Bank system\n`!give @user <amount>` - Give coins to someone\n`!leaderboard [type]` - View leaderboards",
+        value="`!bank [action] [amount]` - Bank system\n`!history [page]` - Your coin history\n`!give @user <amount>` - Give coins to someone\n`!leaderboard [type]` - View leaderboards",
         inline=False
     )
     
@@ -796,6 +3024,7 @@ async def help(ctx):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def buy(ctx, item_id: str):
     """Buy an item from the shop or mystery box"""
     # Check if it's a mystery box first
@@ -1009,6 +3238,7 @@ async def buy(ctx, item_id: str):
             await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def daily(ctx):
     """Get your daily coins (once every 24 hours)"""
     import time
@@ -1035,14 +3265,14 @@ async def daily(ctx):
         await ctx.send(embed=embed)
         return
     
+    # Update last daily timestamp first, so a claim that lost a race pays nothing
+    update_user_data(ctx.author.id, last_daily=current_time, expected_version=user_data["version"])
+
     # Give daily reward
-    daily_amount = random.randint(100, 500)
+    daily_amount = rng["daily"].randint(100, 500)
     new_balance = add_money(ctx.author.id, daily_amount)
     add_xp(ctx.author.id, 50)  # Daily XP bonus
     
-    # Update last daily timestamp
-    update_user_data(ctx.author.id, last_daily=current_time)
-    
     embed = discord.Embed(
         title="💰 Daily Reward!",
         description=f"You received {daily_amount:,} coins and 50 XP!",
@@ -1054,6 +3284,7 @@ async def daily(ctx):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def gamble(ctx, amount: int):
     """Gamble your coins - 50/50 chance to double or lose"""
     if amount <= 0:
@@ -1074,9 +3305,10 @@ async def gamble(ctx, amount: int):
         )
         await ctx.send(embed=embed)
         return
+    record_wager(ctx.author.id, "gamble", amount)
     
     # 50/50 chance
-    won = random.choice([True, False])
+    won = rng["gamble"].choice([True, False])
     
     if won:
         # Double the money
@@ -1101,6 +3333,7 @@ async def gamble(ctx, amount: int):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def cards(ctx, bet: int = 100):
     """Play blackjack with buttons for hit/stand"""
     if bet <= 0:
@@ -1121,12 +3354,13 @@ async def cards(ctx, bet: int = 100):
         )
         await ctx.send(embed=embed)
         return
+    record_wager(ctx.author.id, "cards", bet)
     
     # Create deck and deal cards
     suits = ['♠️', '♥️', '♦️', '♣️']
     ranks = ['11', '2', '3', '4', '5', '6', '7', '8', '9', '10', '10', '10', '10']
     deck = [f"{rank}{suit}" for suit in suits for rank in ranks]
-    random.shuffle(deck)
+    rng["cards"].shuffle(deck)
     
     player_cards = [deck.pop(), deck.pop()]
     dealer_cards = [deck.pop(), deck.pop()]
@@ -1200,10 +3434,17 @@ async def cards(ctx, bet: int = 100):
             super().__init__(timeout=60)
         
         @discord.ui.button(label='Hit', style=discord.ButtonStyle.green, emoji='🃏')
+        @tracked_button("cards:hit")
         async def hit(self, interaction: discord.Interaction, button: discord.ui.Button):
             if interaction.user.id != ctx.author.id:
                 await interaction.response.send_message("This isn't your game!", ephemeral=True)
                 return
+            if not first_time("interaction", interaction.id):
+                await acknowledge_duplicate(interaction)
+                return
+            if ("blackjack", ctx.message.id) in processed_actions:
+                await interaction.response.send_message("This game is already over!", ephemeral=True)
+                return
             
             # Player hits
             player_cards.append(deck.pop())
@@ -1224,20 +3465,31 @@ async def cards(ctx, bet: int = 100):
             
             if new_player_value > 21:
                 # Bust
+                if not first_time("blackjack", ctx.message.id):
+                    await interaction.response.send_message("This game is already over!", ephemeral=True)
+                    return
                 spend_money(ctx.author.id, bet)
                 user_data = get_user_data(ctx.author.id)
                 embed.add_field(name="Result", value=f"💥 Bust! You lost {bet:,} coins!", inline=False)
                 embed.add_field(name="New Balance", value=f"{user_data['money']:,} coins", inline=True)
                 self.clear_items()
+                self.stop()
                 await interaction.response.edit_message(embed=embed, view=self)
             else:
                 await interaction.response.edit_message(embed=embed, view=self)
         
         @discord.ui.button(label='Stand', style=discord.ButtonStyle.red, emoji='✋')
+        @tracked_button("cards:stand")
         async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
             if interaction.user.id != ctx.author.id:
                 await interaction.response.send_message("This isn't your game!", ephemeral=True)
                 return
+            if not first_time("interaction", interaction.id):
+                await acknowledge_duplicate(interaction)
+                return
+            if not first_time("blackjack", ctx.message.id):
+                await interaction.response.send_message("This game is already over!", ephemeral=True)
+                return
             
             # Dealer plays
             dealer_full_value = card_value(dealer_cards)
@@ -1284,12 +3536,17 @@ async def cards(ctx, bet: int = 100):
                 embed.add_field(name="Balance", value=f"{user_data['money']:,} coins", inline=True)
             
             self.clear_items()
+            self.stop()
             await interaction.response.edit_message(embed=embed, view=self)
     
     view = BlackjackView()
     await ctx.send(embed=embed, view=view)
+    # The buttons settle while the command still holds the author's lock, so nothing
+    # else can move their balance between the check above and the result
+    await view.wait()
 
 @bot.command()
+@user_locked
 async def slots(ctx, bet: int = 50):
     """Play the slot machine"""
     if bet <= 0:
@@ -1310,29 +3567,20 @@ async def slots(ctx, bet: int = 50):
         )
         await ctx.send(embed=embed)
         return
-    
-    # Slot symbols and their weights
-    symbols = {
-        '🍒': {'weight': 30, 'payout': 2},
-        '🍋': {'weight': 25, 'payout': 3},
-        '🍊': {'weight': 20, 'payout': 4},
-        '🍇': {'weight': 15, 'payout': 5},
-        '🔔': {'weight': 8, 'payout': 10},
-        '💎': {'weight': 2, 'payout': 50}
-    }
+    record_wager(ctx.author.id, "slots", bet)
     
     # Create weighted list
     weighted_symbols = []
-    for symbol, data in symbols.items():
+    for symbol, data in SLOT_SYMBOLS.items():
         weighted_symbols.extend([symbol] * data['weight'])
     
     # Spin the slots
-    result = [random.choice(weighted_symbols) for _ in range(3)]
+    result = rng["slots"].choices(weighted_symbols, k=3)
     
     # Calculate winnings
     if result[0] == result[1] == result[2]:
         # All three match
-        multiplier = symbols[result[0]]['payout']
+        multiplier = SLOT_SYMBOLS[result[0]]['payout']
         winnings = bet * multiplier
         new_balance = add_money(ctx.author.id, winnings - bet)  # Subtract bet since it was the cost
         
@@ -1374,6 +3622,7 @@ async def slots(ctx, bet: int = 50):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def crash(ctx, bet: int = 100):
     """Play the crash game - cash out before it crashes!"""
     if bet <= 0:
@@ -1394,9 +3643,10 @@ async def crash(ctx, bet: int = 100):
         )
         await ctx.send(embed=embed)
         return
+    record_wager(ctx.author.id, "crash", bet)
     
     # Generate crash point (1.0x to 10.0x, weighted towards lower values)
-    crash_point = round(random.uniform(1.01, 10.0), 2)
+    crash_point = round(rng["crash"].uniform(*CRASH_POINT_RANGE), 2)
     
     # Starting multiplier
     current_multiplier = 1.0
@@ -1411,21 +3661,26 @@ async def crash(ctx, bet: int = 100):
     
     class CrashView(discord.ui.View):
         def __init__(self):
-            super().__init__(timeout=30)
+            super().__init__(timeout=CRASH_VIEW_TIMEOUT)
             self.cashed_out = False
         
         @discord.ui.button(label='Cash Out', style=discord.ButtonStyle.green, emoji='💰')
+        @tracked_button("crash:cash_out")
         async def cash_out(self, interaction: discord.Interaction, button: discord.ui.Button):
             if interaction.user.id != ctx.author.id:
                 await interaction.response.send_message("This isn't your game!", ephemeral=True)
                 return
             
-            if self.cashed_out:
+            if not first_time("interaction", interaction.id):
+                await acknowledge_duplicate(interaction)
+                return
+            if not first_time("crash", ctx.message.id):
+                await interaction.response.send_message("This game is already over!", ephemeral=True)
                 return
             
             self.cashed_out = True
             winnings = int(bet * current_multiplier)
-            new_balance = add_money(ctx.author.id, winnings - bet)
+            new_balance = add_money(ctx.author.id, winnings - bet)  # the command holds the author's lock
             
             embed = discord.Embed(
                 title="🚀 Crash Game - Cashed Out!",
@@ -1444,10 +3699,10 @@ async def crash(ctx, bet: int = 100):
     
     # Simulate the crash game
     import asyncio
-    await asyncio.sleep(2)  # Initial delay
+    await asyncio.sleep(CRASH_START_DELAY)  # Initial delay
     
     while current_multiplier < crash_point and not view.cashed_out:
-        current_multiplier += 0.1
+        current_multiplier += CRASH_STEP
         current_multiplier = round(current_multiplier, 2)
         
         embed = discord.Embed(
@@ -1460,11 +3715,11 @@ async def crash(ctx, bet: int = 100):
         
         try:
             await message.edit(embed=embed, view=view)
-            await asyncio.sleep(1)  # Wait 1 second between updates
+            await asyncio.sleep(CRASH_TICK_SECONDS)  # Wait between updates
         except:
             break
     
-    if not view.cashed_out:
+    if not view.cashed_out and first_time("crash", ctx.message.id):
         # Crashed!
         spend_money(ctx.author.id, bet)
         user_data = get_user_data(ctx.author.id)
@@ -1482,19 +3737,11 @@ async def crash(ctx, bet: int = 100):
         await message.edit(embed=embed, view=view)
 
 @bot.command()
+@user_locked
 async def spin(ctx):
     """Spin the wheel of fortune for coins"""
-    prizes = [
-        {"name": "💥 JACKPOT!", "coins": (5000, 10000), "chance": 2},
-        {"name": "💰 Big Win", "coins": (1000, 3000), "chance": 5},
-        {"name": "🎉 Good Win", "coins": (500, 1000), "chance": 10},
-        {"name": "😊 Small Win", "coins": (100, 300), "chance": 25},
-        {"name": "😐 Tiny Win", "coins": (10, 50), "chance": 35},
-        {"name": "😢 Nothing", "coins": (0, 0), "chance": 23}
-    ]
-    
     # Cost to spin
-    spin_cost = 50
+    spin_cost = SPIN_COST
     user_data = get_user_data(ctx.author.id)
     
     if user_data["money"] < spin_cost:
@@ -1508,17 +3755,18 @@ async def spin(ctx):
     
     # Deduct spin cost
     spend_money(ctx.author.id, spin_cost)
+    count_play(ctx.author.id, "spin")
     
     # Weighted random selection
-    total_chance = sum(prize["chance"] for prize in prizes)
-    rand = random.randint(1, total_chance)
+    total_chance = sum(prize["chance"] for prize in SPIN_PRIZES)
+    rand = rng["spin"].randint(1, total_chance)
     
     current = 0
-    for prize in prizes:
+    for prize in SPIN_PRIZES:
         current += prize["chance"]
         if rand <= current:
             if prize["coins"][0] > 0:
-                coins = random.randint(prize["coins"][0], prize["coins"][1])
+                coins = rng["spin"].randint(prize["coins"][0], prize["coins"][1])
                 new_balance = add_money(ctx.author.id, coins)
                 
                 embed = discord.Embed(
@@ -1541,14 +3789,26 @@ async def spin(ctx):
     
     await ctx.send(embed=embed)
 
+def prestige_requirement(prestige_level):
+    """Coins needed to prestige from the given level"""
+    # exponential requirement (10M * 20^prestige)
+    return 10_000_000 * (20 ** prestige_level)
+
+def prestige_boosts(current_luck, current_money_boost):
+    """Return (luck, money_boost) after one more prestige"""
+    sluck = current_luck + 20   # scale boosts by +10%
+    new_luck = round(current_luck * sluck, 4)  # rounded for neatness
+    new_money_boost = round(current_money_boost * 1.5, 4)
+    return new_luck, new_money_boost
+
 @bot.command()
+@user_locked
 async def prestige(ctx):
     """Prestige to reset your progress for permanent boosts"""
     user_data = get_user_data(ctx.author.id)
     prestige_level = user_data.get("prestige", 0)
 
-    # exponential requirement (10M * 10^prestige)
-    required = 10_000_000 * (20 ** prestige_level)
+    required = prestige_requirement(prestige_level)
 
     if user_data["money"] < required:
         await ctx.send(
@@ -1562,9 +3822,7 @@ async def prestige(ctx):
     # get current boosts (default to 1.0 = no boost yet)
     current_luck = user_data.get("luck", 1.0)
     current_money_boost = user_data.get("money_boost", 1.0)
-    sluck = current_luck + 20   # scale boosts by +10%
-    new_luck = round(current_luck * sluck, 4)  # rounded for neatness
-    new_money_boost = round(current_money_boost * 1.5, 4)
+    new_luck, new_money_boost = prestige_boosts(current_luck, current_money_boost)
 
     # reset stats but keep boosts + prestige
     update_user_data(
@@ -1575,7 +3833,8 @@ async def prestige(ctx):
         inventory={},
         prestige=new_prestige,
         luck=new_luck,
-        money_boost=new_money_boost
+        money_boost=new_money_boost,
+        expected_version=user_data["version"]
     )
 
     # add prestige role
@@ -1613,18 +3872,27 @@ rarity_weights = {
 }
 
 def apply_luck_weights(base_weights, luck):
-    """Increase rare/epic/legendary weights based on total luck"""
-    weights = rarity_weights.copy()
+    """Increase rare/epic/legendary weights (relative to the rest) based on total luck.
+
+    The other rarities are divided by the boost rather than these multiplied by it,
+    so the weights stay finite however large prestige luck gets.
+    """
+    weights = dict(base_weights)
     if luck > 0:
-        for r in ["rare", "epic", "legendary"]:
-            if r in weights:
-                weights[r] *= (1 + luck / 100)
+        try:
+            boost = 1 + luck / 100
+        except OverflowError:  # an int too large for a float
+            boost = math.inf
+        for r in weights:
+            if r not in ["rare", "epic", "legendary"]:
+                weights[r] /= boost
     return weights
 
 @bot.command()
+@user_locked
 async def roll(ctx):
     """Roll for random items"""
-    roll_cost = 500
+    roll_cost = ROLL_COST
     user_data = get_user_data(ctx.author.id)
 
     if user_data["money"] < roll_cost:
@@ -1638,29 +3906,18 @@ async def roll(ctx):
 
     # Deduct roll cost
     spend_money(ctx.author.id, roll_cost)
+    count_play(ctx.author.id, "roll")
 
     # Load items database
     items_db = load_items()
 
-    rarity_weights = {
-        "common": 60.0,
-        "uncommon": 30.0,
-        "rare": 9.0,
-        "epic": 1.0,
-        "legendary": 0.5  # you can use floats here safely
-    }
+    luck = get_total_luck(ctx.author.id)
+    rarity_weights = apply_luck_weights(ROLL_RARITY_WEIGHTS, luck)
 
-    luck = get_user_data(ctx.author.id).get("luck", 0) + (get_user_data(ctx.author.id).get("prestige", 0) * 10)
-
-    if luck > 0:
-        rarity_weights["rare"] *= (1 + luck / 100)
-        rarity_weights["epic"] *= (1 + luck / 100)
-        rarity_weights["legendary"] *= (1 + luck / 100)
-
-    ultra_rare_chance = random.random()
+    ultra_rare_chance = rng["roll"].random()
 
     # Fragment Of Reality roll
-    if ultra_rare_chance < 1e-34:  # 0.000...1%
+    if ultra_rare_chance < ROLL_NULL_CHANCE:  # 0.000...1%
         rolled_item = "Fragment Of Reality"
         item_data = items_db[rolled_item]
         rarity = "null"
@@ -1678,14 +3935,14 @@ async def roll(ctx):
         embed.add_field(name="🚨 ALERT", value="You have broken reality itself!", inline=False)
 
     # Cosmic roll
-    elif ultra_rare_chance < 1e-10:
+    elif ultra_rare_chance < ROLL_COSMIC_CHANCE:
         cosmic_items = [
             item_name for item_name, item_data in items_db.items()
             if item_data.get("rarity", "common") == "cosmic"
         ]
 
         if cosmic_items:
-            rolled_item = random.choice(cosmic_items)
+            rolled_item = rng["roll"].choice(cosmic_items)
             item_data = items_db[rolled_item]
             rarity = "cosmic"
             value = item_data.get("value", 0)
@@ -1726,11 +3983,11 @@ async def roll(ctx):
         # Pick rarity first using float weights
         rarities = list(rarity_weights.keys())
         weights = list(rarity_weights.values())
-        chosen_rarity = random.choices(rarities, weights=weights, k=1)[0]
+        chosen_rarity = rng["roll"].choices(rarities, weights=weights, k=1)[0]
 
         # Pick an item of that rarity
         possible_items = [name for name, data in normal_items.items() if data.get("rarity") == chosen_rarity]
-        rolled_item = random.choice(possible_items)
+        rolled_item = rng["roll"].choice(possible_items)
         item_data = items_db[rolled_item]
         rarity = chosen_rarity
         value = item_data.get("value", 0)
@@ -1762,13 +4019,83 @@ async def roll(ctx):
 
     await ctx.send(embed=embed)
 
+# --- Paginated Sessions ---
+PAGE_SIZE = 10
+PAGE_SESSION_TIMEOUT = 180     # seconds a paginated message keeps its buttons
+PAGE_SESSION_LIMIT = 1000      # live sessions; the oldest gives up its rows past this
+LEADERBOARD_SESSION_ROWS = 100
+
+def page_count(rows):
+    return max(1, (len(rows) + PAGE_SIZE - 1) // PAGE_SIZE)
+
+class PageView(discord.ui.View):
+    """Previous / next buttons over a list of rows (captured when the command ran, or kept live)"""
+
+    def __init__(self, owner_id, rows, render, page=1):
+        super().__init__(timeout=PAGE_SESSION_TIMEOUT)
+        self.owner_id = owner_id
+        self.rows = rows
+        self.render = render  # async page number -> embed
+        self.page = max(1, min(page, page_count(rows)))
+        self.message = None
+        self.sync_buttons()
+
+    def sync_buttons(self):
+        self.previous.disabled = self.page <= 1
+        self.next.disabled = self.page >= page_count(self.rows or [])
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    @tracked_button("page:previous")
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.flip(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    @tracked_button("page:next")
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.flip(interaction, self.page + 1)
+
+    async def flip(self, interaction, page):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("These aren't your pages!", ephemeral=True)
+            return
+        if self.rows is None:
+            await interaction.response.send_message("This list has expired, run the command again!", ephemeral=True)
+            return
+        self.page = max(1, min(page, page_count(self.rows)))
+        self.sync_buttons()
+        await interaction.response.edit_message(embed=await self.render(self.page), view=self)
+
+    def expire(self):
+        self.rows = None
+        page_sessions.pop(id(self), None)
+
+    async def on_timeout(self):
+        self.expire()
+        if self.message is not None:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=None)
+
+# Live sessions, oldest first, so captured rows stay bounded however many are open
+page_sessions = collections.OrderedDict()
+
+async def send_pages(ctx, rows, render, page=1):
+    """Send page `page` of `rows` with buttons for the rest (plain embed if it all fits on one page)"""
+    if page_count(rows) == 1:
+        await ctx.send(embed=await render(1))
+        return
+    view = PageView(ctx.author.id, rows, render, page)
+    page_sessions[id(view)] = view
+    while len(page_sessions) > PAGE_SESSION_LIMIT:
+        page_sessions.popitem(last=False)[1].expire()
+    view.message = await ctx.send(embed=await render(view.page), view=view)
+
 @bot.command()
 async def inventory(ctx, page: int = 1):
     """View your inventory of items"""
-    user_data = get_user_data(ctx.author.id)
-    inventory = user_data.get("inventory", {})
+    # Cached per resident user: sorted by value, total kept up to date on every change
+    view = user_store.inventory_view(ctx.author.id)
     
-    if not inventory:
+    if not view or not view.counts:
         embed = discord.Embed(
             title="📦 Your Inventory",
             description="Your inventory is empty! Use `!roll` to get items.",
@@ -1777,56 +4104,141 @@ async def inventory(ctx, page: int = 1):
         await ctx.send(embed=embed)
         return
     
-    # Sort items by value (load items database for values)
-    items_db = load_items()
-    sorted_items = sorted(inventory.items(), key=lambda x: items_db.get(x[0], {}).get("value", 0), reverse=True)
-    
-    # Pagination
-    items_per_page = 10
-    max_pages = (len(sorted_items) + items_per_page - 1) // items_per_page
-    page = max(1, min(page, max_pages))
-    
-    start_idx = (page - 1) * items_per_page
-    end_idx = start_idx + items_per_page
-    page_items = sorted_items[start_idx:end_idx]
-    
-    embed = discord.Embed(
-        title="📦 Your Inventory",
-        description=f"Page {page}/{max_pages}",
-        color=discord.Color.blue()
-    )
-    
-    total_value = 0
-    for item_name, quantity in page_items:
-        item_data = items_db.get(item_name, {})
-        value = item_data.get("value", 0)
-        rarity = item_data.get("rarity", "common")
-        total_value += value * quantity
+    # The buttons page through the live view, reading only the rows of the page shown
+    async def render(page):
+        items_db = load_items()
+        max_pages = page_count(view.order)
+        page = min(page, max_pages)
+        start_idx = (page - 1) * PAGE_SIZE
+        end_idx = start_idx + PAGE_SIZE
+        
+        embed = discord.Embed(
+            title="📦 Your Inventory",
+            description=f"Page {page}/{max_pages}",
+            color=discord.Color.blue()
+        )
+        
+        for item_id, quantity, value in view.page(start_idx, end_idx):
+            item_name = user_store.item_ids.name(item_id)
+            rarity = items_db.get(item_name, {}).get("rarity", "common")
+            
+            embed.add_field(
+                name=f"{item_name} x{quantity}",
+                value=f"Worth: {value:,} each\nRarity: {rarity.title()}",
+                inline=True
+            )
         
         embed.add_field(
-            name=f"{item_name} x{quantity}",
-            value=f"Worth: {value:,} each\nRarity: {rarity.title()}",
-            inline=True
+            name="📊 Total Inventory Value",
+            value=f"{view.total:,} coins",
+            inline=False
         )
+        return embed
     
-    # Calculate total inventory value
-    total_inventory_value = sum(
-        items_db.get(item, {}).get("value", 0) * qty 
-        for item, qty in inventory.items()
-    )
-    
-    embed.add_field(
-        name="📊 Total Inventory Value",
-        value=f"{total_inventory_value:,} coins",
-        inline=False
-    )
-    
-    if max_pages > 1:
-        embed.set_footer(text=f"Use !inventory {page+1} for next page" if page < max_pages else "This is the last page")
-    
+    await send_pages(ctx, view.order, render, page)
+
+COLLECTION_MISSING_SHOWN = 5   # missing items named per rarity in the overview
+COLLECTION_MISSING_MAX = 60    # missing items named when looking at one rarity
+COLLECTION_COMPLETERS_SHOWN = 10
+
+@bot.command()
+async def collection(ctx, rarity: str = None):
+    """See how much of each rarity you've collected and what's missing"""
+    masks = user_store.collection_masks()
+    if rarity is not None and rarity.lower() not in masks:
+        embed = discord.Embed(
+            title="❌ Unknown Rarity",
+            description=f"Pick one of: {', '.join(tier.title() for tier in masks)}",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+        return
+
+    # Owned items are a bitset per user, so progress is a popcount against each rarity's mask
+    columns = user_columns()
+    held = np.zeros(1, dtype=np.uint64)
+    if user_store.get(ctx.author.id) is not None:
+        held = columns.owned[columns.slot(ctx.author.id)]
+
+    embed = discord.Embed(title="📚 Your Collection", color=discord.Color.purple())
+    for tier, (mask, total) in masks.items():
+        if rarity is not None and tier != rarity.lower():
+            continue
+        have = fit_bitset(held, len(mask)) & mask
+        count = int(np.bitwise_count(have).sum())
+        missing = [user_store.item_ids.name(item_id) for item_id in bitset_ids(mask & ~have).tolist()]
+        shown = COLLECTION_MISSING_SHOWN if rarity is None else COLLECTION_MISSING_MAX
+
+        if not missing:
+            value = "✅ Complete!"
+        else:
+            value = "Missing: " + ", ".join(missing[:shown])
+            if len(missing) > shown:
+                value += f" and {len(missing) - shown} more"
+        embed.add_field(
+            name=f"{tier.title()} - {count}/{total} ({count / total:.0%})",
+            value=value[:1024],
+            inline=False
+        )
+
+        if rarity is not None:
+            completed = columns.completed(mask, total)
+            mentions = " ".join(f"<@{user_id}>" for user_id in completed[:COLLECTION_COMPLETERS_SHOWN])
+            embed.add_field(
+                name="🏅 Completed By",
+                value=f"{len(completed):,} player{'s' if len(completed) != 1 else ''}" + (f"\n{mentions}" if mentions else ""),
+                inline=False
+            )
+
+    if rarity is None:
+        embed.set_footer(text="Use !collection <rarity> for every missing item and who has completed it")
     await ctx.send(embed=embed)
 
+WHOHAS_SESSION_ROWS = 100
+
+@bot.command()
+async def whohas(ctx, *, item_name: str):
+    """See who holds an item and how many are in circulation"""
+    columns = user_columns()
+    actual_item_name = None
+    for name in user_store.item_ids.names:
+        if name.lower() == item_name.lower():
+            actual_item_name = name
+            break
+
+    if not actual_item_name:
+        embed = discord.Embed(
+            title="❌ Item Not Found",
+            description=f"No item called '{item_name}' exists!",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+        return
+
+    # Read from the holdings index, kept current by every inventory change, instead of scanning inventories
+    item_id = user_store.item_ids.id(actual_item_name)
+    supply, holders = columns.item_supply(item_id)
+    ranking = columns.top_holders(item_id, WHOHAS_SESSION_ROWS)
+    value, _, rarity = user_store.item_info(item_id)
+
+    async def render(page):
+        embed = discord.Embed(title=f"🔎 Who Has {actual_item_name}", color=discord.Color.blue())
+        lines = []
+        start = (page - 1) * PAGE_SIZE
+        for i, (user_id, count) in enumerate(ranking[start:start + PAGE_SIZE], start + 1):
+            lines.append(f"**{i}.** <@{user_id}> - x{count:,} ({count / supply:.1%} of supply)")
+        embed.description = "\n".join(lines) or "Nobody has this item right now!"
+
+        embed.add_field(name="📦 Supply", value=f"{supply:,} in circulation", inline=True)
+        embed.add_field(name="👥 Holders", value=f"{holders:,} player{'s' if holders != 1 else ''}", inline=True)
+        embed.add_field(name="💎 Rarity", value=f"{(rarity or 'unknown').title()} • {value:,} coins each", inline=True)
+        embed.set_footer(text=f"Page {page}/{page_count(ranking)}")
+        return embed
+
+    await send_pages(ctx, ranking, render)
+
 @bot.command()
+@user_locked
 async def sell(ctx, *, item_name: str):
     """Sell an item from your inventory"""
     user_data = get_user_data(ctx.author.id)
@@ -1848,10 +4260,8 @@ async def sell(ctx, *, item_name: str):
         await ctx.send(embed=embed)
         return
     
-    # Load items database to get value
-    items_db = load_items()
-    item_data = items_db.get(actual_item_name, {})
-    sell_value = item_data.get("value", 0)
+    # Catalog value, or the current table price with dynamic pricing on
+    sell_value = sell_price(actual_item_name)
     
     if sell_value == 0:
         embed = discord.Embed(
@@ -1867,6 +4277,7 @@ async def sell(ctx, *, item_name: str):
     
     if success:
         # Add money
+        item_prices.record_sale(user_store.item_ids.id(actual_item_name), 1)
         new_balance = add_money(ctx.author.id, sell_value)
         
         # Get remaining quantity
@@ -1913,7 +4324,7 @@ async def boxes(ctx):
             inline=False
         )
     
-    user_data = get_user_data(ctx.author.id)
+    user_data = peek_user_data(ctx.author.id)
     embed.set_footer(text=f"Your balance: {user_data['money']:,} coins")
     
     await ctx.send(embed=embed)
@@ -1927,13 +4338,13 @@ def open_mystery_box(box_id):
     rewards = box_data["rewards"]
     
     # Determine if reward is coins or items
-    rand = random.randint(1, 100)
+    rand = rng["boxes"].randint(1, 100)
     
     if rand <= rewards["coins"]["chance"]:
         # Coin reward
         amount_ranges = rewards["coins"]["amounts"]
-        chosen_range = random.choice(amount_ranges)
-        amount = random.randint(chosen_range[0], chosen_range[1])
+        chosen_range = rng["boxes"].choice(amount_ranges)
+        amount = rng["boxes"].randint(chosen_range[0], chosen_range[1])
         return {"type": "coins", "amount": amount}
     else:
         # Item reward
@@ -1947,24 +4358,25 @@ def open_mystery_box(box_id):
         ]
         
         if valid_items:
-            chosen_item = random.choice(valid_items)
+            chosen_item = rng["boxes"].choice(valid_items)
             return {"type": "item", "name": chosen_item, "data": items_db[chosen_item]}
         else:
             # Fallback to coins if no valid items
             amount_ranges = rewards["coins"]["amounts"]
-            chosen_range = random.choice(amount_ranges)
-            amount = random.randint(chosen_range[0], chosen_range[1])
+            chosen_range = rng["boxes"].choice(amount_ranges)
+            amount = rng["boxes"].randint(chosen_range[0], chosen_range[1])
             return {"type": "coins", "amount": amount}
 
 @bot.command()
+@user_locked
 async def mine(ctx):
     """Mine for coins, items, or mystery boxes"""
     user_data = get_user_data(ctx.author.id)
     
     # Generate random number 1-100 for probability
-    rand = random.randint(1, 100)
+    rand = rng["mine"].randint(1, 100)
     
-    if rand <= 92:
+    if rand <= MINE_LADDER["coal"]:
         # 92% chance: Coal (worthless)
         embed = discord.Embed(
             title="⛏️ Mining Result",
@@ -1973,9 +4385,9 @@ async def mine(ctx):
         )
         embed.set_footer(text="Try mining again for better rewards!")
         
-    elif rand <= 97:
+    elif rand <= MINE_LADDER["small_coins"]:
         # 5% chance: Small coins (1-50)
-        coin_amount = random.randint(1, 50)
+        coin_amount = rng["mine"].randint(*MINE_SMALL_COINS)
         final_balance = add_money(ctx.author.id, coin_amount)
         
         embed = discord.Embed(
@@ -1985,7 +4397,7 @@ async def mine(ctx):
         )
         embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
         
-    elif rand <= 98:
+    elif rand <= MINE_LADDER["basic_box"]:
         # 1% chance: Common mystery box
         embed = discord.Embed(
             title="⛏️ Mining Result", 
@@ -2014,9 +4426,9 @@ async def mine(ctx):
             embed.add_field(name="Value", value=f"{value:,} coins", inline=True)
             embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
         
-    elif rand <= 99:
+    elif rand <= MINE_LADDER["big_coins"]:
         # 1% chance: Big coins (50-300)
-        coin_amount = random.randint(50, 300)
+        coin_amount = rng["mine"].randint(*MINE_BIG_COINS)
         final_balance = add_money(ctx.author.id, coin_amount)
         
         embed = discord.Embed(
@@ -2026,7 +4438,7 @@ async def mine(ctx):
         )
         embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
         
-    elif rand <= 99.9:
+    elif rand <= MINE_LADDER["epic_item"]:
         # 0.1% chance: Epic item
         items_db = load_items()
         epic_items = [
@@ -2035,7 +4447,7 @@ async def mine(ctx):
         ]
         
         if epic_items:
-            chosen_item = random.choice(epic_items)
+            chosen_item = rng["mine"].choice(epic_items)
             item_data = items_db[chosen_item]
             value = item_data.get("value", 0)
             
@@ -2051,7 +4463,7 @@ async def mine(ctx):
             embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
         else:
             # Fallback if no epic items exist
-            coin_amount = random.randint(200, 800)
+            coin_amount = rng["mine"].randint(200, 800)
             final_balance = add_money(ctx.author.id, coin_amount)
             
             embed = discord.Embed(
@@ -2063,8 +4475,8 @@ async def mine(ctx):
     
     else:
         # 0.1% chance: Legendary item (100 - 99.9 = 0.1%, but let's check if it's legendary)
-        rand_decimal = random.random() * 100  # Get more precision for 0.001%
-        if rand_decimal <= 0.001:
+        rand_decimal = rng["mine"].random() * 100  # Get more precision for 0.001%
+        if rand_decimal <= MINE_LEGENDARY_CHANCE:
             # 0.001% chance: Legendary item
             items_db = load_items()
             legendary_items = [
@@ -2073,7 +4485,7 @@ async def mine(ctx):
             ]
             
             if legendary_items:
-                chosen_item = random.choice(legendary_items)
+                chosen_item = rng["mine"].choice(legendary_items)
                 item_data = items_db[chosen_item]
                 value = item_data.get("value", 0)
                 
@@ -2089,7 +4501,7 @@ async def mine(ctx):
                 embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
             else:
                 # Epic fallback
-                coin_amount = random.randint(1000, 5000)
+                coin_amount = rng["mine"].randint(1000, 5000)
                 final_balance = add_money(ctx.author.id, coin_amount)
                 
                 embed = discord.Embed(
@@ -2107,7 +4519,7 @@ async def mine(ctx):
             ]
             
             if epic_items:
-                chosen_item = random.choice(epic_items)
+                chosen_item = rng["mine"].choice(epic_items)
                 item_data = items_db[chosen_item]
                 value = item_data.get("value", 0)
                 
@@ -2123,7 +4535,7 @@ async def mine(ctx):
                 embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
             else:
                 # Fallback coins
-                coin_amount = random.randint(500, 2000)
+                coin_amount = rng["mine"].randint(500, 2000)
                 final_balance = add_money(ctx.author.id, coin_amount)
                 
                 embed = discord.Embed(
@@ -2134,19 +4546,33 @@ async def mine(ctx):
                 embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
     
     # Add Mine Again button
-    view = MineAgainView()
+    view = MineAgainView(ctx.author.id)
     await ctx.send(embed=embed, view=view)
 
 class MineAgainView(discord.ui.View):
-    def __init__(self):
+    def __init__(self, owner_id):
         super().__init__(timeout=300)  # 5 minute timeout
+        self.owner_id = owner_id
     
     @discord.ui.button(label="⛏️ Mine Again", style=discord.ButtonStyle.primary, emoji="⛏️")
+    @tracked_button("mine:again")
     async def mine_again(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # Checked first, so someone else's click can't use up the owner's dig
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("This isn't your mine!", ephemeral=True)
+            return
+        # Each Mine Again button digs once, however many times it's clicked
+        if not first_time("mine_again", interaction.message.id):
+            await interaction.response.send_message("You already mined from this button!", ephemeral=True)
+            return
+        async with user_lock(interaction.user.id):
+            await self.dig(interaction)
+
+    async def dig(self, interaction: discord.Interaction):
         # Run the mining logic again
-        rand = random.randint(1, 100)
+        rand = rng["mine"].randint(1, 100)
         
-        if rand <= 92:
+        if rand <= MINE_LADDER["coal"]:
             # 92% chance: Coal (worthless)
             embed = discord.Embed(
                 title="⛏️ Mining Result",
@@ -2155,9 +4581,9 @@ class MineAgainView(discord.ui.View):
             )
             embed.set_footer(text="Try mining again for better rewards!")
             
-        elif rand <= 97:
+        elif rand <= MINE_LADDER["small_coins"]:
             # 5% chance: Small coins (1-50)
-            coin_amount = random.randint(1, 50)
+            coin_amount = rng["mine"].randint(*MINE_SMALL_COINS)
             final_balance = add_money(interaction.user.id, coin_amount)
             
             embed = discord.Embed(
@@ -2167,7 +4593,7 @@ class MineAgainView(discord.ui.View):
             )
             embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
             
-        elif rand <= 98:
+        elif rand <= MINE_LADDER["basic_box"]:
             # 1% chance: Common mystery box
             embed = discord.Embed(
                 title="⛏️ Mining Result", 
@@ -2196,9 +4622,9 @@ class MineAgainView(discord.ui.View):
                 embed.add_field(name="Value", value=f"{value:,} coins", inline=True)
                 embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
             
-        elif rand <= 99:
+        elif rand <= MINE_LADDER["big_coins"]:
             # 1% chance: Big coins (50-300)
-            coin_amount = random.randint(50, 300)
+            coin_amount = rng["mine"].randint(*MINE_BIG_COINS)
             final_balance = add_money(interaction.user.id, coin_amount)
             
             embed = discord.Embed(
@@ -2208,7 +4634,7 @@ class MineAgainView(discord.ui.View):
             )
             embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
             
-        elif rand <= 99.9:
+        elif rand <= MINE_LADDER["epic_item"]:
             # 0.1% chance: Epic item
             items_db = load_items()
             epic_items = [
@@ -2217,7 +4643,7 @@ class MineAgainView(discord.ui.View):
             ]
             
             if epic_items:
-                chosen_item = random.choice(epic_items)
+                chosen_item = rng["mine"].choice(epic_items)
                 item_data = items_db[chosen_item]
                 value = item_data.get("value", 0)
                 
@@ -2232,7 +4658,7 @@ class MineAgainView(discord.ui.View):
                 embed.add_field(name="Value", value=f"{value:,} coins", inline=True)
                 embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
             else:
-                coin_amount = random.randint(200, 800)
+                coin_amount = rng["mine"].randint(200, 800)
                 final_balance = add_money(interaction.user.id, coin_amount)
                 
                 embed = discord.Embed(
@@ -2244,8 +4670,8 @@ class MineAgainView(discord.ui.View):
         
         else:
             # 0.1% chance: Check for legendary vs epic
-            rand_decimal = random.random() * 100
-            if rand_decimal <= 0.001:
+            rand_decimal = rng["mine"].random() * 100
+            if rand_decimal <= MINE_LEGENDARY_CHANCE:
                 # 0.001% chance: Legendary item
                 items_db = load_items()
                 legendary_items = [
@@ -2254,7 +4680,7 @@ class MineAgainView(discord.ui.View):
                 ]
                 
                 if legendary_items:
-                    chosen_item = random.choice(legendary_items)
+                    chosen_item = rng["mine"].choice(legendary_items)
                     item_data = items_db[chosen_item]
                     value = item_data.get("value", 0)
                     
@@ -2269,7 +4695,7 @@ class MineAgainView(discord.ui.View):
                     embed.add_field(name="Value", value=f"{value:,} coins", inline=True)
                     embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
                 else:
-                    coin_amount = random.randint(1000, 5000)
+                    coin_amount = rng["mine"].randint(1000, 5000)
                     final_balance = add_money(interaction.user.id, coin_amount)
                     
                     embed = discord.Embed(
@@ -2287,7 +4713,7 @@ class MineAgainView(discord.ui.View):
                 ]
                 
                 if epic_items:
-                    chosen_item = random.choice(epic_items)
+                    chosen_item = rng["mine"].choice(epic_items)
                     item_data = items_db[chosen_item]
                     value = item_data.get("value", 0)
                     
@@ -2302,7 +4728,7 @@ class MineAgainView(discord.ui.View):
                     embed.add_field(name="Value", value=f"{value:,} coins", inline=True)
                     embed.add_field(name="Quantity Owned", value=f"{quantity}", inline=True)
                 else:
-                    coin_amount = random.randint(500, 2000)
+                    coin_amount = rng["mine"].randint(500, 2000)
                     final_balance = add_money(interaction.user.id, coin_amount)
                     
                     embed = discord.Embed(
@@ -2313,13 +4739,14 @@ class MineAgainView(discord.ui.View):
                     embed.add_field(name="New Balance", value=f"{final_balance:,} coins", inline=True)
         
         # Add Mine Again button to the new result
-        new_view = MineAgainView()
+        new_view = MineAgainView(interaction.user.id)
         await interaction.response.send_message(embed=embed, view=new_view)
 
 @bot.command()
+@user_locked
 async def bank(ctx, action: str = "balance", amount: int = 0):
     """Bank system - deposit, withdraw, or check balance"""
-    user_data = get_user_data(ctx.author.id)
+    user_data = peek_user_data(ctx.author.id)
     
     if action.lower() in ["balance", "bal"]:
         embed = discord.Embed(
@@ -2348,7 +4775,7 @@ async def bank(ctx, action: str = "balance", amount: int = 0):
         else:
             new_wallet = user_data['money'] - amount
             new_bank = user_data['bank'] + amount
-            update_user_data(ctx.author.id, money=new_wallet, bank=new_bank)
+            update_user_data(ctx.author.id, money=new_wallet, bank=new_bank, expected_version=user_data["version"])
             
             embed = discord.Embed(
                 title="🏦 Deposit Successful",
@@ -2374,7 +4801,7 @@ async def bank(ctx, action: str = "balance", amount: int = 0):
         else:
             new_wallet = user_data['money'] + amount
             new_bank = user_data['bank'] - amount
-            update_user_data(ctx.author.id, money=new_wallet, bank=new_bank)
+            update_user_data(ctx.author.id, money=new_wallet, bank=new_bank, expected_version=user_data["version"])
             
             embed = discord.Embed(
                 title="🏦 Withdrawal Successful",
@@ -2393,28 +4820,67 @@ async def bank(ctx, action: str = "balance", amount: int = 0):
     
     await ctx.send(embed=embed)
 
+HISTORY_PAGE_SIZE = 10
+
+@bot.command()
+async def history(ctx, page: int = 1):
+    """Your recent coin movements from the ledger"""
+    page = max(page, 1)
+    entries = ledger.history(ctx.author.id, skip=(page - 1) * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE)
+
+    embed = discord.Embed(
+        title=f"📜 {ctx.author.display_name}'s Coin History",
+        color=discord.Color.blue()
+    )
+    if not entries:
+        embed.description = "No transactions on this page." if page > 1 else "No transactions yet!"
+    else:
+        lines = []
+        for entry in entries:
+            icon = "🏛️" if entry["account"] == "bank" else "💰"
+            draw = f" 🎲 `{entry['stream']}#{entry['draw']}`" if entry["draw"] >= 0 else ""
+            lines.append(
+                f"<t:{int(entry['time'])}:R> {icon} **{entry['delta']:+,}** "
+                f"→ {entry['balance']:,} • `{entry['reason']}`{draw}"
+            )
+        embed.description = "\n".join(lines)
+    embed.set_footer(text=f"Page {page} • Use !history {page + 1} for older entries")
+
+    await ctx.send(embed=embed)
+
+# Columns each leaderboard ranks by (summed when there are several)
+LEADERBOARD_KEYS = {
+    "money": ("money",),
+    "level": ("level",),
+    "bank": ("bank",),
+    "total": ("money", "bank")
+}
+
+def leaderboard_entries(board, limit=10):
+    """The top (user_id, data) pairs for a leaderboard, best first"""
+    top = user_columns().top(LEADERBOARD_KEYS[board], limit)
+    return [(user_id, peek_user_data(user_id)) for user_id, _ in top]
+
 @bot.command()
 async def leaderboard(ctx, category: str = "money"):
     """View leaderboards - money, level, or bank"""
-    users = load_users()
-    
     if category.lower() in ["money", "coins", "wealth"]:
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("money", 0), reverse=True)
+        board = "money"
         title = "💰 Money Leaderboard"
         field_name = "Coins"
         
     elif category.lower() in ["level", "lvl", "xp"]:
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("level", 1), reverse=True)
+        board = "level"
         title = "⭐ Level Leaderboard"
         field_name = "Level"
         
     elif category.lower() in ["bank", "savings"]:
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("bank", 0), reverse=True)
+        board = "bank"
         title = "🏦 Bank Leaderboard"
         field_name = "Bank Balance"
         
     elif category.lower() in ["total", "net", "worth"]:
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("money", 0) + x[1].get("bank", 0), reverse=True)
+        board = "total"
         title = "💎 Net Worth Leaderboard"
         field_name = "Total Worth"
         
@@ -2427,39 +4893,44 @@ async def leaderboard(ctx, category: str = "money"):
         await ctx.send(embed=embed)
         return
     
-    embed = discord.Embed(title=title, color=discord.Color.gold())
-    
-    top_10 = sorted_users[:10]
-    description = ""
+    # One ranking per session; flipping pages only looks up the ten users shown
+    ranking = user_columns().top(LEADERBOARD_KEYS[board], LEADERBOARD_SESSION_ROWS)
     
-    for i, (user_id, data) in enumerate(top_10, 1):
-        try:
-            user = await bot.fetch_user(int(user_id))
-            username = user.display_name if user else f"User {user_id}"
-        except:
-            username = f"User {user_id}"
+    async def render(page):
+        embed = discord.Embed(title=title, color=discord.Color.gold())
+        description = ""
+        
+        start = (page - 1) * PAGE_SIZE
+        for i, (user_id, _) in enumerate(ranking[start:start + PAGE_SIZE], start + 1):
+            try:
+                user = await bot.fetch_user(int(user_id))
+                username = user.display_name if user else f"User {user_id}"
+            except:
+                username = f"User {user_id}"
+            data = peek_user_data(user_id)
+            
+            if board == "money":
+                value = data.get("money", 0)
+                description += f"**{i}.** {username} - {value:,} coins\n"
+            elif board == "level":
+                level = data.get("level", 1)
+                xp = data.get("xp", 0)
+                description += f"**{i}.** {username} - Level {level} ({xp:,} XP)\n"
+            elif board == "bank":
+                value = data.get("bank", 0)
+                description += f"**{i}.** {username} - {value:,} coins\n"
+            elif board == "total":
+                total = data.get("money", 0) + data.get("bank", 0)
+                description += f"**{i}.** {username} - {total:,} coins\n"
+        
+        if not description:
+            description = "No users found!"
         
-        if category.lower() in ["money", "coins", "wealth"]:
-            value = data.get("money", 0)
-            description += f"**{i}.** {username} - {value:,} coins\n"
-        elif category.lower() in ["level", "lvl", "xp"]:
-            level = data.get("level", 1)
-            xp = data.get("xp", 0)
-            description += f"**{i}.** {username} - Level {level} ({xp:,} XP)\n"
-        elif category.lower() in ["bank", "savings"]:
-            value = data.get("bank", 0)
-            description += f"**{i}.** {username} - {value:,} coins\n"
-        elif category.lower() in ["total", "net", "worth"]:
-            total = data.get("money", 0) + data.get("bank", 0)
-            description += f"**{i}.** {username} - {total:,} coins\n"
-    
-    if not description:
-        description = "No users found!"
-    
-    embed.description = description
-    embed.set_footer(text="Use !leaderboard <money/level/bank/total>")
+        embed.description = description
+        embed.set_footer(text=f"Page {page}/{page_count(ranking)} • Use !leaderboard <money/level/bank/total>")
+        return embed
     
-    await ctx.send(embed=embed)
+    await send_pages(ctx, ranking, render)
 
 @bot.command()
 async def give(ctx, target: discord.Member, amount: int):
@@ -2482,20 +4953,21 @@ async def give(ctx, target: discord.Member, amount: int):
         await ctx.send(embed=embed)
         return
     
-    giver_data = get_user_data(ctx.author.id)
-    if giver_data["money"] < amount:
-        embed = discord.Embed(
-            title="❌ Insufficient Funds",
-            description=f"You don't have {amount:,} coins!",
-            color=discord.Color.red()
-        )
-        await ctx.send(embed=embed)
-        return
-    
-    # Transfer money
-    giver_new_balance = giver_data["money"] - amount
-    receiver_new_balance = add_money(target.id, amount)
-    update_user_data(ctx.author.id, money=giver_new_balance)
+    async with user_locks(ctx.author.id, target.id):
+        giver_data = get_user_data(ctx.author.id)
+        if giver_data["money"] < amount:
+            embed = discord.Embed(
+                title="❌ Insufficient Funds",
+                description=f"You don't have {amount:,} coins!",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+
+        # Transfer money: debit the giver first, so a conflicting write can't mint coins
+        giver_new_balance = giver_data["money"] - amount
+        update_user_data(ctx.author.id, money=giver_new_balance, expected_version=giver_data["version"])
+        receiver_new_balance = add_money(target.id, amount)
     
     embed = discord.Embed(
         title="💝 Gift Sent!",
@@ -2508,6 +4980,7 @@ async def give(ctx, target: discord.Member, amount: int):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def coinflip(ctx, bet: int, choice: str = "heads"):
     """Simple coinflip betting game"""
     if bet <= 0:
@@ -2537,10 +5010,11 @@ async def coinflip(ctx, bet: int, choice: str = "heads"):
         )
         await ctx.send(embed=embed)
         return
+    record_wager(ctx.author.id, "coinflip", bet)
     
     # Normalize choice
     player_choice = "heads" if choice.lower() in ["heads", "h"] else "tails"
-    coin_result = random.choice(["heads", "tails"])
+    coin_result = rng["coinflip"].choice(["heads", "tails"])
     
     if player_choice == coin_result:
         # Win
@@ -2572,57 +5046,43 @@ async def coinflip(ctx, bet: int, choice: str = "heads"):
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def achievements(ctx):
     """View your achievements"""
-    user_data = get_user_data(ctx.author.id)
-    achievements = user_data.get("achievements", [])
-    
-    # Check for new achievements
-    money = user_data.get("money", 0)
-    level = user_data.get("level", 1)
-    total_worth = money + user_data.get("bank", 0)
-    
-    possible_achievements = {
-        "first_coins": {"name": "💰 First Coins", "desc": "Earn your first 1,000 coins", "req": money >= 1000},
-        "high_roller": {"name": "🎰 High Roller", "desc": "Accumulate 10,000 coins", "req": money >= 10000},
-        "millionaire": {"name": "💎 Millionaire", "desc": "Reach 1,000,000 coins", "req": total_worth >= 1000000},
-        "level_5": {"name": "⭐ Rising Star", "desc": "Reach level 5", "req": level >= 5},
-        "level_10": {"name": "🌟 Experienced", "desc": "Reach level 10", "req": level >= 10},
-        "gambler": {"name": "🎲 Gambler", "desc": "Use any gambling command", "req": True}  # Auto-unlock
-    }
-    
-    new_achievements = []
-    for ach_id, ach_data in possible_achievements.items():
-        if ach_id not in achievements and ach_data["req"]:
-            achievements.append(ach_id)
-            new_achievements.append(ach_data["name"])
-    
+    user_data = peek_user_data(ctx.author.id)
+
+    # Writes unlock achievements as they cross thresholds; this catches up records from before that
+    new_achievements = unlock_achievements({}, user_data)
     if new_achievements:
-        update_user_data(ctx.author.id, achievements=achievements)
-    
+        update_user_data(ctx.author.id, achievements=user_data["achievements"], expected_version=user_data["version"])
+    achievements = [ach_id for ach_id in ACHIEVEMENTS if ach_id in user_data["achievements"]]
+
     embed = discord.Embed(
         title="🏆 Your Achievements",
         color=discord.Color.gold()
     )
-    
+
     if achievements:
-        description = ""
-        for ach_id in achievements:
-            if ach_id in possible_achievements:
-                ach = possible_achievements[ach_id]
-                description += f"{ach['name']} - {ach['desc']}\n"
-        embed.description = description
+        embed.description = "\n".join(f"{ACHIEVEMENTS[ach_id]['name']} - {ACHIEVEMENTS[ach_id]['desc']}" for ach_id in achievements)
     else:
         embed.description = "No achievements yet! Keep playing to unlock them!"
-    
-    embed.add_field(name="Progress", value=f"{len(achievements)}/{len(possible_achievements)} unlocked", inline=True)
-    
+
+    embed.add_field(name="Progress", value=f"{len(achievements)}/{len(ACHIEVEMENTS)} unlocked", inline=True)
+
+    locked = [
+        f"{ach['name']} - {min(achievement_value(user_data, ach['field']), ach['min']):,}/{ach['min']:,}"
+        for ach_id, ach in ACHIEVEMENTS.items() if ach_id not in achievements
+    ]
+    if locked:
+        embed.add_field(name="🔒 Still Locked", value="\n".join(locked), inline=False)
+
     if new_achievements:
-        embed.add_field(name="🎉 New Achievements!", value="\n".join(new_achievements), inline=False)
+        embed.add_field(name="🎉 New Achievements!", value="\n".join(ACHIEVEMENTS[ach_id]["name"] for ach_id in new_achievements), inline=False)
     
     await ctx.send(embed=embed)
 
 @bot.command()
+@user_locked
 async def sellall(ctx):
     """Sell ALL items in your inventory for coins"""
     user_data = get_user_data(ctx.author.id)
@@ -2638,38 +5098,45 @@ async def sellall(ctx):
         return
 
     items_db = load_items()
-    total_value = 0
-    sold_items = []
+    view = user_store.inventory_view(ctx.author.id)
+    total_value = view.total  # unknown items are worth 0 and stay behind
+    sold_count = 0
 
     # Loop through and sell everything
-    for item_name, quantity in list(inventory.items()):
-        item_data = items_db.get(item_name)
-        if not item_data:
+    for item_name in list(inventory):
+        if item_name not in items_db:
             continue  # skip unknown items
-
-        value = item_data.get("value", 0)
-        item_total = value * quantity
-        total_value += item_total
-        sold_items.append(f"{item_name} x{quantity} ({item_total:,} coins)")
+        sold_count += 1
 
         # Remove from inventory
         del inventory[item_name]
 
+    # The most valuable first, straight from the sorted view
+    sold_items, sold_quantities = [], []
+    for item_id, quantity, value in view.page(0, len(view.order)):
+        item_name = user_store.item_ids.name(item_id)
+        if item_name in items_db:
+            sold_quantities.append((item_id, quantity))
+            if len(sold_items) < 10:
+                sold_items.append(f"{item_name} x{quantity} ({value * quantity:,} coins)")
+
     # Update user data
-    update_user_data(ctx.author.id, inventory=inventory)
+    update_user_data(ctx.author.id, inventory=inventory, expected_version=user_data["version"])
     new_balance = add_money(ctx.author.id, total_value)
+    for item_id, quantity in sold_quantities:
+        item_prices.record_sale(item_id, quantity)  # dumps weigh on the next price refresh
 
     # Build result embed
     embed = discord.Embed(
         title="💰 Sell All Items",
-        description=f"You sold **{len(sold_items)} items** for **{total_value:,} coins**!",
+        description=f"You sold **{sold_count} items** for **{total_value:,} coins**!",
         color=discord.Color.green()
     )
 
     # Show top 10 sold items to avoid overflow
     if sold_items:
         display_list = sold_items[:10]
-        more = len(sold_items) - 10
+        more = sold_count - len(display_list)
         if more > 0:
             display_list.append(f"...and {more} more")
 
@@ -2774,20 +5241,244 @@ async def delete_error(ctx, error):
         )
         await ctx.send(embed=embed)
 
-def save_us(data):
-    with open("users.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+def format_bytes(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
 
-# Load items
-def load_items():
-    with open("items.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def stats(ctx):
+    """Per-command latency and storage I/O (Admin only)"""
+    dump_metrics()
+
+    embed = discord.Embed(
+        title="📈 Command Stats",
+        description=f"Busiest commands since startup • full dump in `{METRICS_FILE}`",
+        color=discord.Color.blue()
+    )
+
+    busiest = sorted(COMMAND_STATS.items(), key=lambda x: x[1].latency.total, reverse=True)[:10]
+    for name, command in busiest:
+        latency = command.latency
+        reads = sum(count for op, count in command.storage_ops.items() if op.startswith("load"))
+        writes = sum(count for op, count in command.storage_ops.items() if op.startswith(("save", "write")))
+        embed.add_field(
+            name=f"!{name}" if name in bot.all_commands else name,
+            value=f"{latency.count:,} calls • {command.errors} errors\n"
+                  f"p50 {latency.quantile(0.5) * 1000:,.1f}ms • p99 {latency.quantile(0.99) * 1000:,.1f}ms • "
+                  f"max {latency.max * 1000:,.1f}ms\n"
+                  f"📖 {reads:,} reads ({format_bytes(command.bytes_read)}) • "
+                  f"💾 {writes:,} writes ({format_bytes(command.bytes_written)})",
+            inline=False
+        )
+
+    if not busiest:
+        embed.description = "No commands recorded yet."
+
+    await ctx.send(embed=embed)
+
+@stats.error
+async def stats_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        embed = discord.Embed(
+            title="❌ Permission Denied",
+            description="You need Administrator permissions to use this command!",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def lag(ctx):
+    """Event loop lag and the handlers that blocked it (Admin only)"""
+    lag = loop_monitor.lag
+    embed = discord.Embed(
+        title="🐢 Event Loop Lag",
+        description=f"{lag.count:,} samples every {LOOP_LAG_INTERVAL:g}s • "
+                    f"p50 {lag.quantile(0.5) * 1000:,.1f}ms • p99 {lag.quantile(0.99) * 1000:,.1f}ms • "
+                    f"max {lag.max * 1000:,.1f}ms",
+        color=discord.Color.orange()
+    )
+
+    # Lag histogram at power-of-two bounds, skipping the empty tail
+    previous = 0
+    bars = []
+    for le, count in lag.cumulative():
+        if count > previous:
+            bars.append(f"≤{le * 1000:>8,.1f}ms {count - previous:>7,}")
+        previous = count
+    if bars:
+        embed.add_field(name="Histogram", value="```" + "\n".join(bars[-12:]) + "```", inline=False)
+
+    worst = sorted(loop_monitor.offenders.items(), key=lambda x: x[1].total, reverse=True)[:5]
+    if worst:
+        embed.add_field(
+            name=f"Worst Offenders (stalls ≥ {LOOP_STALL_THRESHOLD * 1000:g}ms)",
+            value="\n".join(
+                f"`{handler}` • {stalls.count:,} stalls • {stalls.total:,.2f}s total • max {stalls.max * 1000:,.0f}ms"
+                for handler, stalls in worst
+            ),
+            inline=False
+        )
+
+    if loop_monitor.recent:
+        embed.add_field(
+            name="Recent Stalls",
+            value="\n".join(
+                f"<t:{int(at)}:T> {seconds * 1000:,.0f}ms `{handler}` {where}"
+                for at, seconds, handler, where in list(loop_monitor.recent)[-5:]
+            ),
+            inline=False
+        )
+
+    if loop_monitor.slow_callbacks:
+        embed.add_field(
+            name="Slow Callbacks (asyncio debug)",
+            value="\n".join(
+                f"{seconds * 1000:,.0f}ms `{handler}` {handle[:80]}"
+                for at, seconds, handler, handle in list(loop_monitor.slow_callbacks)[-5:]
+            ),
+            inline=False
+        )
+    elif not LOOP_DEBUG:
+        embed.set_footer(text="Set LOOP_DEBUG=1 to also capture asyncio slow-callback reports")
+
+    await ctx.send(embed=embed)
+
+@lag.error
+async def lag_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        embed = discord.Embed(
+            title="❌ Permission Denied",
+            description="You need Administrator permissions to use this command!",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+
+@bot.command(name="economy")
+@commands.has_permissions(administrator=True)
+async def economy_cmd(ctx, window: str = "24h"):
+    """House edge and money supply from the live ledger stream (Admin only)"""
+    if window not in ECONOMY_WINDOWS:
+        await ctx.send(f"❌ Window must be one of: {', '.join(ECONOMY_WINDOWS)}")
+        return
+    seconds = ECONOMY_WINDOWS[window]
+
+    embed = discord.Embed(
+        title=f"📊 Economy • {'all time' if seconds is None else 'last ' + window}",
+        color=discord.Color.gold()
+    )
+
+    minted, burned = economy.minted_and_burned(seconds)
+    net = sum(minted.values()) - sum(burned.values())
+    top = lambda flows: "\n".join(f"`{reason}` {amount:,}" for reason, amount in sorted(flows.items(), key=lambda x: -x[1])[:5]) or "—"
+    embed.add_field(name="🪙 Money Supply", value=f"**{net:+,}** coins net", inline=False)
+    embed.add_field(name=f"Minted ({sum(minted.values()):,})", value=top(minted), inline=True)
+    embed.add_field(name=f"Burned ({sum(burned.values()):,})", value=top(burned), inline=True)
+
+    lines = []
+    for game in sorted(economy.wagered, key=lambda g: -economy.wagered[g].total(seconds)):
+        wagered = economy.wagered[game].total(seconds)
+        paid = economy.paid[game].total(seconds)
+        if not wagered:
+            continue
+        lines.append(
+            f"`{game}` {economy.rounds[game].total(seconds):,} bets • {wagered:,} in • {paid:,} out • "
+            f"edge **{(wagered - paid) / wagered:+.1%}**"
+        )
+    embed.add_field(name="🎰 Games (realized house edge)", value="\n".join(lines) or "No bets yet.", inline=False)
+
+    embed.add_field(
+        name="🏦 House Account",
+        value=f"Bank: {economy.house_balance:,} coins\nIncome: {economy.house_income.total(seconds):,} coins",
+        inline=True
+    )
+    richest, richest_id = economy.richest
+    credit, credit_id, credit_reason = economy.largest_credit
+    embed.add_field(
+        name="🐳 Records",
+        value=(f"Richest: <@{richest_id}> {richest:,}\n" if richest_id else "") +
+              (f"Largest credit: <@{credit_id}> +{credit:,} (`{credit_reason}`)" if credit_id else "No credits yet."),
+        inline=True
+    )
+    columns = user_columns()
+    worth = ("money", "bank")
+    p50, p90, p99 = columns.percentiles(worth, [50, 90, 99])
+    embed.add_field(
+        name="👥 Players",
+        value=f"{columns.size:,} players • {columns.sum('money') + columns.sum('bank'):,} coins held\n"
+              f"Net worth p50 {p50:,.0f} • p90 {p90:,.0f} • p99 {p99:,.0f}\n"
+              f"Gini {columns.gini(worth):.3f}",
+        inline=False
+    )
+    embed.set_footer(text="Use !economy <1h/24h/all> • Aggregates are rebuilt from the ledger on restart")
+
+    await ctx.send(embed=embed)
+
+@economy_cmd.error
+async def economy_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        embed = discord.Embed(
+            title="❌ Permission Denied",
+            description="You need Administrator permissions to use this command!",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def export(ctx):
+    """Dump users and lottery counts to JSON in the old users.json / win.json format (Admin only)"""
+    count = await export_json()
+    embed = discord.Embed(
+        title="📦 Export Complete",
+        description=f"Wrote **{count:,}** users to `{EXPORT_USERS_FILE}` and lottery counts to `{EXPORT_WIN_FILE}`.",
+        color=discord.Color.green()
+    )
+    await ctx.send(embed=embed)
+
+@bot.command(name="import")
+@commands.has_permissions(administrator=True)
+async def import_(ctx):
+    """Replace all users and lottery counts with the export files (Admin only; the old store is kept as .old)"""
+    if not os.path.exists(EXPORT_USERS_FILE):
+        embed = discord.Embed(
+            title="❌ Nothing to Import",
+            description=f"`{EXPORT_USERS_FILE}` doesn't exist. Run `!export` or put a users.json-format file there.",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+        return
+    global house_bank_estimate
+    async with user_lock(HOUSE_ACCOUNT_ID):  # the house record is written here, like in house_settle_loop
+        settle_house_bank()
+        async with user_store.background:  # wait out a running export or compaction
+            user_store.migrate(EXPORT_USERS_FILE, EXPORT_WIN_FILE)
+        house_bank_estimate = None  # re-read from the imported house account
+    embed = discord.Embed(
+        title="📥 Import Complete",
+        description=f"Loaded **{len(user_store):,}** users from `{EXPORT_USERS_FILE}`. The previous store was kept as `{USER_BASE_FILE}.old`.",
+        color=discord.Color.green()
+    )
+    await ctx.send(embed=embed)
+
+@export.error
+@import_.error
+async def export_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        embed = discord.Embed(
+            title="❌ Permission Denied",
+            description="You need Administrator permissions to use this command!",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
 
 @bot.command()
 async def giveitem(ctx, user: commands.MemberConverter, *, item_name: str):
     # Only allow the specific user
-    allowed_user_id = "946865197757399040"
-    if str(ctx.author.id) != allowed_user_id:
+    if str(ctx.author.id) != HOUSE_ACCOUNT_ID:
         embed = discord.Embed(
             title="❌ Permission Denied",
             description="You are not allowed to use this command.",
@@ -2803,7 +5494,6 @@ async def giveitem(ctx, user: commands.MemberConverter, *, item_name: str):
         item_name = parts[0]
         amount = int(parts[1])
 
-    users = load_users()
     items = load_items()
 
     if item_name not in items:
@@ -2816,21 +5506,23 @@ async def giveitem(ctx, user: commands.MemberConverter, *, item_name: str):
         return
 
     user_id = str(user.id)
-    if user_id not in users:
-        users[user_id] = {
-            "money": 100,
-            "xp": 0,
-            "level": 1,
-            "inventory": {},
-            "last_daily": 0
-        }
+    async with user_lock(user_id):
+        user_data = read_user(user_id)
+        if user_data is None:
+            user_data = {
+                "money": 100,
+                "xp": 0,
+                "level": 1,
+                "inventory": {},
+                "last_daily": 0
+            }
 
-    if item_name in users[user_id]["inventory"]:
-        users[user_id]["inventory"][item_name] += amount
-    else:
-        users[user_id]["inventory"][item_name] = amount
+        if item_name in user_data["inventory"]:
+            user_data["inventory"][item_name] += amount
+        else:
+            user_data["inventory"][item_name] = amount
 
-    save_users(users)
+        commit_user(user_id, user_data)
 
     embed = discord.Embed(
         title="✅ Item Given",
@@ -2840,17 +5532,30 @@ async def giveitem(ctx, user: commands.MemberConverter, *, item_name: str):
     await ctx.send(embed=embed)
 
 
+# Flex animation frames per rarity; {name}, {item} and {rarity} are filled in per flex
+FLEX_ANIMATIONS = {
+    "common": ["🤏 Flexing...", "{name} flexes a **{item}** (Common)"],
+    "uncommon": ["💪 Flexing...", "💪💎", "{name} flexes a shiny **{item}** (Uncommon)"],
+    "rare": ["✨ Flexing...", "✨💪✨", "{name} flexes a **{item}** (Rare)"],
+    "epic": ["⚡ Flexing...", "⚡💪⚡", "⚡💎⚡", "{name} flexes an **{item}** (Epic)"],
+    "legendary": ["🔥 Flexing...", "🔥💪🔥", "🔥💎🔥", "🔥👑🔥", "{name} flexes a **{item}** (Legendary)"],
+    "mythic": ["🌌 Flexing...", "🌌💪🌌", "🌌💎🌌", "🌌👑🌌", "{name} flexes a **{item}** (Mythic)"],
+    "cosmic": ["🌠 Flexing...", "🌠💪🌠", "🌠💎🌠", "🌠👑🌠", "🌠🌌🌠", "{name} flexes a **{item}** (Cosmic 🌌👑🔥)"],
+    "null": ["⁉️ Flexing...", "⁉️🚫⁉️", "⁉️⭕⁉️", "⁉️❌⁉️", "⁉️💢⁉️", "{name} flexes a **{item}** (Null ⁉️⁉️⁉️)"]
+}
+FLEX_FALLBACK = ["{name} flexes a **{item}** ({rarity})"]
+
 # Flex command with animation
 @bot.command()
 async def flex(ctx, user: commands.MemberConverter = None):
     if user is None:
         user = ctx.author
 
-    users = load_users()
-    items = load_items()
-    user_id = str(user.id)
+    # Best item comes from the cached inventory view, kept current on every inventory change
+    view = user_store.inventory_view(user.id)
+    best_id = view.best() if view else None
 
-    if user_id not in users or not users[user_id]["inventory"]:
+    if best_id is None:
         embed = discord.Embed(
             title="💨 Nothing to flex",
             description=f"{user.mention} has no items to flex.",
@@ -2859,35 +5564,12 @@ async def flex(ctx, user: commands.MemberConverter = None):
         await ctx.send(embed=embed)
         return
 
-    # Determine best item
-    rarity_order = ["common", "uncommon", "rare", "epic", "legendary", "mythic", "cosmic", "null"]
-    best_item = None
-    best_rarity_index = -1
-    best_rarity_name = "Common"
-
-    for item_name in users[user_id]["inventory"]:
-        if item_name in items:
-            rarity = items[item_name].get("rarity", "common")
-            rarity_index = rarity_order.index(rarity.lower()) if rarity.lower() in rarity_order else 0
-            if rarity_index > best_rarity_index:
-                best_rarity_index = rarity_index
-                best_item = item_name
-                best_rarity_name = rarity.capitalize()
-
-    # Animation frames depending on rarity
-    animations = {
-        "common": ["🤏 Flexing...", f"{user.display_name} flexes a **{best_item}** (Common)"],
-        "uncommon": ["💪 Flexing...", "💪💎", f"{user.display_name} flexes a shiny **{best_item}** (Uncommon)"],
-        "rare": ["✨ Flexing...", "✨💪✨", f"{user.display_name} flexes a **{best_item}** (Rare)"],
-        "epic": ["⚡ Flexing...", "⚡💪⚡", "⚡💎⚡", f"{user.display_name} flexes an **{best_item}** (Epic)"],
-        "legendary": ["🔥 Flexing...", "🔥💪🔥", "🔥💎🔥", "🔥👑🔥", f"{user.display_name} flexes a **{best_item}** (Legendary)"],
-        "mythic": ["🌌 Flexing...", "🌌💪🌌", "🌌💎🌌", "🌌👑🌌", f"{user.display_name} flexes a **{best_item}** (Mythic)"],
-        "cosmic": ["🌠 Flexing...", "🌠💪🌠", "🌠💎🌠", "🌠👑🌠", "🌠🌌🌠", f"{user.display_name} flexes a **{best_item}** (Cosmic 🌌👑🔥)"],
-        "null": ["⁉️ Flexing...", "⁉️🚫⁉️", "⁉️⭕⁉️", "⁉️❌⁉️", "⁉️💢⁉️", f"{user.display_name} flexes a **{best_item}** (Null ⁉️⁉️⁉️)"]
-    }
+    best_item = user_store.item_ids.name(best_id)
+    best_rarity_name = user_store.item_info(best_id)[2].capitalize()
 
     rarity_key = best_rarity_name.lower()
-    frames = animations.get(rarity_key, [f"{user.display_name} flexes a **{best_item}** ({best_rarity_name})"])
+    templates = FLEX_ANIMATIONS.get(rarity_key, FLEX_FALLBACK)
+    frames = [frame.format(name=user.display_name, item=best_item, rarity=best_rarity_name) for frame in templates]
 
     # Start animation
     msg = await ctx.send(embed=discord.Embed(description=frames[0], color=discord.Color.gold()))
@@ -2898,14 +5580,17 @@ async def flex(ctx, user: commands.MemberConverter = None):
 @bot.command(name="givecoins")
 async def givecoins(ctx, user_id: int, amount: int):
     uid = str(user_id)  # JSON keys are strings
-    users = load_users()
+    users = {uid: read_user(uid)}
 
-    if uid not in users:
-        await ctx.send(f"❌ User `{uid}` not found in users.json")
+    if users[uid] is None:
+        await ctx.send(f"❌ User `{uid}` not found")
         return
 
-    users[uid]["money"] = users[uid].get("money", 0) + amount
-    save_us(users)
+    async with user_lock(uid):
+        users[uid] = read_user(uid)  # re-read under the lock
+        users[uid]["money"] = users[uid].get("money", 0) + amount
+        commit_user(uid, users[uid])
+        ledger.append(uid, "money", amount, users[uid]["money"], current_command.get())
 
     embed = discord.Embed(
         title="💰 Money Added!",
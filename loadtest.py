@@ -0,0 +1,260 @@
+"""
+Headless load test for the bot's command coroutines.
+
+Runs thousands of virtual users against a throwaway copy of the data files,
+calling the command callbacks in bot.py directly with stub ctx / Message /
+Member / Guild objects. Nothing talks to Discord and no token is needed:
+ctx.send, channel.send and message.edit just record the call.
+
+Usage:
+    python loadtest.py --users 2000 --duration 30
+    python loadtest.py --users 500 --mix profile=1,slots=1 --think 0.2 --seed 1
+
+Reports throughput, per-command p50/p99 latency, storage I/O per command
+(from bot.COMMAND_STATS) and event-loop lag.
+"""
+import argparse
+import asyncio
+import atexit
+import collections
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import bot
+
+DEFAULT_MIX = "profile=3,slots=3,roll=2,leaderboard=1,mine=3,buy=1,on_message=6"
+
+# Every stubbed Discord call lands here: {"send": n, "edit": n, ...}
+CALLS = collections.Counter()
+
+
+# --- Fake Discord objects ---
+class FakeAsset:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+class FakeRole:
+    def __init__(self, name):
+        self.name = name
+        self.id = hash(name) & 0xFFFFFFFF
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.roles = []
+
+    async def create_role(self, name, **kwargs):
+        CALLS["create_role"] += 1
+        role = FakeRole(name)
+        self.roles.append(role)
+        return role
+
+class FakeMember:
+    bot = False
+    avatar = None
+    display_avatar = FakeAsset()
+
+    def __init__(self, user_id, guild):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.guild = guild
+        self.roles = []
+
+    async def add_roles(self, *roles):
+        CALLS["add_roles"] += 1
+        self.roles.extend(roles)
+
+class FakeMessage:
+    _next_id = 1
+    _state = None  # read by commands.Context when on_message falls through to process_commands
+
+    def __init__(self, content="", author=None, channel=None, guild=None):
+        self.id = FakeMessage._next_id
+        FakeMessage._next_id += 1
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+
+    async def edit(self, **kwargs):
+        CALLS["edit"] += 1
+        return self
+
+    async def delete(self):
+        CALLS["delete"] += 1
+
+    async def add_reaction(self, emoji):
+        CALLS["add_reaction"] += 1
+
+class FakeChannel:
+    mention = "#load-test"
+
+    async def send(self, content=None, **kwargs):
+        CALLS["send"] += 1
+        return FakeMessage(content or "", channel=self)
+
+class FakeContext:
+    def __init__(self, author, guild, channel, content=""):
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.message = FakeMessage(content, author, channel, guild)
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+async def fake_fetch_user(user_id):
+    CALLS["fetch_user"] += 1
+    return None
+
+
+# --- Traffic ---
+def command_args(name, pick):
+    """Positional arguments for a command callback"""
+    if name == "slots":
+        return (pick([10, 50, 100, 500]),)
+    if name == "buy":
+        return (pick(["daily_coins", "xp_boost", "basic"]),)
+    return ()
+
+async def invoke(name, member, guild, channel, pick):
+    """Run one command (or a chat message through on_message)"""
+    if name == "on_message":
+        message = FakeMessage(pick(["hello", "gg", "anyone up?"]), member, channel, guild)
+        await bot.on_message(message)
+        return
+    ctx = FakeContext(member, guild, channel, f"!{name}")
+    with bot.track_command(name):
+        await bot.bot.get_command(name).callback(ctx, *command_args(name, pick))
+
+async def virtual_user(user_id, guild, mix, deadline, think, seed, results):
+    rnd = random.Random(seed)
+    member = FakeMember(user_id, guild)
+    channel = FakeChannel()
+    names, weights = zip(*mix.items())
+
+    # Spread the start so users don't arrive in one burst
+    await asyncio.sleep(min(rnd.random() * think, deadline - time.perf_counter()))
+    while time.perf_counter() < deadline:
+        name = rnd.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            await invoke(name, member, guild, channel, rnd.choice)
+        except Exception as e:
+            results["errors"][name] += 1
+            results["last_error"][name] = repr(e)
+        results["latency"][name].record(time.perf_counter() - started)
+        pause = rnd.expovariate(1 / think) if think > 0 else 0
+        await asyncio.sleep(max(0.0, min(pause, deadline - time.perf_counter())))
+
+async def loop_lag_sampler(deadline, interval, histogram):
+    while time.perf_counter() < deadline:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        histogram.record(max(0.0, time.perf_counter() - expected))
+
+async def run(args, mix):
+    guild = FakeGuild()
+    results = {
+        "latency": collections.defaultdict(bot.LatencyHistogram),
+        "errors": collections.Counter(),
+        "last_error": {}
+    }
+    lag = bot.LatencyHistogram()
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    users = [
+        virtual_user(1_000_000 + i, guild, mix, deadline, args.think, args.seed * 100_003 + i, results)
+        for i in range(args.users)
+    ]
+    await asyncio.gather(loop_lag_sampler(deadline, args.lag_interval, lag), *users)
+    return results, lag, time.perf_counter() - started
+
+
+# --- Setup / reporting ---
+def seed_data_dir(path, users, money):
+    """Copy the item catalog and write a synthetic users.json"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    shutil.copy(os.path.join(here, "items.json"), os.path.join(path, "items.json"))
+    template = {
+        "money": money, "xp": 0, "level": 1, "inventory": {}, "last_daily": 0, "bank": 0,
+        "achievements": [], "luck": 0, "money_boost": 1, "prestige": 0
+    }
+    with open(os.path.join(path, "users.json"), "w", encoding="utf-8") as f:
+        json.dump({str(1_000_000 + i): dict(template) for i in range(users)}, f, indent=2)
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = [n for n in mix if n != "on_message" and bot.bot.get_command(n) is None]
+    if unknown:
+        raise SystemExit(f"unknown commands in --mix: {', '.join(unknown)}")
+    return mix
+
+def print_report(results, lag, elapsed, out=sys.stdout):
+    total = sum(h.count for h in results["latency"].values())
+    print(f"\n{total:,} calls in {elapsed:.1f}s -> {total / elapsed:,.1f} calls/s", file=out)
+    print(f"Stubbed Discord calls: {dict(CALLS)}", file=out)
+
+    print(f"\n{'command':<12} {'calls':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'reads/call':>10} {'KB read/call':>13} {'KB written/call':>16}", file=out)
+    for name, hist in sorted(results["latency"].items()):
+        stats = bot.COMMAND_STATS.get("message_xp" if name == "on_message" else name)
+        calls = max(hist.count, 1)
+        reads = sum(c for op, c in stats.storage_ops.items() if op.startswith("load")) if stats else 0
+        read_kb = stats.bytes_read / 1024 if stats else 0
+        written_kb = stats.bytes_written / 1024 if stats else 0
+        print(f"{name:<12} {hist.count:>8,} {results['errors'][name]:>7,} "
+              f"{hist.quantile(0.5) * 1000:>9.2f} {hist.quantile(0.99) * 1000:>9.2f} {hist.max * 1000:>9.2f} "
+              f"{reads / calls:>10.2f} {read_kb / calls:>13.1f} {written_kb / calls:>16.1f}", file=out)
+
+    print(f"\nEvent loop lag: p50 {lag.quantile(0.5) * 1000:.1f}ms  p99 {lag.quantile(0.99) * 1000:.1f}ms  "
+          f"max {lag.max * 1000:.1f}ms over {lag.count:,} samples", file=out)
+    for name, error in results["last_error"].items():
+        print(f"  last {name} error: {error}", file=out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the bot's commands")
+    parser.add_argument("--users", type=int, default=1000, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a user's commands")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="command=weight list")
+    parser.add_argument("--data-users", type=int, default=None, help="users in the generated users.json")
+    parser.add_argument("--money", type=int, default=1_000_000, help="starting balance per user")
+    parser.add_argument("--lag-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the temp data directory")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    data_dir = tempfile.mkdtemp(prefix="loadtest-")
+    seed_data_dir(data_dir, args.data_users or args.users, args.money)
+    os.chdir(data_dir)  # the bot reads users.json / items.json / win.json from the cwd
+    bot.rng.seed(args.seed)
+    bot.bot.fetch_user = fake_fetch_user
+    # process_commands compares message authors against the logged-in user
+    bot.bot._connection.user = FakeMember(1, FakeGuild())
+
+    print(f"{args.users:,} virtual users for {args.duration:g}s in {data_dir}", file=sys.stderr)
+    try:
+        results, lag, elapsed = asyncio.run(run(args, mix))
+        print_report(results, lag, elapsed)
+    finally:
+        # Flush while the data directory still exists, not from atexit after it's gone
+        bot.flush_storage()
+        atexit.unregister(bot.flush_storage)
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Offline economy simulator for the bot.
+
+Imports the game rules straight from bot.py and runs vectorized Monte Carlo
+trials with NumPy, reporting expected value, variance and return-to-player
+per bet size, luck level and money boost. No Discord connection is needed.
+
+Usage:
+    python simulate.py
+    python simulate.py --games slots,crash --bets 50,1000 --targets 1.5,2,3
+    python simulate.py --games roll --luck 0,100,800 --boost 1,2.25 --trials 5000000
+
+Payouts are modelled the way the bot credits them: wins go through add_money,
+so they are multiplied by money_boost and truncated; losses go through
+spend_money and are not boosted. Items are valued at their boosted sell price.
+"""
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+import bot
+
+CHUNK_SIZE = 500_000
+
+# Which scenario parameters each game actually reads
+GAME_PARAMS = {
+    "slots": ("bet", "boost"),
+    "crash": ("bet", "target", "boost"),
+    "spin": ("boost",),
+    "mine": ("boost",),
+    "roll": ("luck", "boost"),
+    "lottery": ("boost",),
+}
+for _box_id in bot.MYSTERY_BOXES:
+    GAME_PARAMS[f"box:{_box_id}"] = ("price", "boost")
+
+
+# --- Helpers ---
+def credit(amount, boost):
+    """Mirror add_money: int(amount * money_boost)"""
+    return np.trunc(amount * boost)
+
+def load_catalog():
+    """Group item sell values by rarity"""
+    items_db = bot.load_items()
+    catalog = {}
+    for item_data in items_db.values():
+        rarity = item_data.get("rarity", "common")
+        catalog.setdefault(rarity, []).append(float(item_data.get("value", 0)))
+    return {rarity: np.array(values) for rarity, values in catalog.items()}
+
+def pick_values(rng, catalog, rarities, n):
+    """Uniformly pick n items from the given rarities and return their values"""
+    pool = np.concatenate([catalog[r] for r in rarities if r in catalog])
+    return pool[rng.integers(0, len(pool), n)]
+
+def uniform_ints(rng, low, high, size):
+    """Vectorized random.randint(low, high); bounds may be scalars or arrays"""
+    return np.floor(low + rng.random(size) * (high - low + 1))
+
+def open_boxes(rng, n, box_id, boost, catalog):
+    """Realized coin value of opening n mystery boxes (see open_mystery_box)"""
+    rewards = bot.MYSTERY_BOXES[box_id]["rewards"]
+    ranges = np.array(rewards["coins"]["amounts"], dtype=float)
+    coin_roll = rng.integers(1, 101, n) <= rewards["coins"]["chance"]
+
+    chosen = ranges[rng.integers(0, len(ranges), n)]
+    coins = uniform_ints(rng, chosen[:, 0], chosen[:, 1], n)
+    items = pick_values(rng, catalog, rewards["items"]["rarities"], n)
+    return credit(np.where(coin_roll, coins, items), boost)
+
+
+# --- Games ---
+def sim_slots(rng, n, cell, catalog):
+    bet = cell["bet"]
+    symbols = list(bot.SLOT_SYMBOLS.values())
+    weights = np.array([s["weight"] for s in symbols], dtype=float)
+    payouts = np.array([s["payout"] for s in symbols], dtype=float)
+
+    reels = rng.choice(len(symbols), size=(n, 3), p=weights / weights.sum())
+    triple = (reels[:, 0] == reels[:, 1]) & (reels[:, 1] == reels[:, 2])
+    pair = ~triple & ((reels[:, 0] == reels[:, 1]) | (reels[:, 1] == reels[:, 2]) | (reels[:, 0] == reels[:, 2]))
+
+    net = np.full(n, -float(bet))
+    net[triple] = credit(bet * payouts[reels[triple, 0]] - bet, cell["boost"])
+    net[pair] = credit(bet // 2 - bet, cell["boost"])
+    return net, bet
+
+def sim_crash(rng, n, cell, catalog):
+    """Player cashes out as soon as the multiplier shows `target`.
+
+    The loop in crash() keeps showing one tick past the crash point, and the
+    Cash Out button dies CRASH_VIEW_TIMEOUT seconds after the game starts.
+    """
+    bet, target = cell["bet"], cell["target"]
+    low, high = bot.CRASH_POINT_RANGE
+    crash_point = np.round(rng.uniform(low, high, n), 2)
+
+    last_tick = np.ceil((crash_point - 1.0) / bot.CRASH_STEP - 1e-9)
+    target_tick = round((target - 1.0) / bot.CRASH_STEP)
+    window = (bot.CRASH_VIEW_TIMEOUT - bot.CRASH_START_DELAY) // bot.CRASH_TICK_SECONDS
+    shown = round(1.0 + target_tick * bot.CRASH_STEP, 2)
+
+    cashed = (target_tick <= last_tick) & (target_tick <= window)
+    win = credit(int(bet * shown) - bet, cell["boost"])
+    return np.where(cashed, win, -float(bet)), bet
+
+def sim_spin(rng, n, cell, catalog):
+    chances = np.array([p["chance"] for p in bot.SPIN_PRIZES], dtype=float)
+    bounds = np.array([p["coins"] for p in bot.SPIN_PRIZES], dtype=float)
+
+    prize = rng.choice(len(chances), size=n, p=chances / chances.sum())
+    coins = uniform_ints(rng, bounds[prize, 0], bounds[prize, 1], n)
+    return credit(coins, cell["boost"]) - bot.SPIN_COST, bot.SPIN_COST
+
+def sim_mine(rng, n, cell, catalog):
+    boost = cell["boost"]
+    ladder = bot.MINE_LADDER
+    rand = rng.integers(1, 101, n)
+    net = np.zeros(n)
+
+    small = (rand > ladder["coal"]) & (rand <= ladder["small_coins"])
+    box = (rand > ladder["small_coins"]) & (rand <= ladder["basic_box"])
+    big = (rand > ladder["basic_box"]) & (rand <= ladder["big_coins"])
+    epic = (rand > ladder["big_coins"]) & (rand <= ladder["epic_item"])
+    deep = rand > ladder["epic_item"]
+
+    net[small] = credit(uniform_ints(rng, *bot.MINE_SMALL_COINS, int(small.sum())), boost)
+    net[big] = credit(uniform_ints(rng, *bot.MINE_BIG_COINS, int(big.sum())), boost)
+    net[box] = open_boxes(rng, int(box.sum()), "basic", boost, catalog)
+    net[epic] = credit(pick_values(rng, catalog, ["epic"], int(epic.sum())), boost)
+
+    legendary = rng.random(int(deep.sum())) * 100 <= bot.MINE_LEGENDARY_CHANCE
+    deep_values = np.where(
+        legendary,
+        pick_values(rng, catalog, ["legendary"], len(legendary)),
+        pick_values(rng, catalog, ["epic"], len(legendary))
+    )
+    net[deep] = credit(deep_values, boost)
+    return net, 0
+
+def sim_roll(rng, n, cell, catalog):
+    # The bot's own weights, finite for any luck, so inf luck picks rarities exactly as !roll does
+    weights = bot.apply_luck_weights(bot.ROLL_RARITY_WEIGHTS, cell["luck"])
+    rarities = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    chosen = rng.choice(len(rarities), size=n, p=p / p.sum())
+    values = np.zeros(n)
+    for i, rarity in enumerate(rarities):
+        mask = chosen == i
+        values[mask] = pick_values(rng, catalog, [rarity], int(mask.sum()))
+
+    ultra = rng.random(n)
+    cosmic = ultra < bot.ROLL_COSMIC_CHANCE
+    values[cosmic] = pick_values(rng, catalog, ["cosmic"], int(cosmic.sum()))
+    values[ultra < bot.ROLL_NULL_CHANCE] = catalog["null"][0]
+    return credit(values, cell["boost"]) - bot.ROLL_COST, bot.ROLL_COST
+
+def sim_lottery(rng, n, cell, catalog):
+    """Any four distinct picks are equivalent, so the player always picks 1-4"""
+    winning = rng.integers(1, 101, (n, 4))
+    correct = sum((winning == pick).any(axis=1) for pick in range(1, 5))
+    rewards = np.array([bot.LOTTERY_REWARDS.get(k, 0) for k in range(5)], dtype=float)
+    return credit(rewards[correct], cell["boost"]), 0
+
+def sim_box(box_id):
+    def run(rng, n, cell, catalog):
+        price = cell.get("price") or bot.MYSTERY_BOXES[box_id]["price"]
+        return open_boxes(rng, n, box_id, cell["boost"], catalog) - price, price
+    return run
+
+GAMES = {
+    "slots": sim_slots,
+    "crash": sim_crash,
+    "spin": sim_spin,
+    "mine": sim_mine,
+    "roll": sim_roll,
+    "lottery": sim_lottery,
+}
+for _box_id in bot.MYSTERY_BOXES:
+    GAMES[f"box:{_box_id}"] = sim_box(_box_id)
+
+
+# --- Running ---
+def merge_moments(a, b):
+    """Combine (count, mean, M2) accumulators (Chan et al.)"""
+    n = a[0] + b[0]
+    if n == 0:
+        return a
+    delta = b[1] - a[1]
+    mean = a[1] + delta * b[0] / n
+    m2 = a[2] + b[2] + delta * delta * a[0] * b[0] / n
+    return n, mean, m2
+
+def run_cell(rng, game, trials, cell, catalog, chunk_size=CHUNK_SIZE):
+    """Simulate one game/scenario cell and return a result row"""
+    moments = (0, 0.0, 0.0)
+    stake = 0
+    done = 0
+    while done < trials:
+        n = min(chunk_size, trials - done)
+        net, stake = GAMES[game](rng, n, cell, catalog)
+        mean = float(net.mean())
+        moments = merge_moments(moments, (n, mean, float(((net - mean) ** 2).sum())))
+        done += n
+
+    count, ev, m2 = moments
+    variance = m2 / count if count else 0.0
+    rtp = (stake + ev) / stake if stake else None
+    row = {"game": game, "trials": count, "stake": stake}
+    row.update(cell)
+    row.update({
+        "ev": ev,
+        "variance": variance,
+        "stddev": math.sqrt(variance),
+        "rtp": rtp,
+        "house_edge": 1 - rtp if rtp is not None else None
+    })
+    return row
+
+def build_cells(game, bets, lucks, boosts, targets, prices=(None,)):
+    """Expand the parameter grid for one game, skipping axes it ignores"""
+    params = GAME_PARAMS[game]
+    cells = []
+    for boost in boosts:
+        for bet in (bets if "bet" in params else [None]):
+            for luck in (lucks if "luck" in params else [0]):
+                for target in (targets if "target" in params else [None]):
+                    for price in (prices if "price" in params else [None]):
+                        cells.append({"bet": bet, "luck": luck, "boost": boost, "target": target, "price": price})
+    return cells
+
+def fmt(value):
+    if value is None:
+        return "-"
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and abs(value) >= 1e12:
+        return f"{value:.3e}"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return f"{value:,}"
+
+def print_report(rows, out=sys.stdout):
+    headers = ["game", "bet", "target", "luck", "boost", "stake", "ev", "stddev", "rtp", "house_edge"]
+    table = []
+    for row in rows:
+        cells = [fmt(row.get(h)) for h in headers[:-2]]
+        cells += ["-" if row[h] is None else f"{row[h]:.4%}" for h in ("rtp", "house_edge")]
+        table.append(cells)
+    widths = [max(len(h), *(len(r[i]) for r in table)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)), file=out)
+    print("  ".join("-" * w for w in widths), file=out)
+    for r in table:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)), file=out)
+
+def parse_list(text, cast=float):
+    return [cast(v) for v in text.split(",") if v.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo house-edge report for the bot's games")
+    parser.add_argument("--games", default=",".join(GAMES), help="comma separated, e.g. slots,crash,box:gold")
+    parser.add_argument("--trials", type=int, default=1_000_000, help="trials per scenario cell")
+    parser.add_argument("--bets", default="50,1000,100000")
+    parser.add_argument("--targets", default="1.5,2,3", help="crash cash-out multipliers")
+    parser.add_argument("--luck", default="0,100,800", help="total luck (luck + prestige * 10)")
+    parser.add_argument("--boost", default="1", help="money_boost values")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--csv", help="also write rows to this CSV file")
+    args = parser.parse_args(argv)
+
+    games = [g.strip() for g in args.games.split(",") if g.strip()]
+    unknown = [g for g in games if g not in GAMES]
+    if unknown:
+        parser.error(f"unknown games: {', '.join(unknown)}")
+
+    rng = np.random.default_rng(args.seed)
+    catalog = load_catalog()
+    rows = []
+    for game in games:
+        for cell in build_cells(game, parse_list(args.bets, int), parse_list(args.luck),
+                                parse_list(args.boost), parse_list(args.targets)):
+            rows.append(run_cell(rng, game, args.trials, cell, catalog))
+
+    print_report(rows)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+if __name__ == "__main__":
+    main()
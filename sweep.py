@@ -0,0 +1,148 @@
+"""
+Multi-process what-if sweeps over the economy simulator.
+
+Expands a grid of prestige levels, starting luck / money_boost, luck
+multipliers and box price scales, runs every cell of simulate.py on a
+ProcessPoolExecutor and streams one CSV row per cell as it finishes.
+
+Usage:
+    python sweep.py --games roll,box:gold --prestige 0-10 --out sweep.csv
+    python sweep.py --games slots,crash --bets 50,1000 --workers 8 --seed 7
+
+Every cell gets its own child of one root SeedSequence, so a sweep with the
+same --seed reproduces the same numbers no matter how many workers run it
+or in which order cells complete.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import bot
+import simulate
+
+FIELDS = [
+    "cell", "game", "prestige", "base_luck", "base_boost", "luck_mult", "price_scale",
+    "bet", "target", "luck", "boost", "price", "trials", "stake",
+    "ev", "variance", "stddev", "rtp", "house_edge", "seconds"
+]
+
+_catalog = None
+
+
+def _init_worker():
+    """Load the item catalog once per worker process"""
+    global _catalog
+    _catalog = simulate.load_catalog()
+
+def _run_cell(index, game, trials, cell, seed_seq):
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed_seq)
+    row = simulate.run_cell(rng, game, trials, cell, _catalog)
+    row["cell"] = index
+    row["seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def prestige_profile(prestige, base_luck, base_boost):
+    """Luck and money boost a player ends up with after `prestige` prestiges"""
+    luck, boost = base_luck, base_boost
+    for _ in range(prestige):
+        luck, boost = bot.prestige_boosts(luck, boost)
+    return luck, boost
+
+def build_grid(args):
+    """Expand the command line axes into (game, cell) pairs"""
+    grid = []
+    for game in args.games:
+        params = simulate.GAME_PARAMS[game]
+        for prestige in args.prestige:
+            for base_luck in args.luck:
+                for base_boost in args.boost:
+                    luck, boost = prestige_profile(prestige, base_luck, base_boost)
+                    base_cells = simulate.build_cells(game, args.bets, [0], [boost], args.targets)
+                    for luck_mult in (args.luck_mult if "luck" in params else [1.0]):
+                        for price_scale in (args.price_scale if "price" in params else [1.0]):
+                            for base_cell in base_cells:
+                                cell = dict(base_cell)
+                                cell.update({
+                                    "prestige": prestige,
+                                    "base_luck": base_luck,
+                                    "base_boost": base_boost,
+                                    "luck_mult": luck_mult,
+                                    "price_scale": price_scale,
+                                    # get_total_luck adds 10 per prestige on top of stored luck
+                                    "luck": (luck + prestige * 10) * luck_mult
+                                })
+                                if "price" in params:
+                                    box_id = game.split(":", 1)[1]
+                                    cell["price"] = bot.MYSTERY_BOXES[box_id]["price"] * price_scale
+                                grid.append((game, cell))
+    return grid
+
+def parse_range(text):
+    """'0-10' or '0,2,5' -> list of ints"""
+    values = []
+    for part in text.split(","):
+        if "-" in part:
+            low, high = part.split("-")
+            values.extend(range(int(low), int(high) + 1))
+        elif part.strip():
+            values.append(int(part))
+    return values
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel parameter sweeps over simulate.py")
+    parser.add_argument("--games", default="roll,slots,crash,box:basic,box:gold")
+    parser.add_argument("--trials", type=int, default=1_000_000, help="trials per cell")
+    parser.add_argument("--prestige", default="0-10", help="e.g. 0-10 or 0,1,5")
+    parser.add_argument("--luck", default="0", help="stored luck before prestiging")
+    parser.add_argument("--boost", default="1", help="money_boost before prestiging")
+    parser.add_argument("--luck-mult", default="1", help="multipliers applied to total luck")
+    parser.add_argument("--price-scale", default="1", help="multipliers applied to box prices")
+    parser.add_argument("--bets", default="100")
+    parser.add_argument("--targets", default="2", help="crash cash-out multipliers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="sweep.csv")
+    args = parser.parse_args(argv)
+
+    args.games = [g.strip() for g in args.games.split(",") if g.strip()]
+    unknown = [g for g in args.games if g not in simulate.GAMES]
+    if unknown:
+        parser.error(f"unknown games: {', '.join(unknown)}")
+    args.prestige = parse_range(args.prestige)
+    args.luck = simulate.parse_list(args.luck)
+    args.boost = simulate.parse_list(args.boost)
+    args.luck_mult = simulate.parse_list(args.luck_mult)
+    args.price_scale = simulate.parse_list(args.price_scale)
+    args.bets = simulate.parse_list(args.bets, int)
+    args.targets = simulate.parse_list(args.targets)
+
+    grid = build_grid(args)
+    root = np.random.SeedSequence(args.seed)
+    seeds = root.spawn(len(grid))
+    print(f"{len(grid)} cells on {args.workers} workers (seed entropy {root.entropy})", file=sys.stderr)
+
+    started = time.perf_counter()
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_run_cell, index, game, args.trials, cell, seeds[index])
+                for index, (game, cell) in enumerate(grid)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                writer.writerow(future.result())
+                f.flush()
+                print(f"\r{done}/{len(grid)} cells", end="", file=sys.stderr)
+
+    print(f"\nWrote {args.out} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+# The bot and its tools are top-level modules in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import bot
+
+@pytest.fixture
+def live_store(monkeypatch, tmp_path):
+    """Point the bot's user store, ledger and economy stats at fresh ones in an empty directory"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bot, "economy", bot.EconomyStats())
+    monkeypatch.setattr(bot, "ledger", bot.Ledger("ledger"))
+    monkeypatch.setattr(bot, "house_pending", 0)
+    monkeypatch.setattr(bot, "house_pending_transfers", 0)
+    monkeypatch.setattr(bot, "house_bank_estimate", None)
+    store = bot.UserStore("users.db", "users.log", cache_size=4)
+    store.open()
+    monkeypatch.setattr(bot, "user_store", store)
+    yield store
+    if store.opened:
+        store.unmap()
+        store.log.close()
+        store.log_reader.close()
@@ -0,0 +1,59 @@
+import pytest
+
+import bot
+
+PLAYER = "4000000000000001"
+
+@pytest.fixture
+def unlocks(live_store, monkeypatch):
+    """Every (user id, achievement ids) announced by a write"""
+    announced = []
+    monkeypatch.setattr(bot, "announce_achievements", lambda user_id, unlocked: announced.append((user_id, unlocked)))
+    return announced
+
+def test_each_rule_fires_once_on_the_write_that_crosses_it(unlocks):
+    bot.update_user_data(PLAYER, money=999, level=4)
+    assert unlocks == []
+
+    bot.update_user_data(PLAYER, money=1000)
+    assert unlocks.pop() == (PLAYER, ["first_coins"])
+    bot.update_user_data(PLAYER, money=50_000)  # crosses the next money rule only
+    assert unlocks.pop() == (PLAYER, ["high_roller"])
+    bot.update_user_data(PLAYER, money=0)
+    bot.update_user_data(PLAYER, money=50_000)  # re-crossing a threshold doesn't fire again
+    assert unlocks == []
+
+    bot.update_user_data(PLAYER, level=12, bank=2_000_000)  # one write crossing several rules
+    assert unlocks.pop() == (PLAYER, ["level_5", "level_10", "millionaire"])
+
+    for n in range(100):
+        bot.count_play(PLAYER, "slots")
+        if n == 0:
+            assert unlocks.pop() == (PLAYER, ["gambler"])
+        elif n == 49:
+            assert unlocks.pop() == (PLAYER, ["slot_fiend"])
+    assert unlocks.pop() == (PLAYER, ["regular"])
+    assert unlocks == []
+
+    bot.update_user_data(PLAYER, inventory={f"Trinket {i}": 1 for i in range(10)})
+    assert unlocks.pop() == (PLAYER, ["collector"])
+    assert sorted(bot.read_user(PLAYER)["achievements"]) == sorted(
+        ["first_coins", "high_roller", "level_5", "level_10", "millionaire", "gambler", "slot_fiend", "regular", "collector"])
+
+def test_unrelated_writes_never_fire(unlocks):
+    bot.update_user_data(PLAYER, money=10, level=1)
+    bot.add_xp(PLAYER, 50)                             # stays level 1
+    bot.update_user_data(PLAYER, luck=5, money_boost=2)
+    bot.add_item_to_inventory(PLAYER, "Paper Clip", 30)  # one distinct item, however many copies
+    bot.update_user_data(PLAYER, bank=500_000)
+    bot.count_play(PLAYER, "roll")
+    assert unlocks.pop() == (PLAYER, ["gambler"])
+    for _ in range(60):
+        bot.count_play(PLAYER, "roll")                   # no per-game rule for roll
+    assert unlocks == []
+    assert bot.read_user(PLAYER)["achievements"] == ["gambler"]
+
+def test_house_account_never_unlocks(unlocks):
+    bot.update_user_data(bot.HOUSE_ACCOUNT_ID, money=10 ** 9, level=50)
+    assert unlocks == []
+    assert bot.read_user(bot.HOUSE_ACCOUNT_ID)["achievements"] == []
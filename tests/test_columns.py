@@ -0,0 +1,134 @@
+import numpy as np
+
+import bot
+
+USERS = [str(uid) for uid in range(2_000_000_000_000_000, 2_000_000_000_000_012)]
+NEWCOMER = "2000000000000099"  # first saved after the snapshot
+ITEMS = ["Paper Clip", "Rusty Spoon", "Golden Duck", "Magic Sword"]
+
+def seed(store):
+    """Users holding a spread of items, compacted so their holdings are snapshot runs"""
+    for n, uid in enumerate(USERS):
+        inventory = {name: n % (i + 2) + 1 for i, name in enumerate(ITEMS) if (n + i) % 3}
+        bot.update_user_data(uid, money=100 * n, inventory=inventory)
+    store.compact()
+
+def expected_holders(store):
+    """{item id: {slot: count}} recomputed from every stored record"""
+    holders = {}
+    for uid in USERS + [NEWCOMER]:
+        record = bot.read_user(uid)
+        for name, count in (record["inventory"] if record else {}).items():
+            holders.setdefault(store.item_ids.id(name), {})[store.columns.slot(int(uid))] = count
+    return holders
+
+def check_holdings(store):
+    columns = store.columns
+    expected = expected_holders(store)
+    for item_id in range(len(store.item_ids.names) + 1):
+        held = expected.get(item_id, {})
+        slots, counts = columns.holders_of(item_id)
+        assert dict(zip(slots.tolist(), counts.tolist())) == held
+        assert len(slots) == len(held)  # no slot listed twice
+        assert columns.item_supply(item_id) == (sum(held.values()), len(held))
+
+def test_holders_and_supply_follow_give_sell_and_remove(live_store):
+    seed(live_store)
+    check_holdings(live_store)
+
+    bot.add_item_to_inventory(USERS[0], "Golden Duck", 5)        # give: more of an item
+    bot.add_item_to_inventory(USERS[1], "Brand New Hat", 2)      # give: an item nobody had
+    bot.add_item_to_inventory(NEWCOMER, "Paper Clip")            # give: a user added after the snapshot
+    check_holdings(live_store)
+
+    for uid in USERS[:6]:                                        # sell one of each held item
+        for name in list(bot.read_user(uid)["inventory"]):
+            assert bot.remove_item_from_inventory(uid, name, 1)
+    check_holdings(live_store)
+
+    for uid in USERS + [NEWCOMER]:                               # remove an item outright
+        inventory = bot.read_user(uid)["inventory"]
+        inventory.pop("Rusty Spoon", None)
+        bot.update_user_data(uid, inventory=inventory)
+    rusty = live_store.item_ids.id("Rusty Spoon")
+    assert live_store.columns.item_supply(rusty) == (0, 0)
+    assert len(live_store.columns.holders_of(rusty)[0]) == 0
+    check_holdings(live_store)
+
+    live_store.close()
+    live_store.open()  # rebuilt from the snapshot and the log
+    check_holdings(live_store)
+
+def owned_ids(store, uid):
+    return set(bot.bitset_ids(store.columns.owned[store.columns.slot(int(uid))]).tolist())
+
+def test_owned_bitsets_follow_gains_and_losses(live_store):
+    filler = [f"Filler {i}" for i in range(70)]  # pushes the set's later ids into a second bitset word
+    for name in filler:
+        live_store.item_ids.id(name)
+    tier = ["Paper Clip", "Filler 3", "Filler 69"]
+    ids = [live_store.item_ids.id(name) for name in tier]
+    mask, total = bot.owned_matrix([np.array(ids)])[0], len(ids)
+    collector, dabbler = USERS[:2]
+
+    bot.update_user_data(collector, inventory={"Paper Clip": 1, "Filler 3": 2})
+    bot.update_user_data(dabbler, inventory={"Filler 69": 1})
+    live_store.compact()
+    assert owned_ids(live_store, collector) == set(ids[:2])
+    assert owned_ids(live_store, dabbler) == {ids[2]}
+    assert live_store.columns.completed(mask, total) == []
+
+    bot.add_item_to_inventory(collector, "Filler 69")  # gain sets the bit
+    assert owned_ids(live_store, collector) == set(ids)
+    assert live_store.columns.completed(mask, total) == [collector]
+
+    assert bot.remove_item_from_inventory(collector, "Filler 3", 1)  # one of two left: still held
+    assert live_store.columns.completed(mask, total) == [collector]
+    assert bot.remove_item_from_inventory(collector, "Filler 3", 1)  # the last one clears the bit
+    assert owned_ids(live_store, collector) == {ids[0], ids[2]}
+    assert live_store.columns.completed(mask, total) == []
+
+    bot.update_user_data(dabbler, inventory={name: 1 for name in tier})
+    bot.update_user_data(NEWCOMER, inventory={name: 1 for name in tier})
+    assert sorted(live_store.columns.completed(mask, total)) == sorted([dabbler, NEWCOMER])
+    assert list(live_store.columns.owned_counts(mask)[:2]) == [2, 3]
+
+    live_store.close()
+    live_store.open()
+    assert owned_ids(live_store, collector) == {ids[0], ids[2]}
+    assert sorted(live_store.columns.completed(mask, total)) == sorted([dabbler, NEWCOMER])
+
+def balances(n):
+    """Distinct money/bank pairs around the int64 bounds and past float precision"""
+    big = [2 ** 53 + 1, 2 ** 53 + 3, 2 ** 62 + 7, 2 ** 63 - 1, 2 ** 63 + 5, 2 ** 70 + 1, -(2 ** 64) - 9, 10 ** 30]
+    return [(big[i % len(big)] + i * 2, (-1) ** i * (2 ** 60 + i)) for i in range(n)]
+
+def check_ranking(store, uids):
+    records = {uid: bot.read_user(uid) for uid in uids}
+    for fields in (["money"], ["bank"], ["money", "bank"]):
+        exact = {uid: sum(record[field] for field in fields) for uid, record in records.items()}
+        ranked = sorted(exact.items(), key=lambda item: item[1], reverse=True)
+        for k in (1, 3, len(uids), len(uids) + 5):
+            assert store.columns.top(fields, k) == ranked[:k]
+    for field in ("money", "bank"):
+        assert store.columns.sum(field) == sum(record[field] for record in records.values())
+
+def test_top_and_sum_match_brute_force_past_int64(live_store):
+    uids = USERS + [NEWCOMER]
+    for uid, (money, bank) in zip(uids[:8], balances(8)):
+        bot.update_user_data(uid, money=money, bank=bank)
+    live_store.compact()
+    for uid, (money, bank) in zip(uids[8:], balances(len(uids))[8:]):  # after the snapshot
+        bot.update_user_data(uid, money=money, bank=bank)
+    assert len(live_store.cache) == 4  # most records were evicted; the columns don't depend on the cache
+    check_ranking(live_store, uids)
+
+    bot.update_user_data(uids[0], money=2 ** 80)           # saturated cell raised further
+    bot.update_user_data(uids[3], money=5)                 # saturated cell back into range
+    bot.update_user_data(uids[5], money=2 ** 53 + 15)      # the same float as uids[8]'s 2 ** 53 + 17
+    bot.add_money(uids[9], 0)                              # rewrite without a change
+    check_ranking(live_store, uids)
+
+    live_store.close()
+    live_store.open()
+    check_ranking(live_store, uids)
@@ -0,0 +1,94 @@
+import asyncio
+import types
+
+import pytest
+
+import bot
+from loadtest import FakeChannel, FakeContext, FakeGuild, FakeMember, FakeMessage
+
+PLAYER = 5000000000000001
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable stand-in for time.monotonic"""
+    now = [1000.0]
+    monkeypatch.setattr(bot, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_duplicate_rejected_within_ttl_and_accepted_after(clock):
+    keys = bot.ExpiringKeySet(ttl=60)
+    assert keys.add(("interaction", 1))
+    clock[0] += 59
+    assert not keys.add(("interaction", 1))
+    assert ("interaction", 1) in keys
+    assert keys.add(("interaction", 2))
+    clock[0] += 1
+    assert ("interaction", 1) not in keys
+    assert keys.add(("interaction", 1))  # expired, so a new action with the same key runs
+    assert not keys.add(("interaction", 2))
+    assert keys.duplicates == 2
+
+def test_full_set_refuses_rather_than_forgetting_live_keys(clock):
+    keys = bot.ExpiringKeySet(ttl=60, max_keys=2)
+    assert keys.add("a") and keys.add("b")
+    assert not keys.add("c")
+    assert keys.rejected == 1 and "a" in keys
+    clock[0] += 60
+    assert keys.add("c")
+    assert len(keys.expires) == 1
+
+class Response:
+    def __init__(self):
+        self.edits, self.messages, self.deferred = [], [], 0
+
+    async def edit_message(self, **kwargs):
+        self.edits.append(kwargs)
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+    async def defer(self):
+        self.deferred += 1
+
+def click(view, label, interaction_id, member):
+    button = next(child for child in view.children if getattr(child, "label", None) == label)
+    interaction = types.SimpleNamespace(id=interaction_id, user=member, response=Response(), channel=None)
+    return button.callback(interaction), interaction.response
+
+def test_double_clicked_stand_settles_once(live_store, monkeypatch):
+    monkeypatch.setattr(bot, "processed_actions", bot.ExpiringKeySet())
+    monkeypatch.setattr(bot, "rng", bot.RandomService(7, "rng_state.json"))
+    bot.update_user_data(PLAYER, money=10_000, money_boost=1)
+
+    async def play():
+        guild, channel = FakeGuild(), FakeChannel()
+        member = FakeMember(PLAYER, guild)
+        sent = []
+        async def send(content=None, **kwargs):
+            sent.append(kwargs)
+            return FakeMessage(content or "", channel=channel)
+        channel.send = send
+        for _ in range(20):  # skip deals that end in a natural blackjack, which settle without buttons
+            sent.clear()
+            game = asyncio.create_task(bot.bot.get_command("cards").callback(FakeContext(member, guild, channel, "!cards"), 100))
+            await asyncio.sleep(0)
+            if sent and sent[-1].get("view") is not None:
+                break
+            await game
+        view = sent[-1]["view"]
+        before = bot.read_user(PLAYER)["money"], len(bot.ledger.history(PLAYER, limit=100))
+
+        first, first_response = click(view, "Stand", 1, member)
+        second, second_response = click(view, "Stand", 2, member)      # a double click
+        redelivered, redelivered_response = click(view, "Stand", 1, member)  # the gateway resending the first
+        await asyncio.gather(first, second, redelivered)
+        await asyncio.wait_for(game, 1)  # the command ends once the game is settled
+        return before, first_response, second_response, redelivered_response
+
+    (before, entries), first, second, redelivered = asyncio.run(play())
+    after = bot.read_user(PLAYER)["money"]
+    assert after - before in (-100, 0, 100)
+    assert len(bot.ledger.history(PLAYER, limit=100)) - entries == (after != before)  # one settlement at most
+    assert len(first.edits) == 1
+    assert second.edits == [] and second.messages == ["This game is already over!"]
+    assert redelivered.edits == [] and redelivered.deferred == 1
@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import pytest
+
+import bot
+
+PLAYER = "3000000000000001"
+ITEMS = {
+    "Rubber Band": {"value": 5, "rarity": "common"},
+    "Pebble": {"value": 14, "rarity": "common"},
+    "Bottle Cap": {"value": 14, "rarity": "common"},  # ties Pebble on value
+    "Silver Ring": {"value": 300, "rarity": "rare"},
+    "Ancient Coin": {"value": 250, "rarity": "rare"},
+    "Dragon Scale": {"value": 5000, "rarity": "legendary"},
+}
+
+def write_catalog(items):
+    with open("items.json", "w", encoding="utf-8") as f:
+        json.dump(items, f)
+
+@pytest.fixture
+def store(live_store, monkeypatch):
+    write_catalog(ITEMS)
+    monkeypatch.setattr(bot, "item_catalog", bot.ItemCatalog("items.json"))
+    monkeypatch.setattr(bot, "item_prices", bot.PriceTable())
+    return live_store
+
+def recompute(store, uid):
+    """(order, total) of an inventory worked out from scratch"""
+    order, total = [], 0
+    for name, count in bot.read_user(uid)["inventory"].items():
+        item_id = store.item_ids.id(name)
+        value = store.item_info(item_id)[0]
+        order.append((-value, item_id))
+        total += value * count
+    return sorted(order), total
+
+def check_view(store, uid):
+    view = store.inventory_view(uid)
+    order, total = recompute(store, uid)
+    assert view.order == order
+    assert view.total == total
+    inventory = bot.read_user(uid)["inventory"]
+    assert view.page(1, 3) == [(item_id, inventory[store.item_ids.name(item_id)], -value) for value, item_id in order[1:3]]
+    return view
+
+def test_view_is_patched_in_place_and_matches_a_recompute(store, monkeypatch):
+    bot.update_user_data(PLAYER, inventory={"Pebble": 3, "Silver Ring": 1, "Mystery Lint": 2})  # lint isn't in the catalog
+    view = check_view(store, PLAYER)
+
+    bot.add_item_to_inventory(PLAYER, "Bottle Cap", 2)
+    bot.add_item_to_inventory(PLAYER, "Dragon Scale")
+    bot.add_item_to_inventory(PLAYER, "Pebble", 4)
+    assert check_view(store, PLAYER) is view  # patched by put(), not rebuilt
+
+    assert bot.remove_item_from_inventory(PLAYER, "Silver Ring", 1)
+    assert bot.remove_item_from_inventory(PLAYER, "Pebble", 2)
+    assert check_view(store, PLAYER) is view
+
+    write_catalog(dict(ITEMS, Pebble={"value": 1400, "rarity": "common"}))  # a catalog edit revalues the view
+    assert check_view(store, PLAYER) is not view
+    view = store.inventory_view(PLAYER)
+
+    monkeypatch.setattr(bot, "DYNAMIC_PRICING", True)
+    band = store.item_ids.id("Rubber Band")
+    supply = np.zeros(len(store.item_ids.names), dtype=np.int64)
+    supply[band] = 10 ** 6  # floods the common tier, so the commons held get scarcer by comparison
+    bot.item_prices.refresh(bot.item_catalog.info, list(store.item_ids.names), supply)
+    assert store.item_info(store.item_ids.id("Pebble"))[0] == 1400 * bot.PRICE_CEILING
+    assert check_view(store, PLAYER) is not view  # a price refresh revalues it too
+
+    bot.add_item_to_inventory(PLAYER, "Ancient Coin", 3)
+    bot.update_user_data(PLAYER, inventory={})
+    assert check_view(store, PLAYER).order == []
+
+def check_summary(store, uid):
+    """best() and per-rarity quantities of the cached view, against a recompute"""
+    view = store.inventory_view(uid)
+    counts, ranked = [0] * len(bot.RARITY_ORDER), []
+    for name, count in bot.read_user(uid)["inventory"].items():
+        item_id = store.item_ids.id(name)
+        value, rank, _ = store.item_info(item_id)
+        if rank is not None:
+            counts[rank] += count
+            ranked.append((-rank, -value, item_id))
+    assert view.rarity_counts == counts
+    assert view.best() == (min(ranked)[2] if ranked else None)
+    return view
+
+def test_best_item_and_rarity_summary_match_a_recompute(store, monkeypatch):
+    bot.update_user_data(PLAYER, inventory={"Mystery Lint": 4})
+    assert check_summary(store, PLAYER).best() is None  # nothing from the catalog
+
+    bot.add_item_to_inventory(PLAYER, "Pebble", 2)
+    bot.add_item_to_inventory(PLAYER, "Bottle Cap")
+    check_summary(store, PLAYER)
+    bot.add_item_to_inventory(PLAYER, "Ancient Coin", 2)
+    bot.add_item_to_inventory(PLAYER, "Silver Ring")
+    assert store.item_ids.name(check_summary(store, PLAYER).best()) == "Silver Ring"
+    bot.add_item_to_inventory(PLAYER, "Dragon Scale")
+    assert store.item_ids.name(check_summary(store, PLAYER).best()) == "Dragon Scale"
+
+    assert bot.remove_item_from_inventory(PLAYER, "Dragon Scale", 1)
+    assert bot.remove_item_from_inventory(PLAYER, "Ancient Coin", 1)
+    assert store.item_ids.name(check_summary(store, PLAYER).best()) == "Silver Ring"
+
+    monkeypatch.setattr(bot, "DYNAMIC_PRICING", True)  # the ring gets plentiful, the coin scarce
+    supply = np.zeros(len(store.item_ids.names), dtype=np.int64)
+    supply[store.item_ids.id("Silver Ring")] = 10 ** 6
+    bot.item_prices.refresh(bot.item_catalog.info, list(store.item_ids.names), supply)
+    assert store.item_ids.name(check_summary(store, PLAYER).best()) == "Ancient Coin"
+
+    assert bot.remove_item_from_inventory(PLAYER, "Silver Ring", 1)
+    assert bot.remove_item_from_inventory(PLAYER, "Ancient Coin", 1)
+    assert store.item_ids.name(check_summary(store, PLAYER).best()) == "Pebble"  # ties Bottle Cap; the older id wins
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import bot
+
+ALICE, BOB = 1001, 1002
+
+@pytest.fixture
+def ledger(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "economy", bot.EconomyStats())
+    monkeypatch.setattr(bot, "LEDGER_SEGMENT_RECORDS", 4)  # so histories cross segment files
+    return bot.Ledger(str(tmp_path))
+
+def fill(ledger, entries=30):
+    """Interleaved entries for two users; returns each user's (delta, balance) pairs, oldest first"""
+    written = {ALICE: [], BOB: []}
+    balances = {ALICE: 0, BOB: 0}
+    for i in range(entries):
+        uid = BOB if i % 3 == 0 else ALICE
+        balances[uid] += i
+        ledger.append(uid, "money", i, balances[uid], f"game{i}")
+        written[uid].append((i, balances[uid]))
+    return written
+
+def walk(ledger, uid, **kwargs):
+    return [(e["delta"], e["balance"]) for e in ledger.history(uid, **kwargs)]
+
+def test_history_follows_back_pointers_newest_first(ledger):
+    written = fill(ledger)
+    for uid in (ALICE, BOB):
+        entries = ledger.history(uid, limit=100)
+        assert [(e["delta"], e["balance"]) for e in entries] == written[uid][::-1]
+        assert all(e["user_id"] == uid for e in entries)
+        assert [e["previous"] for e in entries[:-1]] == [e["seq"] for e in entries[1:]]
+        assert entries[-1]["previous"] == -1
+    assert len(os.listdir(ledger.path)) > 5  # spans several segments
+    assert ledger.history(42) == []
+
+def test_history_pages(ledger):
+    written = fill(ledger)[ALICE][::-1]
+    assert walk(ledger, ALICE, skip=0, limit=5) == written[:5]
+    assert walk(ledger, ALICE, skip=5, limit=5) == written[5:10]
+    assert walk(ledger, ALICE, skip=len(written), limit=5) == []
+
+@pytest.mark.parametrize("saved_index", [True, False])
+def test_reload_replays_entries_after_the_index(ledger, saved_index):
+    fill(ledger, 10)
+    ledger.save_index()
+    written = fill(ledger, 12)  # appended after the save, then the process stops
+    if not saved_index:
+        os.remove(os.path.join(ledger.path, "index.json"))
+
+    reloaded = bot.Ledger(ledger.path)
+    reloaded.load()
+    assert reloaded.next_seq == 22 and reloaded.last == ledger.last
+    assert walk(reloaded, BOB, limit=4) == written[BOB][::-1][:4]
+
+def test_torn_final_record_is_dropped(ledger):
+    fill(ledger, 6)
+    segment = ledger.segment_path(6 // bot.LEDGER_SEGMENT_RECORDS)
+    with open(segment, "ab") as f:
+        f.write(b"\x01" * (bot.LEDGER_RECORD.size // 2))
+
+    reloaded = bot.Ledger(ledger.path)
+    reloaded.append(ALICE, "money", 7, 7, "late")
+    assert reloaded.next_seq == 7
+    assert os.path.getsize(segment) == 3 * bot.LEDGER_RECORD.size
+    assert [e["reason"] for e in reloaded.history(ALICE, limit=2)] == ["late", "game5"]
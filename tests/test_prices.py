@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import bot
+
+NAMES = ["Scarce", "Common", "Glut", "Dumped", "Unknown", "Relic", "Lost", "Hoarded"]
+CATALOG = {
+    "Scarce": (1000, 2, "rare"), "Common": (1000, 2, "rare"),
+    "Glut": (1000, 2, "rare"), "Dumped": (1000, 2, "rare"),
+    "Lost": (1000, 3, "epic"), "Hoarded": (1000, 3, "epic"),
+    "Relic": (10 ** 30, 4, "legendary"),  # far past int64
+}
+SUPPLY = np.array([50, 100, 250, 100, 50, 7, 0, 1000], dtype=np.int64)
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setattr(bot, "DYNAMIC_PRICING", True)
+    return bot.PriceTable()
+
+def prices(table):
+    return {name: table.value(item_id, CATALOG.get(name, (0,))[0]) for item_id, name in enumerate(NAMES)}
+
+def test_supply_moves_prices_within_bounds(table):
+    table.refresh(CATALOG, NAMES, SUPPLY)
+    price = prices(table)
+    assert price["Scarce"] > price["Common"] > 1000 > price["Glut"]  # against the tier's average supply
+    assert price["Common"] == price["Dumped"]
+    assert price["Lost"] == 1000 * bot.PRICE_CEILING        # none left in a tier that has plenty: capped
+    assert price["Hoarded"] < 1000
+    assert price["Relic"] == 10 ** 30                       # alone in its tier, and exact
+    assert price["Unknown"] == 0                            # not in the catalog: unsellable
+
+def test_selling_pushes_the_price_down(table):
+    table.refresh(CATALOG, NAMES, SUPPLY)
+    before, version = prices(table), table.version
+    table.record_sale(NAMES.index("Dumped"), 50)
+    table.refresh(CATALOG, NAMES, SUPPLY)
+    after = prices(table)
+    assert table.version == version + 1
+    assert after["Dumped"] < before["Dumped"]
+    assert after["Common"] == before["Common"]
+
+    table.record_sale(NAMES.index("Dumped"), 10 ** 6)  # a dump much bigger than the circulation
+    table.refresh(CATALOG, NAMES, SUPPLY)
+    assert prices(table)["Dumped"] == 1000 * bot.PRICE_FLOOR
+
+@pytest.mark.parametrize("supply", [np.zeros(0, dtype=np.int64), np.full(len(NAMES), 10 ** 12, dtype=np.int64)])
+def test_prices_stay_bounded_for_any_supply(table, supply):
+    table.record_sale(0, 10 ** 9)
+    table.refresh(CATALOG, NAMES, supply)
+    for name, value in prices(table).items():
+        base = CATALOG.get(name, (0,))[0]
+        assert base * bot.PRICE_FLOOR <= value <= base * bot.PRICE_CEILING
+
+def test_disabled_pricing_sells_at_catalog_value(monkeypatch):
+    monkeypatch.setattr(bot, "DYNAMIC_PRICING", False)
+    table = bot.PriceTable()
+    table.record_sale(NAMES.index("Dumped"), 50)
+    table.refresh(CATALOG, NAMES, SUPPLY)
+    assert prices(table) == {name: CATALOG.get(name, (0,))[0] for name in NAMES}
@@ -0,0 +1,74 @@
+import contextvars
+
+import numpy as np
+import pytest
+
+import bot
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / "rng_state.json")
+
+def draws(stream, n=50):
+    return [stream.random() for _ in range(n)]
+
+def test_same_seed_reproduces_draws(tmp_path):
+    first = bot.RandomService(7, str(tmp_path / "a.json"))
+    second = bot.RandomService(7, str(tmp_path / "b.json"))
+    second["crash"].random()  # streams don't depend on the order they're first used in
+    assert draws(first["slots"]) == draws(second["slots"])
+    assert [first["cards"].randint(1, 52) for _ in range(20)] == [second["cards"].randint(1, 52) for _ in range(20)]
+    assert draws(first["slots"]) != draws(first["roll"])
+    assert draws(bot.RandomService(8, str(tmp_path / "c.json"))["slots"]) != draws(bot.RandomService(7, str(tmp_path / "d.json"))["slots"])
+
+def test_replay_seeks_to_a_recorded_draw(state_file):
+    service = bot.RandomService(7, state_file)
+    made = draws(service["slots"], 100)
+    assert draws(service.replay("slots", 37), 63) == made[37:]
+    # across a pool refill too
+    stream = bot.RandomStream("x", np.random.SeedSequence(3), pool_size=8)
+    made = draws(stream, 40)
+    assert draws(bot.RandomStream("x", np.random.SeedSequence(3), start=13, pool_size=8), 27) == made[13:]
+
+def test_draw_position_is_recorded_for_the_ledger(state_file):
+    service = bot.RandomService(7, state_file)
+    draws(service["spin"], 5)
+
+    def command():
+        service["spin"].randint(1, 100)
+        service["spin"].randint(1, 100)
+        return bot.current_draw.get()
+
+    assert contextvars.Context().run(command) == ("spin", 5)
+
+def test_state_file_survives_a_restart(state_file):
+    service = bot.RandomService(None, state_file)
+    service.load()
+    made = draws(service["slots"], 10)
+
+    restarted = bot.RandomService(None, state_file)
+    restarted.load()
+    assert restarted.root.entropy == service.root.entropy
+    resumed = restarted["slots"]
+    # resumes past the whole reserved pool, so no outcome is handed out twice
+    assert resumed.draws == bot.RNG_POOL_SIZE
+    assert draws(resumed, 10) == draws(service.replay("slots", bot.RNG_POOL_SIZE), 10)
+    assert restarted.replay("slots", 0).random() == made[0]
+
+def test_new_seed_overrides_saved_state(state_file):
+    service = bot.RandomService(None, state_file)
+    service.load()
+    service["slots"].random()
+    reseeded = bot.RandomService(7, state_file)
+    reseeded.load()
+    assert reseeded["slots"].draws == 0
+    assert draws(reseeded["slots"]) == draws(bot.RandomService(7, state_file + ".2")["slots"])
+
+def test_batches_match_single_draws():
+    single = bot.RandomStream("x", np.random.SeedSequence(5), pool_size=7)
+    batched = bot.RandomStream("x", np.random.SeedSequence(5), pool_size=7)
+    assert [single.randint(1, 100) for _ in range(20)] == batched.randints(1, 100, 20)
+    assert [single.choice("abcdef") for _ in range(9)] == batched.choices("abcdef", k=9)
+    assert [single.choices("abc", [1, 2, 3])[0] for _ in range(9)] == batched.choices("abc", [1, 2, 3], k=9)
+    assert list(batched.random_batch(15)) == draws(single, 15)
+    assert single.draws == batched.draws
@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+import pytest
+
+import bot
+import simulate
+
+RARITIES = list(bot.ROLL_RARITY_WEIGHTS)
+DRAWS = 50_000
+
+def rarity_shares(picks):
+    return np.array([np.mean(picks == rarity) for rarity in RARITIES])
+
+@pytest.mark.parametrize("luck", [0, 250, 1e300, math.inf, 10 ** 400])
+def test_luck_weights_stay_finite(luck):
+    weights = bot.apply_luck_weights(bot.ROLL_RARITY_WEIGHTS, luck)
+    assert all(math.isfinite(w) for w in weights.values())
+    assert 0 < sum(weights.values()) < math.inf
+
+def test_inf_luck_roll_matches_bot():
+    # One distinct value per rarity, so simulated payouts map back to the rarity rolled
+    catalog = {rarity: np.array([float(10 ** i)]) for i, rarity in enumerate(RARITIES + ["cosmic", "null"])}
+    values = {float(10 ** i): rarity for i, rarity in enumerate(RARITIES)}
+    cell = {"luck": math.inf, "boost": 1.0}
+
+    net, _ = simulate.sim_roll(np.random.default_rng(1), DRAWS, cell, catalog)
+    sim = np.array([values.get(v + bot.ROLL_COST, "other") for v in net.tolist()])
+    sim = sim[sim != "other"]
+
+    weights = bot.apply_luck_weights(bot.ROLL_RARITY_WEIGHTS, cell["luck"])
+    stream = bot.RandomStream("roll", np.random.SeedSequence(1))
+    picks = np.array(stream.choices(RARITIES, weights=list(weights.values()), k=DRAWS))
+
+    expected = np.array(list(weights.values())) / sum(weights.values())
+    assert not np.any(picks == "common") and not np.any(sim == "common")
+    np.testing.assert_allclose(rarity_shares(picks), expected, atol=0.01)
+    np.testing.assert_allclose(rarity_shares(sim), expected, atol=0.01)
+
+def test_choices_rejects_non_finite_total():
+    stream = bot.RandomStream("roll", np.random.SeedSequence(1))
+    with pytest.raises(ValueError):
+        stream.choices(["a", "b"], weights=[1, math.inf])
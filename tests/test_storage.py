@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+import bot
+
+USERS = range(1_000_000_000_000_000, 1_000_000_000_000_050)
+
+def user(uid):
+    return {
+        "money": uid % 9973, "bank": uid % 101, "xp": uid % 17, "level": 2,
+        "inventory": {"Paper Clip": uid % 5 + 1, "Rusty Spoon": 2} if uid % 3 else {},
+        "achievements": ["first_coins"], "version": 1
+    }
+
+@pytest.fixture
+def open_store(monkeypatch, tmp_path):
+    """Opens stores on files in an empty directory (no users.json to import)"""
+    monkeypatch.chdir(tmp_path)
+    stores = []
+    def make(cache_size=4):
+        store = bot.UserStore("users.db", "users.log", cache_size=cache_size)
+        store.open()
+        stores.append(store)
+        return store
+    yield make
+    for store in stores:
+        if store.opened:
+            store.unmap()
+            store.log.close()
+            store.log_reader.close()
+
+def stored(store, uid):
+    data = store.get(uid)
+    return bot.unpack_user(data, store.item_ids) if data is not None else None
+
+def test_round_trip_through_evictions(open_store):
+    store = open_store()
+    for uid in USERS:
+        store.put(uid, bot.pack_user(user(uid), store.item_ids))
+    assert len(store.cache) == 4 and store.overlay  # most records were evicted to the log
+    store.close()
+
+    reopened = open_store()
+    assert {uid: stored(reopened, uid) for uid in USERS} == {uid: user(uid) for uid in USERS}
+    assert reopened.columns.sum("money") == sum(user(uid)["money"] for uid in USERS)
+    assert stored(reopened, 42) is None
+
+def test_log_replay_after_crash_before_compaction(open_store):
+    store = open_store()
+    for uid in USERS:
+        store.put(uid, bot.pack_user(user(uid), store.item_ids))
+    store.count_lottery([7, 7, 42])
+    store.flush()
+    changed = dict(user(USERS[0]), money=123)
+    store.put(USERS[0], bot.pack_user(changed, store.item_ids))
+    store.flush()
+    store.put(USERS[1], bot.pack_user(dict(user(USERS[1]), money=0), store.item_ids))  # never flushed
+    size = os.path.getsize("users.log")
+    with open("users.log", "ab") as f:  # the process died halfway through a frame
+        f.write(bot.USER_LOG_FRAME.pack(USERS[2], 500) + b'{"money": 1')
+    # No close() and no compaction: the next start only has the snapshot and the log
+
+    reopened = open_store()
+    assert os.path.getsize("users.log") == size
+    assert stored(reopened, USERS[0]) == changed
+    assert stored(reopened, USERS[1]) == user(USERS[1])
+    assert stored(reopened, USERS[2]) == user(USERS[2])
+    assert reopened.lottery[7] == 2 and reopened.lottery[42] == 1
+    assert reopened.columns.exact("money", reopened.columns.slot(USERS[0])) == 123
+
+def test_snapshot_round_trip_after_compaction(open_store):
+    store = open_store()
+    for uid in USERS:
+        store.put(uid, bot.pack_user(user(uid), store.item_ids))
+    store.count_lottery([3, 99])
+    store.compact()
+    assert store.log_size == 0 and not store.overlay
+    store.put(USERS[0], bot.pack_user(dict(user(USERS[0]), money=-5), store.item_ids))  # newer copy in the log
+    store.close()
+
+    reopened = open_store()
+    expected = {uid: user(uid) for uid in USERS}
+    expected[USERS[0]]["money"] = -5
+    assert {uid: stored(reopened, uid) for uid in USERS} == expected
+    assert list(reopened.uids) == list(USERS)
+    assert reopened.lottery[3] == 1 and reopened.lottery[99] == 1
+    assert reopened.item_ids.names == store.item_ids.names
+    clip = reopened.item_ids.id("Paper Clip")
+    assert reopened.columns.item_supply(clip) == (
+        sum(u["inventory"].get("Paper Clip", 0) for u in expected.values()),
+        sum("Paper Clip" in u["inventory"] for u in expected.values()))
+
+def test_json_only_seeds_a_missing_snapshot(open_store):
+    with open("users.json", "w", encoding="utf-8") as f:
+        f.write('{"%d": {"money": 10, "inventory": {"Paper Clip": 1}}}' % USERS[0])
+    store = open_store()
+    assert stored(store, USERS[0])["money"] == 10
+    store.put(USERS[0], bot.pack_user(dict(stored(store, USERS[0]), money=20), store.item_ids))
+    store.close()
+    with open("users.json", "w", encoding="utf-8") as f:  # edited after the snapshot exists
+        f.write('{"%d": {"money": 99}}' % USERS[0])
+
+    assert stored(open_store(), USERS[0])["money"] == 20
+
+def test_unreadable_snapshot_is_an_error(open_store):
+    with open("users.db", "wb") as f:
+        f.write(bot.SNAPSHOT_HEADER.pack(bot.SNAPSHOT_MAGIC, bot.SNAPSHOT_VERSION + 1, 0))
+    with pytest.raises(RuntimeError):
+        open_store()
+    assert os.path.exists("users.db")
+
+def test_pack_unpack_round_trip():
+    registry = bot.ItemRegistry(["Paper Clip"])
+    for record in (user(USERS[1]), user(USERS[0]), {"money": 5}):  # items, an empty inventory, no inventory
+        packed = bot.pack_user(record, registry)
+        assert bot.unpack_user(packed, registry) == record
+        assert bot.unpack_user(bot.decode_user(bot.encode_user(packed), registry), registry) == record
+    assert registry.names == ["Paper Clip", "Rusty Spoon"]
+
+    record = user(USERS[1])
+    packed = bot.pack_user(record, registry)
+    record["inventory"]["Paper Clip"] = 99  # both sides are private copies
+    record["achievements"].append("gambler")
+    assert bot.unpack_user(packed, registry) == user(USERS[1])
+    unpacked = bot.unpack_user(packed, registry)
+    unpacked["inventory"].clear()
+    assert bot.unpack_user(packed, registry) == user(USERS[1])
+
+def test_items_registered_after_the_snapshot_round_trip(open_store):
+    store = open_store()
+    for uid in USERS:
+        store.put(uid, bot.pack_user(user(uid), store.item_ids))
+    store.compact()
+    late = dict(user(USERS[2]), inventory={"Paper Clip": 1, "Brand New Hat": 3})
+    store.put(USERS[2], bot.pack_user(late, store.item_ids))
+    store.put(USERS[3], bot.pack_user(dict(user(USERS[3]), inventory={}), store.item_ids))
+    store.flush()
+    # No close(), so no compaction: only the log knows the new item's id
+
+    reopened = open_store()
+    assert reopened.item_ids.names == ["Paper Clip", "Rusty Spoon", "Brand New Hat"]
+    assert stored(reopened, USERS[2]) == late
+    assert stored(reopened, USERS[3])["inventory"] == {}
+    assert stored(reopened, USERS[1]) == user(USERS[1])